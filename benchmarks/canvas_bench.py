@@ -0,0 +1,254 @@
+"""
+Headless ParCanvas micro-benchmarks.
+
+Drives a ParCanvas inside Textual's `run_test` pilot at several canvas sizes and reports
+ops/sec, per-op times and allocations as JSON. With `--compare` the results are checked
+against a saved baseline and the process exits with status 1 if any benchmark regressed.
+
+    python benchmarks/canvas_bench.py --output bench.json
+    python benchmarks/canvas_bench.py --compare bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+import textual
+from textual.app import App, ComposeResult
+from textual.geometry import Size
+
+from par_textual_playground.widgets.canvas.hires import HiResMode
+from par_textual_playground.widgets.canvas.par_canvas import ParCanvas
+
+
+@dataclass
+class Benchmark:
+    name: str
+    run: Callable[[ParCanvas, np.random.Generator], object]
+    """Performs one op on the canvas."""
+
+
+def _random_lines(canvas: ParCanvas, rng: np.random.Generator, count: int) -> np.ndarray:
+    size = canvas.canvas_size
+    return rng.uniform(0, 1, (count, 4)) * [size.width, size.height, size.width, size.height]
+
+
+def _random_points(canvas: ParCanvas, rng: np.random.Generator, count: int) -> np.ndarray:
+    size = canvas.canvas_size
+    return rng.uniform(0, 1, (count, 2)) * [size.width, size.height]
+
+
+def _set_pixel(canvas: ParCanvas, rng: np.random.Generator) -> None:
+    canvas.set_pixel(int(rng.integers(canvas.canvas_size.width)), int(rng.integers(canvas.canvas_size.height)))
+
+
+def _render_frame(canvas: ParCanvas, rng: np.random.Generator) -> None:
+    """Render every row of the canvas from scratch."""
+    canvas._strips = [None] * canvas.canvas_size.height
+    for y in range(canvas.canvas_size.height):
+        canvas.render_line(y)
+
+
+def _batch_flush(canvas: ParCanvas, rng: np.random.Generator) -> None:
+    """A typical animation frame: clear, draw a scene in a batch and flush it."""
+    canvas.batching = True
+    canvas.clear()
+    canvas.draw_lines(_random_lines(canvas, rng, 20).astype(int), style="yellow")
+    canvas.draw_circle_highres(canvas.canvas_size.width / 2, canvas.canvas_size.height / 2, 8, style="green")
+    canvas.write_text(1, 1, "[bold]frame")
+    canvas.batching = False
+
+
+def _benchmarks() -> list[Benchmark]:
+    benchmarks = [
+        Benchmark("set_pixel", _set_pixel),
+        Benchmark("set_pixels_1000", lambda c, rng: c.set_pixels(_random_points(c, rng, 1000).astype(int))),
+        Benchmark("draw_lines_100", lambda c, rng: c.draw_lines(_random_lines(c, rng, 100).astype(int))),
+        Benchmark(
+            "draw_hires_lines_100",
+            lambda c, rng: c.draw_hires_lines(_random_lines(c, rng, 100), HiResMode.BRAILLE),
+        ),
+    ]
+    for hires_mode in HiResMode:
+        benchmarks.append(
+            Benchmark(
+                f"set_hires_pixels_1000_{hires_mode.name.lower()}",
+                lambda c, rng, hires_mode=hires_mode: c.set_hires_pixels(_random_points(c, rng, 1000), hires_mode),
+            )
+        )
+    benchmarks += [
+        Benchmark("draw_circle", lambda c, rng: c.draw_circle(c.canvas_size.width // 2, c.canvas_size.height // 2, 10)),
+        Benchmark(
+            "draw_filled_circle",
+            lambda c, rng: c.draw_filled_circle(c.canvas_size.width // 2, c.canvas_size.height // 2, 10),
+        ),
+        Benchmark(
+            "draw_circle_highres",
+            lambda c, rng: c.draw_circle_highres(c.canvas_size.width / 2, c.canvas_size.height / 2, 10),
+        ),
+        Benchmark(
+            "draw_filled_circle_highres",
+            lambda c, rng: c.draw_filled_circle_highres(c.canvas_size.width / 2, c.canvas_size.height / 2, 10),
+        ),
+        Benchmark(
+            "draw_markers_1000", lambda c, rng: c.draw_markers(_random_points(c, rng, 1000), 1.5, HiResMode.BRAILLE)
+        ),
+        Benchmark("draw_density_100000", lambda c, rng: c.draw_density(_random_points(c, rng, 100_000))),
+        Benchmark("write_text", lambda c, rng: c.write_text(2, 2, "[green]Bresenham's [bold red]algorithm")),
+        Benchmark("batch_flush", _batch_flush),
+        Benchmark("render_frame", _render_frame),
+    ]
+    return benchmarks
+
+
+class BenchApp(App):
+    CSS = "ParCanvas { width: 100%; height: 100%; }"
+
+    def compose(self) -> ComposeResult:
+        yield ParCanvas()
+
+
+def _measure(
+    canvas: ParCanvas, benchmark: Benchmark, min_time: float, alloc_ops: int, seed: int
+) -> dict[str, float | int]:
+    """Run one benchmark on a freshly reset canvas."""
+    canvas.reset(refresh=False)
+    rng = np.random.default_rng(seed)
+    # warm up caches, interned styles and lazily allocated planes
+    for _ in range(3):
+        benchmark.run(canvas, rng)
+
+    times: list[float] = []
+    started = perf_counter()
+    while perf_counter() - started < min_time or len(times) < 5:
+        op_start = perf_counter()
+        benchmark.run(canvas, rng)
+        times.append(perf_counter() - op_start)
+
+    # allocations are measured separately, tracemalloc slows everything down
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    for _ in range(alloc_ops):
+        benchmark.run(canvas, rng)
+    _, peak = tracemalloc.get_traced_memory()
+    stats = tracemalloc.take_snapshot().compare_to(before, "filename")
+    tracemalloc.stop()
+
+    samples = np.array(times)
+    return {
+        "ops": len(times),
+        "ops_per_sec": len(times) / samples.sum(),
+        "mean_ms": samples.mean() * 1000,
+        "median_ms": float(np.median(samples)) * 1000,
+        "p95_ms": float(np.percentile(samples, 95)) * 1000,
+        "alloc_blocks_per_op": sum(max(stat.count_diff, 0) for stat in stats) / alloc_ops,
+        "alloc_bytes_per_op": sum(max(stat.size_diff, 0) for stat in stats) / alloc_ops,
+        "peak_bytes": peak,
+    }
+
+
+async def run_benchmarks(
+    sizes: list[Size], names: list[str] | None, min_time: float, alloc_ops: int, seed: int
+) -> list[dict[str, object]]:
+    benchmarks = [benchmark for benchmark in _benchmarks() if not names or benchmark.name in names]
+    results: list[dict[str, object]] = []
+    for size in sizes:
+        app = BenchApp()
+        async with app.run_test(size=(size.width, size.height)) as pilot:
+            await pilot.pause()
+            canvas = app.query_one(ParCanvas)
+            canvas.reset(canvas.size, refresh=False)
+            for benchmark in benchmarks:
+                result = _measure(canvas, benchmark, min_time, alloc_ops, seed)
+                results.append({"name": benchmark.name, "size": f"{size.width}x{size.height}", **result})
+                print(
+                    f"{benchmark.name:40} {size.width:>4}x{size.height:<4} "
+                    f"{result['ops_per_sec']:>12,.0f} ops/s {result['median_ms']:>10.4f} ms "
+                    f"{result['alloc_bytes_per_op']:>12,.0f} B/op",
+                    file=sys.stderr,
+                )
+                # give textual a chance to process the refreshes the benchmark queued
+                await pilot.pause()
+    return results
+
+
+def compare(results: list[dict[str, object]], baseline: dict[str, object], threshold: float) -> list[str]:
+    """
+    Compare results against a baseline.
+
+    Args:
+        results: The new results.
+        baseline: A report written by a previous run.
+        threshold: The relative slowdown of the median time that counts as a regression.
+    Returns:
+        A description of every regression.
+    """
+    previous = {(r["name"], r["size"]): r for r in baseline["results"]}  # type: ignore
+    regressions = []
+    for result in results:
+        old = previous.get((result["name"], result["size"]))
+        if old is None:
+            continue
+        ratio = result["median_ms"] / old["median_ms"]  # type: ignore
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{result['name']} {result['size']}: median {old['median_ms']:.4f} ms -> "
+                f"{result['median_ms']:.4f} ms ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="80x24,200x60", help="Comma separated canvas sizes, e.g. 80x24,200x60.")
+    parser.add_argument("--only", default="", help="Comma separated benchmark names to run. Defaults to all.")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds to run each benchmark for.")
+    parser.add_argument("--alloc-ops", type=int, default=20, help="Ops to run under tracemalloc.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generated shapes.")
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this file instead of stdout.")
+    parser.add_argument("--compare", type=Path, help="A saved JSON report to check the results against.")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative slowdown that counts as a regression.")
+    args = parser.parse_args()
+
+    sizes = [Size(*map(int, size.split("x"))) for size in args.sizes.split(",")]
+    names = [name for name in args.only.split(",") if name]
+    # read the baseline first, so it can be the same file as the output
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    results = asyncio.run(run_benchmarks(sizes, names, args.min_time, args.alloc_ops, args.seed))
+    report = {
+        "meta": {
+            "timestamp": datetime.now(UTC).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "textual": textual.__version__,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
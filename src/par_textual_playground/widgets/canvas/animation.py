@@ -0,0 +1,142 @@
+"""Adaptive frame clock for animating ParCanvas."""
+
+from collections.abc import Callable
+from time import perf_counter
+
+from textual.dom import NoScreen
+from textual.errors import NoWidget
+from textual.timer import Timer
+from textual.widget import Widget
+
+
+class AnimationClock:
+    """
+    Calls a frame callback from a Textual timer with the time elapsed since the previous frame,
+    so motion driven by it keeps the same speed whatever the frame rate is.
+
+    The cost of every frame is measured. When frames take longer than the frame budget the
+    timer is slowed down to match, coalescing the frames that could not be drawn in time into
+    one longer step instead of letting them pile up. The rate recovers once frames get cheaper.
+
+    The clock does nothing while it is paused. ParCanvas pauses its clocks while it is hidden,
+    and the clock itself drops to a slow poll while its widget is scrolled out of view or on a
+    screen that is not shown.
+    """
+
+    def __init__(
+        self,
+        widget: Widget,
+        callback: Callable[[float], object],
+        fps: float = 60,
+        max_step: float = 0.25,
+        idle_interval: float = 0.5,
+    ):
+        """
+        Args:
+            widget: The widget whose timers drive the clock and whose visibility gates it.
+            callback: Called once per frame with the elapsed time in seconds.
+            fps: The target frame rate.
+            max_step: The longest elapsed time passed to the callback, so a stall does not make objects jump.
+            idle_interval: Seconds between visibility checks while the widget is out of view.
+        """
+        self._widget = widget
+        self._callback = callback
+        self.fps = fps
+        self.max_step = max_step
+        self.idle_interval = idle_interval
+        self._timer: Timer | None = None
+        self._interval = 0.0
+        self._paused = False
+        self._idle = False
+        self._last_frame: float | None = None
+        self._frame_cost = 0.0
+        self._frame_rate = 0.0
+
+    @property
+    def running(self) -> bool:
+        """Whether the clock has been started and not stopped."""
+        return self._timer is not None
+
+    @property
+    def paused(self) -> bool:
+        """Whether the clock is paused."""
+        return self._paused
+
+    @property
+    def frame_cost(self) -> float:
+        """The smoothed time in seconds the callback takes per frame."""
+        return self._frame_cost
+
+    @property
+    def frame_rate(self) -> float:
+        """The smoothed number of frames actually drawn per second."""
+        return self._frame_rate
+
+    def start(self) -> None:
+        """Starts calling the callback at the target frame rate."""
+        if self._timer is None:
+            self._last_frame = None
+            self._schedule(1 / self.fps)
+
+    def stop(self) -> None:
+        """Stops the clock and releases its timer."""
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+
+    def pause(self) -> None:
+        """Pauses the clock. The callback is not called, and no time passes for it, until `resume`."""
+        self._paused = True
+        if self._timer is not None:
+            self._timer.pause()
+
+    def resume(self) -> None:
+        """Resumes a paused clock."""
+        if not self._paused:
+            return
+        self._paused = False
+        self._last_frame = None
+        if self._timer is not None:
+            self._timer.resume()
+
+    def _schedule(self, interval: float) -> None:
+        """Restarts the timer with a new interval."""
+        if self._timer is not None:
+            self._timer.stop()
+        self._interval = interval
+        self._timer = self._widget.set_interval(interval, self._tick, name="AnimationClock", pause=self._paused)
+
+    def _visible(self) -> bool:
+        """Whether any part of the widget is currently shown."""
+        widget = self._widget
+        try:
+            screen = widget.screen
+            return screen.is_current and bool(screen.find_widget(widget).visible_region)
+        except (NoScreen, NoWidget):
+            return False
+
+    def _tick(self) -> None:
+        if not self._visible():
+            if not self._idle:
+                self._idle = True
+                self._schedule(self.idle_interval)
+            return
+        if self._idle:
+            self._idle = False
+            self._last_frame = None
+            self._schedule(1 / self.fps)
+
+        now = perf_counter()
+        last_frame = self._last_frame if self._last_frame is not None else now - 1 / self.fps
+        self._last_frame = now
+        step = now - last_frame
+        self._callback(min(step, self.max_step))
+        cost = perf_counter() - now
+
+        # exponential moving averages, so a single slow frame does not change the rate
+        self._frame_cost += (cost - self._frame_cost) * 0.1
+        self._frame_rate += (1 / max(step, 1e-6) - self._frame_rate) * 0.1
+        # leave a quarter of each frame to textual for rendering the damage
+        interval = max(1 / self.fps, self._frame_cost * 1.25)
+        if abs(interval - self._interval) > self._interval * 0.2:
+            self._schedule(interval)
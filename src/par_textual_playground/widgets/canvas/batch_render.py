@@ -0,0 +1,67 @@
+"""Headless batch rendering of ParCanvas drawings on a process pool."""
+
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Literal
+
+from textual.geometry import Size
+
+from par_textual_playground.widgets.canvas.canvas_raster import CanvasRaster
+
+RenderFormat = Literal["ansi", "svg"]
+
+
+@dataclass(frozen=True)
+class RenderJob:
+    """
+    One drawing to render. Jobs are sent to other processes, so `draw` must be picklable,
+    e.g. a module level function or a `functools.partial` of one.
+    """
+
+    draw: Callable[[CanvasRaster], object]
+    """Draws onto the raster it is given."""
+    size: Size
+    """The size of the raster in cells."""
+    title: str = "ParCanvas"
+    """The window title of SVG output."""
+
+
+def render(job: RenderJob, output: RenderFormat = "ansi") -> str:
+    """
+    Render a job in the current process.
+
+    Args:
+        job: The drawing to render.
+        output: The format to render to.
+    Returns:
+        The rendered ANSI text or SVG document.
+    """
+    raster = CanvasRaster(job.size.width, job.size.height)
+    job.draw(raster)
+    if output == "svg":
+        return raster.export_svg(job.title)
+    return raster.export_ansi()
+
+
+def render_batch(
+    jobs: Iterable[RenderJob],
+    output: RenderFormat = "ansi",
+    max_workers: int | None = None,
+    chunksize: int = 4,
+) -> list[str]:
+    """
+    Render many drawings in parallel on a pool of processes, without a running app.
+    Each worker process imports the canvas once and then renders jobs back to back.
+
+    Args:
+        jobs: The drawings to render.
+        output: The format to render to.
+        max_workers: The number of processes. Defaults to the number of CPUs.
+        chunksize: The number of jobs sent to a process at a time.
+    Returns:
+        The rendered drawings, in the order of `jobs`.
+    """
+    jobs = list(jobs)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(render, jobs, [output] * len(jobs), chunksize=chunksize))
@@ -0,0 +1,890 @@
+"""Headless cell raster with the ParCanvas drawing API."""
+
+import enum
+import io
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any
+
+import numpy as np
+from rich.console import COLOR_SYSTEMS, Console
+from rich.segment import Segment, Segments
+from textual._box_drawing import BOX_CHARACTERS
+from textual.geometry import Region, Size
+from textual.strip import Strip
+
+from par_textual_playground.widgets.canvas import raster
+from par_textual_playground.widgets.canvas.cell_buffer import BLANK, CellBuffer, decode_text, encode_text
+from par_textual_playground.widgets.canvas.density import DENSITY_RAMP, SHADES, bin_points, density_levels
+from par_textual_playground.widgets.canvas.hires import (
+    HiResMode,
+    as_points,
+    decode_glyphs,
+    glyphs,
+    hires_sizes,
+    pack_hires_pixels,
+    pack_subpixel_grid,
+    pack_subpixels,
+)
+from par_textual_playground.widgets.canvas.image import HALF_BLOCK, as_rgb_array, half_block_colors, resample
+from par_textual_playground.widgets.canvas.stamps import Shape, stamp_shape, stamp_shapes
+from par_textual_playground.widgets.canvas.stats import CanvasStats
+from par_textual_playground.widgets.canvas.style_palette import StylePalette
+
+get_box = BOX_CHARACTERS.__getitem__
+
+
+class TextAlign(enum.Enum):
+    LEFT = enum.auto()
+    CENTER = enum.auto()
+    RIGHT = enum.auto()
+
+
+class CanvasRaster:
+    """
+    A grid of cells with the full drawing API of ParCanvas, but no widget attached.
+    Every drawing method reports the cells it touched through `mark_dirty` and `_mark_dirty_cells`,
+    which do nothing here. ParCanvas, its layers and sprites override them to route the damage to the screen.
+    A raster can be rendered without a running app with `render_strips`, `export_ansi` and `export_svg`.
+    Drawing calls can record which object they draw in every cell, see `object_id` and `object_at`.
+    """
+
+    _blank: int = BLANK
+    """The codepoint of an empty cell."""
+    _canvas_size: Size | None = None
+    _canvas_region: Region | None = None
+    _cells: CellBuffer | None = None
+    _palette: StylePalette
+    _stats: CanvasStats | None = None
+    """The stats to record into, if they are being collected."""
+    object_id: int = 0
+    """
+    The object id recorded in the cells that drawing calls draw, so `object_at` can tell what was drawn where.
+    0 means no object. Object ids are only stored once a drawing call used one, until the raster is cleared.
+    """
+
+    def __init__(self, width: int | None = None, height: int | None = None, palette: StylePalette | None = None):
+        """
+        Args:
+            width: The width of the raster. The raster is allocated right away if both width and height are given.
+            height: The height of the raster.
+            palette: The style palette to intern styles in. Rasters that are composited together must share one.
+        """
+        self._palette = StylePalette() if palette is None else palette
+        if width is not None and height is not None:
+            self._allocate(Size(width, height))
+
+    @property
+    def canvas_size(self) -> Size:
+        """The size of the raster in cells."""
+        return self._canvas_size or Size(0, 0)
+
+    def _allocate(self, size: Size) -> None:
+        """
+        Sets the size of the raster and blanks every cell, reusing the arrays if the size did not change.
+
+        Args:
+            size: The new size.
+        """
+        self._canvas_size = size
+        self._canvas_region = Region(0, 0, size.width, size.height)
+        if self._cells is None or self._cells.size != size:
+            self._cells = CellBuffer(size.width, size.height, self._blank)
+        else:
+            self._cells.clear(self._blank)
+
+    def _resample(self, size: Size) -> None:
+        """
+        Sets the size of the raster, scaling the cells to fit by repeating or dropping them.
+        Much cheaper than redrawing, but only a rough stand-in for it.
+
+        Args:
+            size: The new size.
+        """
+        if self._cells is None:
+            self._allocate(size)
+            return
+        self._canvas_size = size
+        self._canvas_region = Region(0, 0, size.width, size.height)
+        self._cells = self._cells.resampled(size.width, size.height, self._blank)
+
+    def mark_dirty(self, region: Region) -> None:
+        """
+        Marks a region as dirty for refreshing. Does nothing on a bare raster.
+
+        Args:
+            region: The region to mark as dirty.
+        """
+
+    def _mark_dirty_cells(self, xs: np.ndarray, ys: np.ndarray) -> None:
+        """
+        Marks individual cells as dirty for refreshing. Does nothing on a bare raster.
+
+        Args:
+            xs: Array of x-coordinates of cells inside the raster.
+            ys: Array of y-coordinates of cells inside the raster.
+        """
+
+    @contextmanager
+    def drawing_object(self, object_id: int) -> Iterator[None]:
+        """
+        Record the given object id in every cell drawn inside the context, see `object_id`.
+
+        Args:
+            object_id: The id of the object being drawn.
+        """
+        previous, self.object_id = self.object_id, object_id
+        try:
+            yield
+        finally:
+            self.object_id = previous
+
+    def object_at(self, x: int, y: int) -> int:
+        """
+        Get the id of the object drawn last at a cell. A lookup in the object id plane, so it takes
+        the same time however many objects were drawn.
+
+        Args:
+            x: The x-coordinate of the cell.
+            y: The y-coordinate of the cell.
+        Returns:
+            The object id, or 0 if no object was drawn there or the cell is outside the raster.
+        """
+        if self._cells is None or self._cells.ids is None or not self._cells.region.contains(x, y):
+            return 0
+        return int(self._cells.ids[y, x])
+
+    def _tag(self, cells: Any, object_ids: int | np.ndarray | None = None) -> None:
+        """
+        Records object ids in drawn cells. Does nothing until an object id other than 0 is drawn with.
+
+        Args:
+            cells: The index of the drawn cells into the cell arrays.
+            object_ids: The ids to record. Defaults to `object_id`.
+        """
+        assert self._cells is not None
+        if object_ids is None:
+            object_ids = self.object_id
+        if self._cells.ids is not None or np.any(object_ids):
+            self._cells.object_ids()[cells] = object_ids
+
+    def _row_cells(self, y: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the codepoints and style ids of a row as they are displayed.
+
+        Args:
+            y: The y-coordinate of the row.
+        Returns:
+            The codepoints and style ids of the row.
+        """
+        assert self._cells is not None
+        return self._cells.chars[y], self._cells.styles[y]
+
+    def _render_row(self, y: int) -> Strip:
+        """
+        Builds the Strip for a row, merging runs of cells with the same style into a single segment.
+
+        Args:
+            y: The y-coordinate of the row.
+        Returns:
+            A Strip representing the row.
+        """
+        chars, style_ids = self._row_cells(y)
+        text = decode_text(chars)
+        breaks = (np.flatnonzero(style_ids[1:] != style_ids[:-1]) + 1).tolist()
+        get_style = self._palette.style
+        return Strip(
+            [
+                Segment(text[start:end], style=get_style(int(style_ids[start])))
+                for start, end in zip([0, *breaks], [*breaks, len(text)])
+            ]
+        )
+
+    def render_strips(self) -> list[Strip]:
+        """
+        Renders every row of the raster, without a running app.
+
+        Returns:
+            One Strip per row.
+        """
+        return [self._render_row(y) for y in range(self.canvas_size.height)]
+
+    def export_ansi(self, color_system: str = "truecolor") -> str:
+        """
+        Renders the raster to text with ANSI escape codes, one line per row.
+
+        Args:
+            color_system: The colors to render with, one of "standard", "256", "truecolor" or "windows".
+        Returns:
+            The rendered text.
+        """
+        system = COLOR_SYSTEMS[color_system]
+        return "".join(
+            "".join(style.render(text, color_system=system) if style else text for text, style, _ in strip) + "\n"
+            for strip in self.render_strips()
+        )
+
+    def export_svg(self, title: str = "ParCanvas") -> str:
+        """
+        Renders the raster to an SVG image of a terminal window.
+
+        Args:
+            title: The title of the window.
+        Returns:
+            The SVG document.
+        """
+        console = Console(
+            file=io.StringIO(), record=True, width=max(self.canvas_size.width, 1), color_system="truecolor"
+        )
+        segments: list[Segment] = []
+        for strip in self.render_strips():
+            segments.extend(strip)
+            segments.append(Segment.line())
+        console.print(Segments(segments), end="")
+        return console.export_svg(title=title)
+
+    def set_pixel(self, x: int, y: int, char: str = "█", style: str = "white") -> None:
+        """
+        Sets a single pixel at the given coordinates.
+        Also marks it dirty for refreshing.
+
+        Args:
+            x: The x-coordinate of the pixel.
+            y: The y-coordinate of the pixel.
+            char: The character to draw.
+            style: The style to apply to the character.
+        """
+        assert self._canvas_region is not None and self._cells is not None
+        if not self._canvas_region.contains(x, y):
+            # coordinates are outside canvas
+            return
+
+        self._cells.chars[y, x] = ord(char)
+        self._cells.styles[y, x] = self._palette.intern(style)
+        self._tag((y, x))
+        r = Region(x, y, 1, 1)
+        self.mark_dirty(r)
+
+    def set_pixels(
+        self,
+        coordinates: Iterable[tuple[int, int]] | np.ndarray,
+        char: str = "█",
+        style: str = "white",
+    ) -> None:
+        """
+        Sets multiple pixels at the given coordinates in one vectorized write.
+        Also marks them dirty for refreshing.
+
+        Args:
+            coordinates: An iterable of tuples or an (N, 2) array representing the coordinates of the pixels.
+            char: The character to draw.
+            style: The style to apply to the character.
+        """
+        points = as_points(coordinates).astype(np.int64)
+        self._put_cells(points[:, 0], points[:, 1], char, style)
+
+    def _put_cells(self, xs: np.ndarray, ys: np.ndarray, char: str, style: str) -> None:
+        """
+        Writes a character and style to every cell at the given coordinates, dropping those outside the canvas.
+        Marks the written cells dirty in one batch.
+
+        Args:
+            xs: Array of x-coordinates.
+            ys: Array of y-coordinates.
+            char: The character to draw.
+            style: The style to apply to the character.
+        """
+        assert self._cells is not None
+        inside = self._inside(xs, ys)
+        xs = xs[inside]
+        ys = ys[inside]
+        if not len(xs):
+            return
+        self._cells.put(xs, ys, ord(char), self._palette.intern(style))
+        self._tag((ys, xs))
+        self._mark_dirty_cells(xs, ys)
+
+    def set_hires_pixels(
+        self,
+        coordinates: Iterable[tuple[float, float]] | np.ndarray,
+        hires_mode: HiResMode = HiResMode.HALFBLOCK,
+        style: str = "white",
+        erase: bool = False,
+    ) -> None:
+        """
+        Sets multiple pixels at the given coordinates using the specified Hi-Res mode.
+        The pixels are merged with the sub-pixels already set in each cell, so overlapping draws compose.
+        Only the cells inside the bounding box of the coordinates are composited.
+        Also marks the touched cells dirty for refreshing.
+
+        Args:
+            coordinates: An iterable of tuples or an (N, 2) array representing the coordinates of the pixels.
+            hires_mode: The Hi-Res mode to use.
+            style: The style to apply to the character.
+            erase: Clear the pixels instead of setting them. Cells left without sub-pixels become blank.
+        """
+        assert self._canvas_size
+        region, added = pack_hires_pixels(as_points(coordinates), hires_mode, self._canvas_size)
+        self._composite_hires(region, added, hires_mode, style, erase)
+
+    def _composite_hires(
+        self, region: Region, added: np.ndarray, hires_mode: HiResMode, style: str, erase: bool
+    ) -> None:
+        """
+        Merges packed sub-pixel masks into the canvas, or clears them from it.
+        Also marks the touched cells dirty for refreshing.
+
+        Args:
+            region: The region the masks cover.
+            added: The sub-pixel masks with the shape of the region.
+            hires_mode: The Hi-Res mode the masks belong to.
+            style: The style to apply to the touched cells.
+            erase: Clear the sub-pixels instead of setting them.
+        """
+        assert self._cells is not None
+        if not region.area:
+            return
+        started = perf_counter()
+        x0, y0, x1, y1 = region.corners
+        plane = self._cells.plane(hires_mode)[y0:y1, x0:x1]
+        chars = self._cells.chars[y0:y1, x0:x1]
+        styles = self._cells.styles[y0:y1, x0:x1]
+        glyph_table = glyphs[hires_mode]
+
+        # cells overwritten since the plane was last updated are decoded from the glyph they now show
+        stale = glyph_table[plane] != chars
+        plane[stale] = decode_glyphs(chars[stale], hires_mode)
+
+        touched = added != 0
+        if erase:
+            touched &= (plane & added) != 0
+            plane &= ~added
+            cleared = touched & (plane == 0)
+            chars[touched] = glyph_table[plane[touched]]
+            chars[cleared] = self._blank
+            styles[cleared] = 0
+            ys, xs = np.nonzero(cleared)
+            self._tag((ys + y0, xs + x0), 0)
+        else:
+            plane |= added
+            chars[touched] = glyph_table[plane[touched]]
+            styles[touched] = self._palette.intern(style)
+        ys, xs = np.nonzero(touched)
+        if not erase:
+            self._tag((ys + y0, xs + x0))
+        if self._stats is not None:
+            self._stats.hires_time += perf_counter() - started
+        self._mark_dirty_cells(xs + x0, ys + y0)
+
+    def clear_hires_pixels(self, hires_mode: HiResMode, region: Region | None = None) -> None:
+        """
+        Clears every sub-pixel of the given Hi-Res mode, leaving other pixels untouched.
+        Also marks the cleared region dirty for refreshing.
+
+        Args:
+            hires_mode: The Hi-Res mode whose pixels to clear.
+            region: The region to clear. Defaults to the whole canvas.
+        """
+        assert self._cells is not None
+        region = self._cells.region.intersection(region or self._cells.region)
+        plane = self._cells.planes.get(hires_mode)
+        if plane is None or not region.area:
+            return
+        x0, y0, x1, y1 = region.corners
+        plane = plane[y0:y1, x0:x1]
+        chars = self._cells.chars[y0:y1, x0:x1]
+        cleared = (plane != 0) & (glyphs[hires_mode][plane] == chars)
+        chars[cleared] = self._blank
+        self._cells.styles[y0:y1, x0:x1][cleared] = 0
+        if self._cells.ids is not None:
+            self._cells.ids[y0:y1, x0:x1][cleared] = 0
+        plane[:] = 0
+        self.mark_dirty(region)
+
+    def get_pixel(self, x: int, y: int) -> tuple[str, str]:
+        """
+        Retrieves the character and style of a single pixel at the given coordinates.
+
+        Args:
+            x: The x-coordinate of the pixel.
+            y: The y-coordinate of the pixel.
+        Returns:
+            A tuple containing the character and style of the pixel.
+        """
+        assert self._cells is not None
+        return chr(self._cells.chars[y, x]), self._palette.name(self._cells.styles[y, x])
+
+    def clear(self, char: str | None = None, style: str = "") -> None:
+        """
+        Sets every pixel of the canvas to the given character and style.
+        Also marks the whole canvas dirty for refreshing.
+
+        Args:
+            char: The character to fill with. Defaults to an empty cell.
+            style: The style to apply to the character.
+        """
+        assert self._cells is not None
+        self._cells.clear(self._blank if char is None else ord(char), self._palette.intern(style))
+        self.mark_dirty(self._cells.region)
+
+    def fill_rectangle(
+        self,
+        x0: int,
+        y0: int,
+        x1: int,
+        y1: int,
+        char: str = "█",
+        style: str = "white",
+    ) -> None:
+        """
+        Fills a rectangle with the given character and style. The corners are inclusive.
+        Also marks the rectangle dirty for refreshing.
+
+        Args:
+            x0: The x-coordinate of the top-left corner.
+            y0: The y-coordinate of the top-left corner.
+            x1: The x-coordinate of the bottom-right corner.
+            y1: The y-coordinate of the bottom-right corner.
+            char: The character to draw.
+            style: The style to apply to the character.
+        """
+        assert self._cells is not None
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((y0, y1))
+        region = self._cells.fill(Region(x0, y0, x1 - x0 + 1, y1 - y0 + 1), ord(char), self._palette.intern(style))
+        if region.area:
+            x0, y0, x1, y1 = region.corners
+            self._tag((slice(y0, y1), slice(x0, x1)))
+            self.mark_dirty(region)
+
+    def copy_region(self, region: Region, x: int, y: int) -> None:
+        """
+        Copies the pixels of a region to another position on the canvas. Overlapping regions are handled.
+        Also marks the target region dirty for refreshing.
+
+        Args:
+            region: The region to copy from.
+            x: The x-coordinate of the target top-left corner.
+            y: The y-coordinate of the target top-left corner.
+        """
+        assert self._cells is not None
+        target = self._cells.copy_region(region, x, y)
+        if target.area:
+            self.mark_dirty(target)
+
+    def shift(self, dx: int, dy: int, region: Region | None = None) -> None:
+        """
+        Shifts the pixels inside a region by an offset, in place. Hi-Res sub-pixels move along with the cells,
+        so Hi-Res drawing continues seamlessly across the shift. Pixels shifted out of the region are dropped,
+        and the exposed cells are left empty for the caller to draw, e.g. the newest column of a strip chart.
+        Also marks the region dirty for refreshing.
+
+        Args:
+            dx: The horizontal offset. Negative values shift left.
+            dy: The vertical offset. Negative values shift up.
+            region: The region to shift. Defaults to the whole canvas.
+        """
+        assert self._cells is not None
+        region = self._cells.shift(region or self._cells.region, dx, dy, self._blank)
+        if region.area and (dx or dy):
+            self.mark_dirty(region)
+
+    def draw_image(self, x: int, y: int, image: Any, size: Size | tuple[int, int] | None = None) -> None:
+        """
+        Draws a truecolor image with its top-left corner at the given cell. Every cell shows two vertical
+        pixels as an upper half block, with the top pixel as foreground and the bottom pixel as background color.
+        Conversion, resampling and style lookup are vectorized, so live frames of a few hundred cells redraw quickly.
+        Also marks the image's region dirty for refreshing.
+
+        Args:
+            x: The x-coordinate of the top-left corner.
+            y: The y-coordinate of the top-left corner.
+            image: An HxWx3 RGB array, an HxWx4 RGBA array whose alpha is ignored, an HxW grayscale array
+                or a PIL image. Float arrays are expected to hold values between 0 and 1.
+            size: The size in cells to resample the image to. Shrinking averages the pixels each cell covers.
+                Defaults to one cell per pixel column and two pixel rows per cell.
+        """
+        assert self._cells is not None
+        rgb = as_rgb_array(image)
+        if size is not None:
+            width, height = size
+            rgb = resample(rgb, width, height * 2)
+        top, bottom = half_block_colors(rgb)
+        region = self._cells.region.intersection(Region(x, y, top.shape[1], top.shape[0]))
+        if not region.area:
+            return
+        x0, y0, x1, y1 = region.corners
+        cells = (slice(y0, y1), slice(x0, x1))
+        pixels = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+        self._cells.chars[cells] = HALF_BLOCK
+        self._cells.styles[cells] = self._palette.intern_rgb_pairs(top[pixels], bottom[pixels])
+        self._tag(cells)
+        self.mark_dirty(region)
+
+    def draw_line(self, x0: int, y0: int, x1: int, y1: int, char: str = "█", style: str = "white") -> None:
+        """
+        Draws a line from (x0, y0) to (x1, y1) using the specified character and style.
+        The line is clipped to the canvas, so only its visible part is rasterized.
+        Also marks the line's pixels dirty for refreshing.
+
+        Args:
+            x0: The x-coordinate of the start of the line.
+            y0: The y-coordinate of the start of the line.
+            x1: The x-coordinate of the end of the line.
+            y1: The y-coordinate of the end of the line.
+            char: The character to draw.
+            style: The style to apply to the character.
+        """
+        self.draw_lines([(x0, y0, x1, y1)], char, style)
+
+    def draw_lines(
+        self,
+        coordinates: Iterable[tuple[int, int, int, int]] | np.ndarray,
+        char: str = "█",
+        style: str = "white",
+    ) -> None:
+        """
+        Draws multiple lines from given coordinates using the specified character and style.
+        All lines are clipped to the canvas, then rasterized and written in one batch.
+        Also marks the lines' pixels dirty for refreshing.
+
+        Args:
+            coordinates: An iterable of tuples or an (N, 4) array representing the coordinates of the lines.
+            char: The character to draw.
+            style: The style to apply to the character.
+        """
+        assert self._canvas_region
+        x0, y0, x1, y1 = raster.as_lines(coordinates).astype(np.int64).T
+        xs, ys = raster.line_points(x0, y0, x1, y1, clip=self._canvas_region)
+        self._put_cells(xs, ys, char, style)
+
+    def _inside(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        Tests which coordinates lie inside the canvas. Fractional coordinates are inside if their cell is.
+
+        Args:
+            xs: Array of x-coordinates.
+            ys: Array of y-coordinates.
+        Returns:
+            A boolean array.
+        """
+        assert self._canvas_size
+        return (xs >= 0) & (xs < self._canvas_size.width) & (ys >= 0) & (ys < self._canvas_size.height)
+
+    def draw_hires_line(
+        self,
+        x0: float,
+        y0: float,
+        x1: float,
+        y1: float,
+        hires_mode: HiResMode = HiResMode.HALFBLOCK,
+        style: str = "white",
+        erase: bool = False,
+    ) -> None:
+        """
+        Draws a high-resolution line from (x0, y0) to (x1, y1) using the specified character and style.
+        Also marks the line's pixels dirty for refreshing.
+
+        Args:
+            x0: The x-coordinate of the start of the line.
+            y0: The y-coordinate of the start of the line.
+            x1: The x-coordinate of the end of the line.
+            y1: The y-coordinate of the end of the line.
+            hires_mode: The high-resolution mode to use.
+            style: The style to apply to the character.
+            erase: Clear the line's pixels instead of setting them.
+        """
+        self.draw_hires_lines([(x0, y0, x1, y1)], hires_mode, style, erase)
+
+    def draw_hires_lines(
+        self,
+        coordinates: Iterable[tuple[float, float, float, float]],
+        hires_mode: HiResMode = HiResMode.HALFBLOCK,
+        style: str = "white",
+        erase: bool = False,
+    ) -> None:
+        """
+        Draws multiple high-resolution lines from given coordinates using the specified character and style.
+        All lines are clipped to the canvas, so only their visible parts are rasterized.
+        Also marks the lines' pixels dirty for refreshing.
+
+        Args:
+            coordinates: An iterable of tuples representing the coordinates of the lines.
+            hires_mode: The high-resolution mode to use.
+            style: The style to apply to the character.
+            erase: Clear the lines' pixels instead of setting them.
+        """
+        assert self._canvas_size
+        pixel_size = hires_sizes[hires_mode]
+        pw, ph = pixel_size.width, pixel_size.height
+        x0, y0, x1, y1 = raster.as_lines(coordinates).T
+        sx, sy = raster.line_points(
+            np.floor(x0 * pw),
+            np.floor(y0 * ph),
+            np.floor(x1 * pw),
+            np.floor(y1 * ph),
+            clip=Region(0, 0, self._canvas_size.width * pw, self._canvas_size.height * ph),
+        )
+        inside = (sx >= 0) & (sx < self._canvas_size.width * pw) & (sy >= 0) & (sy < self._canvas_size.height * ph)
+        region, added = pack_subpixels(sx[inside], sy[inside], hires_mode)
+        self._composite_hires(region, added, hires_mode, style, erase)
+
+    def draw_density(
+        self,
+        coordinates: Iterable[tuple[float, float]] | np.ndarray,
+        hires_mode: HiResMode | None = HiResMode.BRAILLE,
+        ramp: Sequence[str] = DENSITY_RAMP,
+        weights: np.ndarray | None = None,
+        max_count: float | None = None,
+        log: bool = True,
+    ) -> None:
+        """
+        Draws a density plot of many points. The points are binned first, so drawing costs time proportional
+        to the number of points plus the canvas area, and dense clusters stay readable instead of saturating.
+        With a Hi-Res mode, every sub-pixel that holds a point is set and each cell is colored by the number
+        of points it holds. Without one, each cell gets a shade glyph and color for its number of points.
+        Cells without points are left untouched.
+        Also marks the drawn cells dirty for refreshing.
+
+        Args:
+            coordinates: An iterable of tuples or an (N, 2) array representing the coordinates of the points.
+            hires_mode: The Hi-Res mode to bin the points in, or None to bin them per cell.
+            ramp: The styles to color cells with, from the lowest to the highest density.
+            weights: Optional weight for each point. Defaults to counting each point once.
+            max_count: The count that maps to the end of the ramp. Defaults to the count of the densest cell,
+                pass a fixed value to keep colors stable across frames.
+            log: Scale counts logarithmically, so sparse outliers stay visible next to dense clusters.
+        """
+        assert self._canvas_size is not None and self._cells is not None
+        width, height = self._canvas_size
+        points = as_points(coordinates)
+        if hires_mode is None:
+            counts = bin_points(points, width, height, Size(1, 1), weights)
+            chars = SHADES[np.maximum(density_levels(counts, len(SHADES), max_count, log), 0)]
+        else:
+            pixel_size = hires_sizes[hires_mode]
+            subpixel_counts = bin_points(
+                points, width * pixel_size.width, height * pixel_size.height, pixel_size, weights
+            )
+            counts = subpixel_counts.reshape(height, pixel_size.height, width, pixel_size.width).sum(axis=(1, 3))
+            chars = glyphs[hires_mode][pack_subpixel_grid(subpixel_counts > 0, hires_mode)]
+        levels = density_levels(counts, len(ramp), max_count, log)
+        ys, xs = np.nonzero(levels >= 0)
+        if not len(xs):
+            return
+        self._cells.chars[ys, xs] = chars[ys, xs]
+        ramp_ids = np.array([self._palette.intern(style) for style in ramp], dtype=self._cells.styles.dtype)
+        self._cells.styles[ys, xs] = ramp_ids[levels[ys, xs]]
+        self._tag((ys, xs))
+        self._mark_dirty_cells(xs, ys)
+
+    def draw_rectangle_box(
+        self,
+        x0: int,
+        y0: int,
+        x1: int,
+        y1: int,
+        thickness: int = 1,
+        style: str = "white",
+    ) -> None:
+        """
+        Draw a rectangle box with the specified thickness and style.
+
+        Args:
+            x0: The x-coordinate of the top-left corner.
+            y0: The y-coordinate of the top-left corner.
+            x1: The x-coordinate of the bottom-right corner.
+            y1: The y-coordinate of the bottom-right corner.
+            thickness: The thickness of the box.
+            style: The style to apply to the characters.
+        """
+        T = thickness
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((y0, y1))
+        self.set_pixel(x0, y0, char=get_box((0, T, T, 0)), style=style)
+        self.set_pixel(x1, y0, char=get_box((0, 0, T, T)), style=style)
+        self.set_pixel(x1, y1, char=get_box((T, 0, 0, T)), style=style)
+        self.set_pixel(x0, y1, char=get_box((T, T, 0, 0)), style=style)
+        for y in y0, y1:
+            self.draw_line(x0 + 1, y, x1 - 1, y, char=get_box((0, T, 0, T)), style=style)
+        for x in x0, x1:
+            self.draw_line(x, y0 + 1, x, y1 - 1, char=get_box((T, 0, T, 0)), style=style)
+
+    def draw_filled_circle(self, cx: int, cy: int, radius: int, style: str = "white") -> None:
+        """
+        Draw a filled circle. Compensates for 2:1 aspect ratio.
+        Also marks the circle's pixels dirty for refreshing.
+
+        Args:
+            cx (int): X-coordinate of the center of the circle.
+            cy (int): Y-coordinate of the center of the circle.
+            radius (int): Radius of the circle.
+            style (str): Style of the pixels to be drawn.
+        """
+
+        self._put_cells(*raster.disc_points(cx, cy, radius), "█", style)
+
+    def draw_filled_circle_highres(
+        self,
+        cx: float,
+        cy: float,
+        radius: float,
+        hires_mode: HiResMode = HiResMode.HALFBLOCK,
+        style: str = "white",
+        erase: bool = False,
+    ) -> None:
+        """
+        Draw a filled circle, with high-resolution support.
+        The circle is rasterized once per radius and sub-pixel phase and stamped from a cache after that.
+        Also marks the circle's pixels dirty for refreshing.
+
+        Args:
+            cx (float): X-coordinate of the center of the circle.
+            cy (float): Y-coordinate of the center of the circle.
+            radius (float): Radius of the circle.
+            hires_mode (HiResMode): The high-resolution mode to use.
+            style (str): Style of the pixels to be drawn.
+            erase (bool): Clear the circle's pixels instead of setting them.
+        """
+        assert self._canvas_size
+        region, added = stamp_shape(cx, cy, Shape.DISC, radius, hires_mode, self._canvas_size)
+        self._composite_hires(region, added, hires_mode, style, erase)
+
+    def draw_circle(self, cx: int, cy: int, radius: int, style: str = "white") -> None:
+        """
+        Draw a circle. Compensates for 2:1 aspect ratio.
+        Also marks the circle's pixels dirty for refreshing.
+
+        Args:
+            cx (int): X-coordinate of the center of the circle.
+            cy (int): Y-coordinate of the center of the circle.
+            radius (int): Radius of the circle.
+            style (str): Style of the pixels to be drawn.
+        """
+        self._put_cells(*raster.circle_points(cx, cy, radius), "█", style)
+
+    def draw_circle_highres(
+        self,
+        cx: float,
+        cy: float,
+        radius: float,
+        hires_mode: HiResMode = HiResMode.HALFBLOCK,
+        style: str = "white",
+        erase: bool = False,
+    ) -> None:
+        """
+        Draw a circle with high-resolution support. Compensates for 2:1 aspect ratio.
+        The circle is rasterized once per radius and sub-pixel phase and stamped from a cache after that.
+        Also marks the circle's pixels dirty for refreshing.
+
+        Args:
+            cx (float): X-coordinate of the center of the circle.
+            cy (float): Y-coordinate of the center of the circle.
+            radius (float): Radius of the circle.
+            hires_mode (HiResMode): The high-resolution mode to use.
+            style (str): Style of the pixels to be drawn.
+            erase (bool): Clear the circle's pixels instead of setting them.
+        """
+        assert self._canvas_size
+        region, added = stamp_shape(cx, cy, Shape.CIRCLE, radius, hires_mode, self._canvas_size)
+        self._composite_hires(region, added, hires_mode, style, erase)
+
+    def draw_markers(
+        self,
+        coordinates: Iterable[tuple[float, float]] | np.ndarray,
+        radius: float,
+        hires_mode: HiResMode = HiResMode.HALFBLOCK,
+        style: str = "white",
+        filled: bool = True,
+        erase: bool = False,
+        object_ids: Sequence[int] | np.ndarray | None = None,
+    ) -> None:
+        """
+        Draw the same high-resolution circle at many centers, e.g. the markers of a scatter plot.
+        The circle is rasterized once per sub-pixel phase and cached, see `stamps.get_stamp`, so every
+        marker only costs stamping its precomputed sub-pixel masks, and all markers are composited at once.
+        Also marks the markers' pixels dirty for refreshing.
+
+        Args:
+            coordinates: An iterable of tuples or an (N, 2) array representing the centers of the markers.
+            radius: Radius of the markers.
+            hires_mode: The high-resolution mode to use.
+            style: Style of the pixels to be drawn.
+            filled: Draw filled circles instead of outlines.
+            erase: Clear the markers' pixels instead of setting them.
+            object_ids: The object id of every marker, recorded in its cells instead of `object_id`.
+                Where markers overlap, the cell gets the id of the marker that comes last.
+        """
+        assert self._canvas_size
+        shape = Shape.DISC if filled else Shape.CIRCLE
+        tag = object_ids is not None and not erase
+        region, added, owner = stamp_shapes(as_points(coordinates), shape, radius, hires_mode, self._canvas_size, tag)
+        self._composite_hires(region, added, hires_mode, style, erase)
+        if tag and owner is not None and region.area:
+            ys, xs = np.nonzero(owner >= 0)
+            self._tag((ys + region.y, xs + region.x), np.asarray(object_ids)[owner[ys, xs]])
+
+    def write_text(
+        self,
+        x: int,
+        y: int,
+        text: str,
+        align: TextAlign = TextAlign.LEFT,
+    ) -> None:
+        """
+        Write text to the canvas at the specified position, with support for markup.
+        Parsed markup is cached by the palette, so text that is redrawn every frame is only parsed once.
+        Also marks the texts pixels dirty for refreshing.
+
+        Args:
+            x (int): X-coordinate of the left edge of the text.
+            y (int): Y-coordinate of the baseline of the text.
+            text (str): Text to be written.
+            align (TextAlign): The alignment of the text within the canvas.
+        """
+        assert self._canvas_size is not None and self._cells is not None
+        if y < 0 or y >= self._canvas_size.height:
+            return
+
+        if "[" in text or ":" in text:
+            chars, style_ids = self._palette.intern_markup(text)
+        else:
+            # without markup tags or emoji codes the text is used as is, with the empty style
+            chars = encode_text(text)
+            style_ids = np.zeros(len(chars), dtype=self._cells.styles.dtype)
+        length = len(chars)
+
+        if align == TextAlign.RIGHT:
+            x -= length - 1
+        elif align == TextAlign.CENTER:
+            div, mod = divmod(length, 2)
+            x -= div
+            if mod == 0:
+                # even number of characters, shift one to the right since I just
+                # like that better -- DF
+                x += 1
+
+        if x <= -length or x >= self._canvas_size.width:
+            # no part of text falls inside the canvas
+            return
+
+        overflow_left = -x
+        overflow_right = x + length - self._canvas_size.width
+        if overflow_left > 0:
+            buffer_left = 0
+            text_left = overflow_left
+        else:
+            buffer_left = x
+            text_left = 0
+        if overflow_right > 0:
+            buffer_right = None
+            text_right = -overflow_right
+        else:
+            buffer_right = x + length
+            text_right = None
+
+        self._cells.chars[y, buffer_left:buffer_right] = chars[text_left:text_right]
+        self._cells.styles[y, buffer_left:buffer_right] = style_ids[text_left:text_right]
+        self._tag((y, slice(buffer_left, buffer_right)))
+        self.mark_dirty(Region(buffer_left, y, (buffer_right or self._canvas_size.width) - buffer_left, 1))
@@ -1,8 +1,11 @@
 from textual import on
 from textual.app import ComposeResult
+from textual.geometry import Size
 from textual.widget import Widget
 
+from par_textual_playground.widgets.canvas.display_list import Anchor, DisplayList
 from par_textual_playground.widgets.canvas.hires import HiResMode
+from par_textual_playground.widgets.canvas.layers import CanvasLayer
 from par_textual_playground.widgets.canvas.par_canvas import ParCanvas
 
 
@@ -10,6 +13,7 @@ class Ball:
     def __init__(
         self,
         canvas: ParCanvas,
+        layer: CanvasLayer,
         pos: tuple[float, float],
         velocity: tuple[float, float],
         radius: float = 5,
@@ -22,22 +26,26 @@ class Ball:
         self.radius = radius
         self.color = color
         self.filled = filled
+        # the circle is half as tall as it is wide, plus a cell of margin on every side
+        self.sprite = layer.add_sprite(int(radius) * 2 + 3, int(radius) + 3)
+        self.draw()
+        self.sprite.move_to(*self.sprite_position())
 
-    def draw(self, erase: bool = False) -> None:
+    def draw(self) -> None:
+        """Rasterize the ball into its sprite once, moving it later does not redraw it."""
+        cx = self.sprite.canvas_size.width / 2
+        cy = self.sprite.canvas_size.height / 2
+        self.sprite.clear()
         if self.filled:
-            self.canvas.draw_filled_circle_highres(
-                self.pos[0],
-                self.pos[1],
-                self.radius,
-                style="rgb(0,0,0)" if erase else self.color,
-            )
+            self.sprite.draw_filled_circle_highres(cx, cy, self.radius, style=self.color)
         else:
-            self.canvas.draw_circle_highres(
-                self.pos[0],
-                self.pos[1],
-                self.radius,
-                style="rgb(0,0,0)" if erase else self.color,
-            )
+            self.sprite.draw_circle_highres(cx, cy, self.radius, style=self.color)
+
+    def sprite_position(self) -> tuple[int, int]:
+        return (
+            round(self.pos[0] - self.sprite.canvas_size.width / 2),
+            round(self.pos[1] - self.sprite.canvas_size.height / 2),
+        )
 
     def bounce_walls(self):
         x = self.pos[0]
@@ -49,62 +57,71 @@ class Ball:
         if y - 1 <= r * 0.5 or y + 1 >= self.canvas.size.height - r * 0.5:
             self.velocity = (self.velocity[0], -self.velocity[1])
 
-    def update(self) -> None:
+    def update(self, dt: float) -> None:
+        """Move the ball by its velocity, in cells per second, over dt seconds."""
         self.bounce_walls()
         self.pos = (
-            self.pos[0] + self.velocity[0],
-            self.pos[1] + self.velocity[1],
+            self.pos[0] + self.velocity[0] * dt,
+            self.pos[1] + self.velocity[1] * dt,
         )
+        self.sprite.move_to(*self.sprite_position())
 
 
 class CanvasTest(Widget):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.canvas = ParCanvas(id="canvas")
+        self.canvas = ParCanvas(id="canvas", collect_stats=True)
         self.canvas.border_title = "Canvas widget border"
-        self.ball = Ball(self.canvas, (16, 16), (0.2, 0.2), 10, "red", filled=False)
+        self.sprites = self.canvas.add_layer(z=1)
+        self.canvas.display_list = self.record_scene()
+        self.ball = Ball(self.canvas, self.sprites, (16, 16), (12, 12), 10, "red", filled=False)
+        self.since_stats = 0.0
 
     def compose(self) -> ComposeResult:
         yield self.canvas
 
     def on_mount(self) -> None:
-        self.call_after_refresh(self.update_size)
-        self.set_interval(1 / 60, self.update)
+        self.clock = self.canvas.start_animation(self.update)
+
+    def on_unmount(self) -> None:
+        self.canvas.stop_animation_clock(self.clock)
 
-    def update(self) -> None:
-        # self.canvas.reset(self.size)
+    def update(self, dt: float = 0) -> None:
+        # the ball is a sprite over the static scene, so moving it only refreshes the cells it leaves and enters
+        if not self.canvas.size:
+            return
         self.canvas.batching = True
-        self.ball.draw(erase=True)
-        self.ball.update()
-        self.ball.draw()
+        self.ball.update(dt)
         self.canvas.batching = False
+        self.since_stats += dt
+        if self.since_stats >= 1:
+            self.since_stats = 0
+            self.app.set_info(f"Canvas size: {self.canvas.canvas_size}\n{self.canvas.stats.summary()}")  # type: ignore
 
-    @on(ParCanvas.Resize)
-    def update_size(self) -> None:
-        canvas = self.canvas
-        self.app.set_info(f"Canvas size: {self.size}")  # type: ignore
-        canvas.reset(self.size)
-        self.canvas.batching = True
-        canvas.draw_rectangle_box(0, 0, canvas.size.width - 1, canvas.size.height - 1, thickness=2)
-        canvas.draw_filled_circle_highres(
-            int(canvas.size.width * 0.75), int(canvas.size.height * 0.75), 15, style="white"
-        )
+    def record_scene(self) -> DisplayList:
+        # recorded once for an 80x24 canvas, the canvas replays it scaled whenever it is resized
+        scene = DisplayList(Size(80, 24))
+        scene.draw_rectangle_box(0, 0, 79, 23, thickness=2)
+        scene.draw_filled_circle_highres(60, 18, 15, style="white")
 
-        canvas.draw_circle_highres(
-            int(canvas.size.width * 0.25),
-            int(canvas.size.height * 0.25),
+        scene.draw_circle_highres(
+            20,
+            6,
             15,
             hires_mode=HiResMode.HALFBLOCK,
             style="green",
         )
+        # scene.draw_hires_line(1, 1, 78, 22, hires_mode=HiResMode.BRAILLE, style="red")
+
+        with scene.anchored(Anchor.START, Anchor.START):
+            scene.write_text(
+                14,
+                1,
+                "[green]Bresenham's algorithm",
+            )
+        return scene
+
+    @on(ParCanvas.Resize)
+    def update_size(self) -> None:
+        self.app.set_info(f"Canvas size: {self.size}")  # type: ignore
         self.update()
-        # canvas.draw_hires_line(
-        #     1, 1, canvas.size.width - 2, canvas.size.height - 2, hires_mode=HiResMode.BRAILLE, style="red"
-        # )
-
-        canvas.write_text(
-            14,
-            1,
-            "[green]Bresenham's algorithm",
-        )
-        self.canvas.batching = False
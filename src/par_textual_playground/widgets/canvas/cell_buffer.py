@@ -0,0 +1,271 @@
+"""Array backed cell storage for ParCanvas."""
+
+import numpy as np
+from textual.geometry import Region, Size
+
+from par_textual_playground.widgets.canvas.hires import HiResMode
+
+CHAR_DTYPE = np.dtype("<u4")
+"""Codepoints are stored as little endian uint32 so a row can be decoded straight from utf-32."""
+STYLE_DTYPE = np.dtype(np.uint32)
+OBJECT_DTYPE = np.dtype(np.uint32)
+"""Object ids are application defined numbers, 0 means no object."""
+BLANK = ord(" ")
+TRANSPARENT = 0
+"""Codepoint of a cell that lets the layers below show through."""
+
+
+def encode_text(text: str) -> np.ndarray:
+    """
+    Encode a string into an array of codepoints.
+
+    Args:
+        text: The text to encode.
+    Returns:
+        A 1D array of codepoints.
+    """
+    return np.frombuffer(text.encode("utf-32-le"), dtype=CHAR_DTYPE)
+
+
+def decode_text(codepoints: np.ndarray) -> str:
+    """
+    Decode an array of codepoints back into a string.
+
+    Args:
+        codepoints: A 1D array of codepoints.
+    Returns:
+        The decoded string.
+    """
+    return np.ascontiguousarray(codepoints, dtype=CHAR_DTYPE).tobytes().decode("utf-32-le")
+
+
+class CellBuffer:
+    """
+    A grid of cells backed by two NumPy arrays.
+    `chars` holds one codepoint per cell and `styles` holds one style id per cell.
+    `planes` holds a sub-pixel bitmask per cell for each HiResMode that has been drawn with.
+    `ids` holds the id of the object drawn last in each cell, once an object id has been drawn with.
+    All bulk operations are single vectorized array operations.
+    """
+
+    def __init__(self, width: int, height: int, char: int = BLANK) -> None:
+        """
+        Args:
+            width: The width of the buffer.
+            height: The height of the buffer.
+            char: The codepoint every cell starts out with.
+        """
+        self.size = Size(width, height)
+        self.region = Region(0, 0, width, height)
+        self.chars = np.full((height, width), char, dtype=CHAR_DTYPE)
+        self.styles = np.zeros((height, width), dtype=STYLE_DTYPE)
+        self.planes: dict[HiResMode, np.ndarray] = {}
+        self.ids: np.ndarray | None = None
+
+    def plane(self, hires_mode: HiResMode) -> np.ndarray:
+        """
+        Get the sub-pixel plane for a Hi-Res mode, allocating it on first use.
+
+        Args:
+            hires_mode: The Hi-Res mode.
+        Returns:
+            A uint8 array with one sub-pixel bitmask per cell.
+        """
+        plane = self.planes.get(hires_mode)
+        if plane is None:
+            plane = self.planes[hires_mode] = np.zeros((self.size.height, self.size.width), dtype=np.uint8)
+        return plane
+
+    def object_ids(self) -> np.ndarray:
+        """
+        Get the object id of every cell, allocating them on first use.
+
+        Returns:
+            An array with one object id per cell.
+        """
+        if self.ids is None:
+            self.ids = np.zeros((self.size.height, self.size.width), dtype=OBJECT_DTYPE)
+        return self.ids
+
+    def clear(self, char: int = BLANK, style_id: int = 0) -> None:
+        """
+        Set every cell to the given codepoint and style id and drop all sub-pixel planes and object ids.
+
+        Args:
+            char: The codepoint to fill with.
+            style_id: The style id to fill with.
+        """
+        self.chars.fill(char)
+        self.styles.fill(style_id)
+        self.planes.clear()
+        self.ids = None
+
+    def fill(self, region: Region, char: int, style_id: int) -> Region:
+        """
+        Fill a region with the given codepoint and style id.
+
+        Args:
+            region: The region to fill. It is clipped to the buffer.
+            char: The codepoint to fill with.
+            style_id: The style id to fill with.
+        Returns:
+            The clipped region that was actually filled.
+        """
+        region = self.region.intersection(region)
+        if region.area:
+            x0, y0, x1, y1 = region.corners
+            self.chars[y0:y1, x0:x1] = char
+            self.styles[y0:y1, x0:x1] = style_id
+        return region
+
+    def copy_region(self, source: Region, x: int, y: int) -> Region:
+        """
+        Copy the cells of one region to another position. Overlapping source and target are handled.
+
+        Args:
+            source: The region to copy from.
+            x: The x-coordinate of the target top-left corner.
+            y: The y-coordinate of the target top-left corner.
+        Returns:
+            The clipped target region that was written.
+        """
+        dx = x - source.x
+        dy = y - source.y
+        source = self.region.intersection(source)
+        target = self.region.intersection(source.translate((dx, dy)))
+        if not target.area:
+            return target
+        sx0, sy0, sx1, sy1 = target.translate((-dx, -dy)).corners
+        tx0, ty0, tx1, ty1 = target.corners
+        src = (slice(sy0, sy1), slice(sx0, sx1))
+        dst = (slice(ty0, ty1), slice(tx0, tx1))
+        self.chars[dst] = self.chars[src]
+        self.styles[dst] = self.styles[src]
+        for plane in self.planes.values():
+            plane[dst] = plane[src]
+        if self.ids is not None:
+            self.ids[dst] = self.ids[src]
+        return target
+
+    def shift(self, region: Region, dx: int, dy: int, char: int = BLANK) -> Region:
+        """
+        Shift the cells inside a region by an offset, including the sub-pixel planes and object ids.
+        Cells shifted past the edge of the region are dropped and the exposed cells are filled with `char`.
+
+        Args:
+            region: The region to shift. It is clipped to the buffer.
+            dx: The horizontal offset.
+            dy: The vertical offset.
+            char: The codepoint to fill exposed cells with.
+        Returns:
+            The clipped region that was shifted.
+        """
+        region = self.region.intersection(region)
+        if region.area:
+            x0, y0, x1, y1 = region.corners
+            _shift(self.chars[y0:y1, x0:x1], dx, dy, char)
+            _shift(self.styles[y0:y1, x0:x1], dx, dy, 0)
+            for plane in self.planes.values():
+                _shift(plane[y0:y1, x0:x1], dx, dy, 0)
+            if self.ids is not None:
+                _shift(self.ids[y0:y1, x0:x1], dx, dy, 0)
+        return region
+
+    def put(
+        self,
+        xs: np.ndarray,
+        ys: np.ndarray,
+        chars: np.ndarray | int,
+        style_ids: np.ndarray | int,
+    ) -> None:
+        """
+        Scatter codepoints and style ids into the cells at the given coordinates.
+        Coordinates must already be inside the buffer.
+
+        Args:
+            xs: Array of x-coordinates.
+            ys: Array of y-coordinates.
+            chars: A codepoint or an array of codepoints, one per coordinate.
+            style_ids: A style id or an array of style ids, one per coordinate.
+        """
+        self.chars[ys, xs] = chars
+        self.styles[ys, xs] = style_ids
+
+    def resampled(self, width: int, height: int, char: int = BLANK) -> "CellBuffer":
+        """
+        Get a copy scaled to another size by repeating or dropping cells, including the object ids.
+        Sub-pixel planes are not kept.
+
+        Args:
+            width: The width of the copy.
+            height: The height of the copy.
+            char: The codepoint of the cells when this buffer is empty.
+        Returns:
+            The scaled copy.
+        """
+        buffer = CellBuffer(width, height, char)
+        rows = (np.arange(height) * self.size.height // max(height, 1))[:, np.newaxis]
+        columns = np.arange(width) * self.size.width // max(width, 1)
+        if self.size.width and self.size.height:
+            buffer.chars[:] = self.chars[rows, columns]
+            buffer.styles[:] = self.styles[rows, columns]
+            if self.ids is not None:
+                buffer.object_ids()[:] = self.ids[rows, columns]
+        return buffer
+
+    def changed_cells(self, other: "CellBuffer", region: Region | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find the cells of this buffer that differ from another buffer.
+
+        Args:
+            other: The buffer to compare with. It must have the same size.
+            region: Limit the comparison to this region. Defaults to the whole buffer.
+        Returns:
+            Arrays of x and y coordinates of the cells that differ.
+        """
+        region = self.region.intersection(region or self.region)
+        x0, y0, x1, y1 = region.corners
+        ys, xs = np.nonzero(
+            (self.chars[y0:y1, x0:x1] != other.chars[y0:y1, x0:x1])
+            | (self.styles[y0:y1, x0:x1] != other.styles[y0:y1, x0:x1])
+        )
+        return xs + x0, ys + y0
+
+    def present(self, front: "CellBuffer", region: Region | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Copy the cells of this buffer that differ from a front buffer into it.
+        Sub-pixel planes are drawing state and are not copied.
+
+        Args:
+            front: The buffer to update. It must have the same size.
+            region: Limit the comparison to this region. Defaults to the whole buffer.
+        Returns:
+            Arrays of x and y coordinates of the cells that changed.
+        """
+        region = self.region.intersection(region or self.region)
+        xs, ys = self.changed_cells(front, region)
+        if len(xs):
+            x0, y0, x1, y1 = region.corners
+            np.copyto(front.chars[y0:y1, x0:x1], self.chars[y0:y1, x0:x1])
+            np.copyto(front.styles[y0:y1, x0:x1], self.styles[y0:y1, x0:x1])
+        return xs, ys
+
+
+def _shift(array: np.ndarray, dx: int, dy: int, fill: int) -> None:
+    """Shift a 2D array in place, filling the exposed elements."""
+    height, width = array.shape
+    if abs(dx) >= width or abs(dy) >= height:
+        array.fill(fill)
+        return
+    # numpy copies through a temporary when source and target overlap
+    array[max(dy, 0) : height + min(dy, 0), max(dx, 0) : width + min(dx, 0)] = array[
+        max(-dy, 0) : height + min(-dy, 0), max(-dx, 0) : width + min(-dx, 0)
+    ]
+    if dy > 0:
+        array[:dy] = fill
+    elif dy < 0:
+        array[dy:] = fill
+    if dx > 0:
+        array[:, :dx] = fill
+    elif dx < 0:
+        array[:, dx:] = fill
@@ -0,0 +1,157 @@
+"""Incremental min/max decimation of evenly spaced series."""
+
+import numpy as np
+
+
+class MinMaxBins:
+    """
+    Aggregates an evenly spaced series into bins of `bin_size` samples, keeping the first, last,
+    minimum and maximum value of every bin. That is all a line plot needs to draw the series
+    exactly at any resolution coarser than the bins.
+
+    Bin k covers samples [k * bin_size, (k + 1) * bin_size). Whenever the bins would exceed
+    `max_bins`, groups of neighbouring bins are merged and `bin_size` grows by a power of two,
+    so memory stays bounded and appending costs time proportional to the appended samples only.
+    With a `window`, bins that fall entirely before the last `window` samples are dropped.
+    """
+
+    def __init__(self, max_bins: int = 4096, window: int | None = None) -> None:
+        """
+        Args:
+            max_bins: The maximum number of bins kept. Must be at least 2.
+            window: Only keep the bins covering the last `window` samples. Defaults to keeping everything.
+        """
+        self.max_bins = max_bins
+        self.window = window
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop all samples."""
+        self.count = 0
+        self.bin_size = 1
+        self.first_bin = 0
+        self.first = np.empty(0)
+        self.last = np.empty(0)
+        self.min = np.empty(0)
+        self.max = np.empty(0)
+
+    def __len__(self) -> int:
+        return len(self.first)
+
+    @property
+    def start(self) -> int:
+        """The index of the first sample covered by the bins."""
+        return self.first_bin * self.bin_size
+
+    def append(self, values: np.ndarray) -> None:
+        """
+        Append samples to the series.
+
+        Args:
+            values: A 1D array of samples.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not len(values):
+            return
+        count = self.count + len(values)
+        # the first sample that is still kept after this append
+        start = self.start if len(self) else self.count
+        if self.window is not None:
+            start = max(start, count - self.window)
+        bin_size = self.bin_size
+        while (count - 1) // bin_size - start // bin_size + 1 > self.max_bins:
+            bin_size *= 2
+        if bin_size > self.bin_size:
+            self._merge(bin_size // self.bin_size)
+
+        # top up the last bin if it is only partially filled
+        partial = self.count % self.bin_size
+        if partial and len(self):
+            head = values[: self.bin_size - partial]
+            values = values[len(head) :]
+            self.last[-1] = head[-1]
+            self.min[-1] = min(self.min[-1], head.min())
+            self.max[-1] = max(self.max[-1], head.max())
+            self.count += len(head)
+        if len(values):
+            self._append_bins(values)
+        if self.window is not None:
+            self._drop_before(self.count - self.window)
+
+    def _append_bins(self, values: np.ndarray) -> None:
+        """Append samples that start on a bin boundary as new bins."""
+        bin_size = self.bin_size
+        full = len(values) // bin_size * bin_size
+        # full bins reduce along a reshaped axis, which is much faster than reduceat
+        blocks = values[:full].reshape(-1, bin_size)
+        first = [blocks[:, 0]]
+        last = [blocks[:, -1]]
+        mins = [blocks.min(axis=1)]
+        maxs = [blocks.max(axis=1)]
+        if full < len(values):
+            tail = values[full:]
+            first.append(tail[:1])
+            last.append(tail[-1:])
+            mins.append(tail.min(keepdims=True))
+            maxs.append(tail.max(keepdims=True))
+        if not len(self):
+            # a series that was empty, or whose bins were all dropped, starts at the current sample
+            self.first_bin = self.count // bin_size
+        self.first = np.concatenate([self.first, *first])
+        self.last = np.concatenate([self.last, *last])
+        self.min = np.concatenate([self.min, *mins])
+        self.max = np.concatenate([self.max, *maxs])
+        self.count += len(values)
+
+    def _merge(self, factor: int) -> None:
+        """Merge groups of `factor` neighbouring bins, keeping the groups aligned to multiples of the new bin size."""
+        n = len(self)
+        if n:
+            starts = np.flatnonzero((np.arange(n) + self.first_bin) % factor == 0)
+            if not len(starts) or starts[0] != 0:
+                starts = np.concatenate([[0], starts])
+            ends = np.append(starts[1:], n) - 1
+            self.first = self.first[starts]
+            self.last = self.last[ends]
+            self.min = np.minimum.reduceat(self.min, starts)
+            self.max = np.maximum.reduceat(self.max, starts)
+        self.first_bin //= factor
+        self.bin_size *= factor
+
+    def _drop_before(self, sample: int) -> None:
+        """Drop the bins that end before the given sample."""
+        drop = min(max(sample // self.bin_size - self.first_bin, 0), len(self))
+        if drop:
+            self.first = self.first[drop:]
+            self.last = self.last[drop:]
+            self.min = self.min[drop:]
+            self.max = self.max[drop:]
+            self.first_bin += drop
+
+    def columns(self, start: int, stop: int, columns: int) -> tuple[np.ndarray, ...]:
+        """
+        Decimate the samples in [start, stop) into pixel columns.
+
+        Args:
+            start: The index of the sample at the left edge.
+            stop: The index of the sample at the right edge, exclusive.
+            columns: The number of pixel columns.
+        Returns:
+            The indices of the columns that hold samples, and the first, last, minimum and maximum sample of each.
+        """
+        bin_starts = (np.arange(len(self)) + self.first_bin) * self.bin_size
+        visible = (bin_starts + self.bin_size > start) & (bin_starts < stop)
+        if not visible.any():
+            empty = np.empty(0)
+            return np.empty(0, dtype=np.int64), empty, empty, empty, empty
+        column = (np.maximum(bin_starts[visible], start) - start) * columns // max(stop - start, 1)
+        column = np.minimum(column, columns - 1)
+        starts = np.flatnonzero(np.diff(column, prepend=-1))
+        ends = np.append(starts[1:], len(column)) - 1
+        return (
+            column[starts],
+            self.first[visible][starts],
+            self.last[visible][ends],
+            np.minimum.reduceat(self.min[visible], starts),
+            np.maximum.reduceat(self.max[visible], starts),
+        )
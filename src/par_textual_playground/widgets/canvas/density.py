@@ -0,0 +1,59 @@
+"""Binning of large point sets into density grids for ParCanvas."""
+
+import numpy as np
+from textual.geometry import Size
+
+DENSITY_RAMP = ("#440154", "#46327e", "#365c8d", "#277f8e", "#1fa187", "#4ac16d", "#a0da39", "#fde725")
+"""Default color ramp from the lowest to the highest density, sampled from viridis."""
+
+SHADES = np.array([ord(c) for c in "░▒▓█"], dtype=np.uint32)
+"""Glyphs for cells of increasing density when drawing without a Hi-Res mode."""
+
+
+def bin_points(
+    points: np.ndarray, columns: int, rows: int, scale: Size, weights: np.ndarray | None = None
+) -> np.ndarray:
+    """
+    Count the points falling into each bin of a grid, like `np.histogram2d` with unit sized bins but
+    in a single `np.bincount`, so the cost is linear in the number of points plus the number of bins.
+
+    Args:
+        points: An (N, 2) array of points in cell coordinates.
+        columns: The number of bins along x.
+        rows: The number of bins along y.
+        scale: The number of bins per cell along x and y.
+        weights: Optional weight for each point. Defaults to counting each point once.
+    Returns:
+        An array of shape (rows, columns) holding the count, or summed weight, of every bin.
+    """
+    x = np.floor(points[:, 0] * scale.width)
+    y = np.floor(points[:, 1] * scale.height)
+    inside = (x >= 0) & (x < columns) & (y >= 0) & (y < rows)
+    index = y[inside].astype(np.intp) * columns + x[inside].astype(np.intp)
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)[inside]
+    return np.bincount(index, weights, minlength=rows * columns).reshape(rows, columns)
+
+
+def density_levels(counts: np.ndarray, levels: int, max_count: float | None = None, log: bool = True) -> np.ndarray:
+    """
+    Map counts to the levels of a ramp. Any non-zero count gets at least the lowest level.
+
+    Args:
+        counts: The counts to map.
+        levels: The number of levels.
+        max_count: The count mapped to the highest level. Defaults to the largest count,
+            pass a fixed value to keep the scale stable across frames.
+        log: Scale counts logarithmically, so sparse outliers stay visible next to dense clusters.
+    Returns:
+        An int array with the shape of `counts`, holding -1 for empty bins and the level otherwise.
+    """
+    top = float(counts.max(initial=0)) if max_count is None else max_count
+    if top <= 0:
+        return np.full(counts.shape, -1, dtype=np.intp)
+    if log:
+        scaled = np.log1p(np.maximum(counts, 0)) / np.log1p(top)
+    else:
+        scaled = counts / top
+    level = np.clip((scaled * levels).astype(np.intp), 0, levels - 1)
+    return np.where(counts > 0, level, -1)
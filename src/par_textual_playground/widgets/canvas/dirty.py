@@ -0,0 +1,153 @@
+"""Dirty region tracking for ParCanvas."""
+
+import numpy as np
+from textual.geometry import Region, Size
+
+
+class DirtyTracker:
+    """
+    Tracks the damaged cells of a canvas as a few disjoint spans per row.
+    Spans closer than `merge_gap` cells are merged, and a row never keeps more than `max_spans` spans.
+    Once the damaged area passes `full_ratio` of the canvas, the tracker switches to a full repaint.
+    """
+
+    def __init__(self, max_spans: int = 4, merge_gap: int = 4, full_ratio: float = 0.5) -> None:
+        """
+        Args:
+            max_spans: The maximum number of spans kept per row.
+            merge_gap: Spans separated by at most this many clean cells are merged.
+            full_ratio: The fraction of the canvas area above which the whole canvas is repainted.
+        """
+        self.max_spans = max_spans
+        self.merge_gap = merge_gap
+        self.full_ratio = full_ratio
+        self._size = Size(0, 0)
+        self._rows: dict[int, list[tuple[int, int]]] = {}
+        self._area = 0
+        self._full = False
+
+    def __bool__(self) -> bool:
+        return self._full or bool(self._rows)
+
+    @property
+    def full(self) -> bool:
+        """Whether the whole canvas needs repainting."""
+        return self._full
+
+    def reset(self, size: Size) -> None:
+        """
+        Clear all damage and set the canvas size.
+
+        Args:
+            size: The size of the canvas.
+        """
+        self._size = size
+        self.clear()
+
+    def clear(self) -> None:
+        """Clear all damage."""
+        self._rows.clear()
+        self._area = 0
+        self._full = False
+
+    def add(self, region: Region) -> None:
+        """
+        Mark a region as damaged.
+
+        Args:
+            region: The damaged region.
+        """
+        region = region.intersection(Region(0, 0, *self._size))
+        if self._full or not region.area:
+            return
+        for y in region.line_range:
+            self._add_span(y, region.x, region.right)
+        self._check_full()
+
+    def add_cells(self, xs: np.ndarray, ys: np.ndarray) -> None:
+        """
+        Mark individual cells as damaged. The cells are grouped into spans in one vectorized pass.
+
+        Args:
+            xs: Array of x-coordinates. Cells must be inside the canvas.
+            ys: Array of y-coordinates.
+        """
+        if self._full or not len(xs):
+            return
+        order = np.lexsort((xs, ys))
+        xs = xs[order]
+        ys = ys[order]
+        # a new span starts on every new row and after every gap wider than merge_gap
+        starts = np.ones(len(xs), dtype=bool)
+        starts[1:] = (ys[1:] != ys[:-1]) | (xs[1:] - xs[:-1] > self.merge_gap + 1)
+        first = np.flatnonzero(starts)
+        span_ys = ys[first]
+        span_x0 = xs[first]
+        span_x1 = np.append(xs[first[1:] - 1], xs[-1]) + 1
+        # rows with too many spans collapse into a single span up front
+        rows, row_start, row_count = np.unique(span_ys, return_index=True, return_counts=True)
+        crowded = row_count > self.max_spans
+        if crowded.any():
+            row_x0 = np.minimum.reduceat(span_x0, row_start)
+            row_x1 = np.maximum.reduceat(span_x1, row_start)
+            keep = ~np.repeat(crowded, row_count)
+            span_ys = np.concatenate([span_ys[keep], rows[crowded]])
+            span_x0 = np.concatenate([span_x0[keep], row_x0[crowded]])
+            span_x1 = np.concatenate([span_x1[keep], row_x1[crowded]])
+        for y, x0, x1 in zip(span_ys.tolist(), span_x0.tolist(), span_x1.tolist()):
+            self._add_span(y, x0, x1)
+        self._check_full()
+
+    def _add_span(self, y: int, x0: int, x1: int) -> None:
+        """Add the span [x0, x1) to a row, merging it with the spans it touches."""
+        spans = self._rows.setdefault(y, [])
+        merged: list[tuple[int, int]] = []
+        for span in spans:
+            if span[1] + self.merge_gap < x0 or x1 + self.merge_gap < span[0]:
+                merged.append(span)
+            else:
+                self._area -= span[1] - span[0]
+                x0 = min(x0, span[0])
+                x1 = max(x1, span[1])
+        merged.append((x0, x1))
+        self._area += x1 - x0
+        merged.sort()
+        while len(merged) > self.max_spans:
+            # join the two spans with the smallest gap between them
+            i = min(range(len(merged) - 1), key=lambda k: merged[k + 1][0] - merged[k][1])
+            (a0, a1), (b0, b1) = merged[i], merged[i + 1]
+            self._area += (b1 - a0) - (a1 - a0) - (b1 - b0)
+            merged[i : i + 2] = [(a0, b1)]
+        self._rows[y] = merged
+
+    def _check_full(self) -> None:
+        if self._area > self.full_ratio * self._size.area:
+            self._full = True
+            self._rows.clear()
+
+    def regions(self) -> list[Region]:
+        """
+        Get the damaged area as a list of disjoint rectangles.
+        Identical spans on consecutive rows are merged into a single rectangle.
+
+        Returns:
+            A list of regions.
+        """
+        if self._full:
+            return [Region(0, 0, *self._size)]
+        regions: list[Region] = []
+        # open rectangles keyed by their span, with the row they started on
+        open_rects: dict[tuple[int, int], int] = {}
+        previous_y = -2
+        for y in sorted(self._rows):
+            spans = set(self._rows[y])
+            for span, start in list(open_rects.items()):
+                if span not in spans or previous_y != y - 1:
+                    regions.append(Region(span[0], start, span[1] - span[0], previous_y - start + 1))
+                    del open_rects[span]
+            for span in spans:
+                open_rects.setdefault(span, y)
+            previous_y = y
+        for span, start in open_rects.items():
+            regions.append(Region(span[0], start, span[1] - span[0], previous_y - start + 1))
+        return regions
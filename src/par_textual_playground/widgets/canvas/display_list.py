@@ -0,0 +1,227 @@
+"""Retained drawing commands that are replayed onto a canvas of any size."""
+
+import enum
+import inspect
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+from textual.geometry import Size
+
+from par_textual_playground.widgets.canvas.canvas_raster import CanvasRaster
+
+
+class Anchor(enum.Enum):
+    """How a coordinate follows the canvas when it is resized."""
+
+    SCALE = enum.auto()
+    """Stretch with the canvas, so the coordinate stays at the same fraction of its size."""
+    START = enum.auto()
+    """Keep the distance to the left or top edge."""
+    CENTER = enum.auto()
+    """Keep the distance to the center."""
+    END = enum.auto()
+    """Keep the distance to the right or bottom edge."""
+
+
+@dataclass(frozen=True)
+class DrawingMethod:
+    """Where the coordinates are in the arguments of a drawing method of `CanvasRaster`."""
+
+    coordinates: str
+    """The kind of each coordinate column, x, y or r for a radius."""
+    batched: bool
+    """The coordinates are passed as one (N, k) array instead of as separate arguments."""
+    cells: bool
+    """The coordinates are cell indices and get rounded, instead of continuous Hi-Res positions."""
+    replay_as: str | None = None
+    """The batched method that replays single commands, so consecutive commands are drawn in one call."""
+    per_point: tuple[str, ...] = ()
+    """The arguments that hold one value per coordinate row, like the weights of `draw_density`."""
+
+
+DRAWING_METHODS = {
+    "set_pixel": DrawingMethod("xy", False, True, "set_pixels"),
+    "set_pixels": DrawingMethod("xy", True, True),
+    "set_hires_pixels": DrawingMethod("xy", True, False),
+    "fill_rectangle": DrawingMethod("xyxy", False, True),
+    "draw_image": DrawingMethod("xy", False, True),
+    "draw_line": DrawingMethod("xyxy", False, True, "draw_lines"),
+    "draw_lines": DrawingMethod("xyxy", True, True),
+    "draw_hires_line": DrawingMethod("xyxy", False, False, "draw_hires_lines"),
+    "draw_hires_lines": DrawingMethod("xyxy", True, False),
+    "draw_density": DrawingMethod("xy", True, False, per_point=("weights",)),
+    "draw_rectangle_box": DrawingMethod("xyxy", False, True),
+    "draw_filled_circle": DrawingMethod("xyr", False, True),
+    "draw_filled_circle_highres": DrawingMethod("xyr", False, False),
+    "draw_circle": DrawingMethod("xyr", False, True),
+    "draw_circle_highres": DrawingMethod("xyr", False, False),
+    "draw_markers": DrawingMethod("xy", True, False, per_point=("object_ids",)),
+    "write_text": DrawingMethod("xy", False, True),
+}
+
+
+def split_coordinates(method: str, args: tuple[Any, ...], kwargs: dict[str, Any]) -> tuple[np.ndarray, dict[str, Any]]:
+    """
+    Split the arguments of a call to a drawing method into its coordinates and its other arguments.
+
+    Args:
+        method: The name of the drawing method, a key of `DRAWING_METHODS`.
+        args: The positional arguments of the call.
+        kwargs: The keyword arguments of the call.
+    Returns:
+        The coordinates as an (N, k) float array with the columns of `DrawingMethod.coordinates`,
+        and the other arguments by name.
+    """
+    drawing_method = DRAWING_METHODS[method]
+    arguments = inspect.signature(getattr(CanvasRaster, method)).bind(None, *args, **kwargs).arguments
+    names = list(arguments)[1:]
+    values = list(arguments.values())[1:]
+    if drawing_method.batched:
+        # copies, so changing the caller's arrays later does not change what was recorded
+        rows = np.array(values[0], dtype=np.float64).reshape(-1, len(drawing_method.coordinates))
+        options = dict(zip(names[1:], values[1:]))
+        for name in drawing_method.per_point:
+            if options.get(name) is not None:
+                options[name] = np.array(options[name])
+        return rows, options
+    count = len(drawing_method.coordinates)
+    return np.array([values[:count]], dtype=np.float64), dict(zip(names[count:], values[count:]))
+
+
+def call_with_coordinates(canvas: CanvasRaster, method: str, rows: np.ndarray, options: dict[str, Any]) -> None:
+    """
+    Call a drawing method with coordinates split off by `split_coordinates`.
+
+    Args:
+        canvas: The canvas or raster to draw on.
+        method: The name of the drawing method.
+        rows: The coordinates.
+        options: The other arguments by name.
+    """
+    draw = getattr(canvas, method)
+    if DRAWING_METHODS[method].batched:
+        draw(rows, **options)
+    else:
+        draw(*rows[0].tolist(), **options)
+
+
+@dataclass
+class _Command:
+    method: str
+    recording: DrawingMethod
+    anchor: tuple[Anchor, Anchor]
+    options: dict[str, Any]
+    """The arguments that are not coordinates."""
+    rows: list[np.ndarray] = field(default_factory=list)
+    """Coordinate arrays of shape (N, k). Consecutive commands that replay as one batch share a command."""
+
+
+class DisplayList:
+    """
+    Records drawing commands so they can be replayed onto a canvas of any size.
+
+    Commands are recorded by calling the drawing methods of `CanvasRaster` on the display list, with
+    coordinates for a canvas of `size`. On replay each coordinate is moved according to the anchor that
+    was active when it was recorded, see `anchored`, and rounded again if the method draws whole cells.
+    Consecutive commands that only differ in their coordinates are merged as they are recorded and
+    replayed with one batched call, e.g. a thousand `draw_line` calls replay as a single `draw_lines`.
+    """
+
+    def __init__(self, size: Size) -> None:
+        """
+        Args:
+            size: The size of the canvas the coordinates of the commands are given for.
+        """
+        self.size = size
+        self._commands: list[_Command] = []
+        self._anchor = (Anchor.SCALE, Anchor.SCALE)
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        if name not in DRAWING_METHODS:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+        def record(*args: Any, **kwargs: Any) -> None:
+            rows, options = split_coordinates(name, args, kwargs)
+            self._record(name, DRAWING_METHODS[name], rows, options)
+
+        return record
+
+    def _record(self, method: str, recording: DrawingMethod, rows: np.ndarray, options: dict[str, Any]) -> None:
+        """Append a command, merging it into the previous command if both replay as the same batch."""
+        if recording.replay_as is not None:
+            method = recording.replay_as
+            recording = DRAWING_METHODS[method]
+        last = self._commands[-1] if self._commands else None
+        if (
+            recording.batched
+            and method != "draw_density"
+            and last is not None
+            and last.method == method
+            and all(options.get(name) is None and last.options.get(name) is None for name in recording.per_point)
+            and last.anchor == self._anchor
+            and last.options == options
+        ):
+            last.rows.append(rows)
+        else:
+            self._commands.append(_Command(method, recording, self._anchor, options, [rows]))
+
+    def clear(self) -> None:
+        """Drop all recorded commands."""
+        self._commands.clear()
+
+    @contextmanager
+    def anchored(self, x: Anchor = Anchor.SCALE, y: Anchor = Anchor.SCALE) -> Iterator[None]:
+        """
+        Record the commands inside the context with the given anchors.
+
+        Args:
+            x: How horizontal coordinates follow the canvas.
+            y: How vertical coordinates follow the canvas.
+        """
+        previous, self._anchor = self._anchor, (x, y)
+        try:
+            yield
+        finally:
+            self._anchor = previous
+
+    def replay(self, canvas: CanvasRaster) -> None:
+        """
+        Draws all commands onto a canvas, moved to fit its current size. The canvas is not cleared first.
+
+        Args:
+            canvas: The canvas or raster to draw on.
+        """
+        for command in self._commands:
+            rows = self._transform(command, canvas.canvas_size)
+            call_with_coordinates(canvas, command.method, rows, command.options)
+
+    def _transform(self, command: _Command, size: Size) -> np.ndarray:
+        """Move the coordinates of a command from the recorded size to the given size."""
+        rows = np.concatenate(command.rows) if len(command.rows) > 1 else command.rows[0].copy()
+        cells = command.recording.cells
+        scales = []
+        for axis, (old, new, anchor) in enumerate(zip(self.size, size, command.anchor)):
+            if anchor == Anchor.SCALE:
+                # cell indices map the first and last cell onto each other, positions map the edges
+                scale = (new - 1) / max(old - 1, 1) if cells else new / max(old, 1)
+            else:
+                scale = 1.0
+            scales.append(scale)
+            columns = [i for i, kind in enumerate(command.recording.coordinates) if kind == "xy"[axis]]
+            if anchor == Anchor.SCALE:
+                rows[:, columns] *= scale
+            elif anchor == Anchor.CENTER:
+                rows[:, columns] += (new - old) / 2
+            elif anchor == Anchor.END:
+                rows[:, columns] += new - old
+        radii = [i for i, kind in enumerate(command.recording.coordinates) if kind == "r"]
+        rows[:, radii] *= min(scales)
+        if cells:
+            return np.rint(rows).astype(np.int64)
+        return rows
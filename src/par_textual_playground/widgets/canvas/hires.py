@@ -1,8 +1,10 @@
 """This code initially created by David Fokkema https://github.com/davidfokkema/textual-plot"""
 
 import enum
+from collections.abc import Iterable
 
-from textual.geometry import Size
+import numpy as np
+from textual.geometry import Region, Size
 
 
 class HiResMode(enum.Enum):
@@ -297,6 +299,150 @@ pixels = {
     },
 }
 
+
+def subpixel_mask(subpixels: tuple[int, ...]) -> int:
+    """
+    Pack a tuple of sub-pixels in row-major order into an integer bitmask. Sub-pixel k becomes bit k.
+
+    Args:
+        subpixels: The sub-pixel tuple as used by the `pixels` tables.
+    Returns:
+        The bitmask.
+    """
+    return sum(bit << k for k, bit in enumerate(subpixels))
+
+
+def _glyph_table(table: dict[tuple[int, ...], str | None]) -> np.ndarray:
+    glyph_table = np.zeros(len(table), dtype=np.uint32)
+    for subpixels, char in table.items():
+        if char:
+            glyph_table[subpixel_mask(subpixels)] = ord(char)
+    return glyph_table
+
+
+glyphs: dict[HiResMode, np.ndarray] = {hires_mode: _glyph_table(table) for hires_mode, table in pixels.items()}
+"""Codepoint of the glyph for each sub-pixel bitmask, indexed by mask. 0 means the cell is empty."""
+
+
+def _decode_table(glyph_table: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    masks = np.flatnonzero(glyph_table)
+    order = np.argsort(glyph_table[masks])
+    return glyph_table[masks][order], masks[order].astype(np.uint8)
+
+
+_decode_tables: dict[HiResMode, tuple[np.ndarray, np.ndarray]] = {
+    hires_mode: _decode_table(glyph_table) for hires_mode, glyph_table in glyphs.items()
+}
+
+
+def decode_glyphs(chars: np.ndarray, hires_mode: HiResMode) -> np.ndarray:
+    """
+    Decode glyph codepoints back into their sub-pixel bitmasks.
+    Codepoints that are not a glyph of the given mode decode to 0.
+
+    Args:
+        chars: An array of codepoints.
+        hires_mode: The Hi-Res mode whose glyphs to decode.
+    Returns:
+        An array of uint8 bitmasks with the shape of `chars`.
+    """
+    codepoints, masks = _decode_tables[hires_mode]
+    index = np.minimum(np.searchsorted(codepoints, chars), len(codepoints) - 1)
+    return np.where(codepoints[index] == chars, masks[index], 0).astype(np.uint8)
+
+
+def decode_glyph(char: str, hires_mode: HiResMode) -> int:
+    """
+    Decode a single glyph back into its sub-pixel bitmask.
+
+    Args:
+        char: The glyph.
+        hires_mode: The Hi-Res mode whose glyphs to decode.
+    Returns:
+        The bitmask, or 0 if the character is not a glyph of the given mode.
+    """
+    return int(decode_glyphs(np.array([ord(char)], dtype=np.uint32), hires_mode)[0])
+
+
+def as_points(coordinates: Iterable[tuple[float, float]] | np.ndarray) -> np.ndarray:
+    """
+    Convert coordinates into an (N, 2) float array.
+
+    Args:
+        coordinates: An iterable of (x, y) tuples or an array of shape (N, 2).
+    Returns:
+        An (N, 2) float array.
+    """
+    if not isinstance(coordinates, np.ndarray):
+        coordinates = list(coordinates)
+    return np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+
+
+def pack_hires_pixels(points: np.ndarray, hires_mode: HiResMode, size: Size) -> tuple[Region, np.ndarray]:
+    """
+    Pack hi-res points into one sub-pixel bitmask per cell.
+    Only the bounding box of the points that fall inside the canvas is allocated.
+
+    Args:
+        points: An (N, 2) array of points in cell coordinates.
+        hires_mode: The Hi-Res mode that decides the sub-pixel grid.
+        size: The size of the canvas in cells.
+    Returns:
+        The bounding box of the touched cells and an array of masks with the shape of the bounding box.
+    """
+    pixel_size = hires_sizes[hires_mode]
+    x = points[:, 0]
+    y = points[:, 1]
+    inside = (x >= 0) & (x < size.width) & (y >= 0) & (y < size.height)
+    sx = np.floor(x[inside] * pixel_size.width).astype(np.intp)
+    sy = np.floor(y[inside] * pixel_size.height).astype(np.intp)
+    return pack_subpixels(sx, sy, hires_mode)
+
+
+def pack_subpixels(sx: np.ndarray, sy: np.ndarray, hires_mode: HiResMode) -> tuple[Region, np.ndarray]:
+    """
+    Pack sub-pixel coordinates into one sub-pixel bitmask per cell.
+    Only the bounding box of the sub-pixels is allocated. Coordinates must not be negative.
+
+    Args:
+        sx: Array of sub-pixel x-coordinates.
+        sy: Array of sub-pixel y-coordinates.
+        hires_mode: The Hi-Res mode that decides the sub-pixel grid.
+    Returns:
+        The bounding box of the touched cells and an array of masks with the shape of the bounding box.
+    """
+    if not len(sx):
+        return Region(), np.zeros((0, 0), dtype=np.uint8)
+    pixel_size = hires_sizes[hires_mode]
+    pw, ph = pixel_size.width, pixel_size.height
+    x0 = sx.min() // pw
+    y0 = sy.min() // ph
+    width = sx.max() // pw - x0 + 1
+    height = sy.max() // ph - y0 + 1
+    subpixels = np.zeros((height * ph, width * pw), dtype=bool)
+    subpixels[sy - y0 * ph, sx - x0 * pw] = True
+    return Region(int(x0), int(y0), int(width), int(height)), pack_subpixel_grid(subpixels, hires_mode)
+
+
+def pack_subpixel_grid(subpixels: np.ndarray, hires_mode: HiResMode) -> np.ndarray:
+    """
+    Pack a grid of sub-pixels into one sub-pixel bitmask per cell.
+
+    Args:
+        subpixels: A boolean array whose shape is a multiple of the sub-pixel size of the Hi-Res mode.
+        hires_mode: The Hi-Res mode that decides the sub-pixel grid.
+    Returns:
+        An array of masks with one entry per cell.
+    """
+    pixel_size = hires_sizes[hires_mode]
+    pw, ph = pixel_size.width, pixel_size.height
+    height = subpixels.shape[0] // ph
+    width = subpixels.shape[1] // pw
+    # group the sub-pixels of each cell in row-major order, then pack them into one byte per cell
+    cell_subpixels = subpixels.reshape(height, ph, width, pw).transpose(0, 2, 1, 3).reshape(height, width, ph * pw)
+    return np.packbits(cell_subpixels, axis=-1, bitorder="little")[..., 0]
+
+
 # if __name__ == "__main__":
 #
 #     def get_pixel_ordering(d8: int, d7: int, d6: int, d5: int, d4: int, d3: int, d2: int, d1: int) -> tuple[int]:
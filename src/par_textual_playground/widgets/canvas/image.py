@@ -0,0 +1,89 @@
+"""Vectorized RGB image conversion for ParCanvas."""
+
+from typing import Any
+
+import numpy as np
+
+HALF_BLOCK = ord("▀")
+"""Upper half block. Its foreground color shows the top pixel of a cell and its background color the bottom one."""
+
+
+def as_rgb_array(image: Any) -> np.ndarray:
+    """
+    Convert an image into an HxWx3 uint8 RGB array.
+
+    Args:
+        image: An HxWx3 or HxWx4 array, an HxW grayscale array, or a PIL image.
+            Float arrays are expected to hold values between 0 and 1.
+    Returns:
+        An HxWx3 uint8 array.
+    """
+    if hasattr(image, "convert"):
+        # PIL images are converted without importing PIL, so it stays optional
+        image = image.convert("RGB")
+    rgb = np.asarray(image)
+    if rgb.ndim == 2:
+        rgb = np.repeat(rgb[:, :, np.newaxis], 3, axis=2)
+    rgb = rgb[:, :, :3]
+    if rgb.dtype.kind == "f":
+        rgb = np.clip(rgb * 255 + 0.5, 0, 255)
+    return rgb.astype(np.uint8, copy=False)
+
+
+def resample(rgb: np.ndarray, width: int, height: int) -> np.ndarray:
+    """
+    Resize an RGB array. Each axis is area averaged when it shrinks and sampled nearest neighbour when it grows.
+
+    Args:
+        rgb: An HxWx3 uint8 array.
+        width: The new width in pixels.
+        height: The new height in pixels.
+    Returns:
+        A height x width x 3 uint8 array.
+    """
+    out = rgb
+    for axis, size in ((0, height), (1, width)):
+        current = out.shape[axis]
+        if size == current:
+            continue
+        if size < current:
+            # box sums are differences of a running sum, which beats np.add.reduceat by a wide margin
+            bounds = np.arange(size + 1) * current // size
+            sums = np.cumsum(out, axis=axis, dtype=np.uint32)
+            sums = np.concatenate([np.zeros_like(np.take(sums, [0], axis=axis)), sums], axis=axis)
+            shape = [1, 1, 1]
+            shape[axis] = size
+            counts = np.diff(bounds).astype(np.uint32).reshape(shape)
+            out = (np.take(sums, bounds[1:], axis=axis) - np.take(sums, bounds[:-1], axis=axis)) // counts
+        else:
+            out = np.take(out, (np.arange(size) * 2 + 1) * current // (size * 2), axis=axis)
+    return out.astype(np.uint8, copy=False)
+
+
+def pack_rgb(rgb: np.ndarray) -> np.ndarray:
+    """
+    Pack the channels of an RGB array into 24 bit integers.
+
+    Args:
+        rgb: An ...x3 uint8 array.
+    Returns:
+        A uint32 array of 0xRRGGBB values.
+    """
+    rgb = rgb.astype(np.uint32)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+
+def half_block_colors(rgb: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Split an RGB array into cells of two vertical pixels.
+    An odd last row is paired with itself.
+
+    Args:
+        rgb: An HxWx3 uint8 array.
+    Returns:
+        The packed top and bottom pixel colors, each of shape (ceil(H / 2), W).
+    """
+    if len(rgb) % 2:
+        rgb = np.concatenate([rgb, rgb[-1:]])
+    packed = pack_rgb(rgb)
+    return packed[0::2], packed[1::2]
@@ -0,0 +1,336 @@
+"""Retained layers and sprites composited over a ParCanvas."""
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+from textual.geometry import Region
+
+from par_textual_playground.widgets.canvas.canvas_raster import CanvasRaster
+from par_textual_playground.widgets.canvas.cell_buffer import CHAR_DTYPE, STYLE_DTYPE, TRANSPARENT
+
+if TYPE_CHECKING:
+    from par_textual_playground.widgets.canvas.par_canvas import ParCanvas
+
+
+class CanvasLayer(CanvasRaster):
+    """
+    A transparent drawing surface the size of its canvas, composited over the canvas in z-order.
+    Cells that were never drawn, or were cleared, let the layers below show through.
+    Sprites attached to the layer are composited on top of its cells in the order they were added.
+    """
+
+    _blank = TRANSPARENT
+
+    def __init__(self, canvas: "ParCanvas", z: int = 0):
+        """
+        Args:
+            canvas: The canvas the layer belongs to.
+            z: The stacking order of the layer. Layers with a higher z are drawn on top.
+        """
+        super().__init__(palette=canvas._palette)
+        self._canvas = canvas
+        self._z = z
+        self._visible = True
+        self.sprites: list[Sprite] = []
+        if canvas._canvas_size:
+            self._allocate(canvas._canvas_size)
+
+    @property
+    def z(self) -> int:
+        """The stacking order of the layer. Layers with a higher z are drawn on top."""
+        return self._z
+
+    @z.setter
+    def z(self, value: int) -> None:
+        if self._z == value:
+            return
+        self._z = value
+        self._canvas._sort_layers()
+        self._damage_all()
+
+    @property
+    def visible(self) -> bool:
+        """Whether the layer and its sprites are composited."""
+        return self._visible
+
+    @visible.setter
+    def visible(self, value: bool) -> None:
+        if self._visible == value:
+            return
+        # the layer is damaged while visible, so it is restored when hiding and drawn when showing
+        self._visible = True
+        self._damage_all()
+        self._visible = value
+
+    def _damage_all(self) -> None:
+        """Marks every cell the layer or its sprites cover dirty on the canvas."""
+        if self._cells is not None:
+            ys, xs = np.nonzero(self._cells.chars != TRANSPARENT)
+            self._canvas._damage_cells(xs, ys)
+        for sprite in self.sprites:
+            sprite._damage_footprint()
+
+    def mark_dirty(self, region: Region) -> None:
+        """
+        Marks a region of the layer dirty on its canvas.
+
+        Args:
+            region: The region to mark as dirty.
+        """
+        if self._visible:
+            self._canvas._damage(region)
+
+    def _mark_dirty_cells(self, xs: np.ndarray, ys: np.ndarray) -> None:
+        """
+        Marks individual cells of the layer dirty on its canvas.
+
+        Args:
+            xs: Array of x-coordinates of cells inside the layer.
+            ys: Array of y-coordinates of cells inside the layer.
+        """
+        if self._visible:
+            self._canvas._damage_cells(xs, ys)
+
+    def add_sprite(self, width: int, height: int, x: int = 0, y: int = 0) -> "Sprite":
+        """
+        Creates a sprite on this layer, on top of the sprites already there.
+        The sprite starts out fully transparent, draw into it with the usual drawing methods.
+
+        Args:
+            width: The width of the sprite.
+            height: The height of the sprite.
+            x: The x-coordinate of the sprite's top-left corner on the canvas.
+            y: The y-coordinate of the sprite's top-left corner on the canvas.
+        Returns:
+            The new sprite.
+        """
+        sprite = Sprite(self, width, height, x, y)
+        self.sprites.append(sprite)
+        return sprite
+
+    def remove_sprite(self, sprite: "Sprite") -> None:
+        """
+        Removes a sprite from this layer and restores the cells it covered.
+
+        Args:
+            sprite: The sprite to remove.
+        """
+        sprite._damage_footprint()
+        self.sprites.remove(sprite)
+
+    def opaque_object_at(self, x: int, y: int) -> int | None:
+        """
+        Get the object id shown by the layer and its sprites at a canvas cell.
+
+        Args:
+            x: The x-coordinate of the cell.
+            y: The y-coordinate of the cell.
+        Returns:
+            The object id of the topmost sprite or layer cell that is not transparent there, 0 if it has none,
+            or None if the layer and its sprites are transparent there.
+        """
+        if not self._visible or self._cells is None or not self._cells.region.contains(x, y):
+            return None
+        for sprite in reversed(self.sprites):
+            object_id = sprite.opaque_object_at(x, y)
+            if object_id is not None:
+                return object_id
+        if self._cells.chars[y, x] == TRANSPARENT:
+            return None
+        return self.object_at(x, y)
+
+    def composite_row(self, y: int, chars: np.ndarray, styles: np.ndarray) -> None:
+        """
+        Draws one row of the layer and its sprites over a row of cells, in place.
+
+        Args:
+            y: The y-coordinate of the row.
+            chars: The codepoints of the row to draw over.
+            styles: The style ids of the row to draw over.
+        """
+        if not self._visible or self._cells is None:
+            return
+        layer_chars = self._cells.chars[y]
+        opaque = layer_chars != TRANSPARENT
+        chars[opaque] = layer_chars[opaque]
+        styles[opaque] = self._cells.styles[y][opaque]
+        for sprite in self.sprites:
+            sprite.composite_row(y, chars, styles)
+
+
+class Sprite(CanvasRaster):
+    """
+    A small pre-rasterized image that can be moved around its layer.
+    Moving a sprite only marks the cells whose composited content changes dirty, which are the cells it leaves,
+    the cells it enters, and the cells where a different part of the sprite now shows.
+    Nothing is redrawn, the cells are recomposited from the layers when their rows are rendered.
+    """
+
+    _blank = TRANSPARENT
+
+    def __init__(self, layer: CanvasLayer, width: int, height: int, x: int = 0, y: int = 0):
+        """
+        Args:
+            layer: The layer the sprite belongs to.
+            width: The width of the sprite.
+            height: The height of the sprite.
+            x: The x-coordinate of the sprite's top-left corner on the canvas.
+            y: The y-coordinate of the sprite's top-left corner on the canvas.
+        """
+        super().__init__(width, height, palette=layer._palette)
+        self._layer = layer
+        self._x = x
+        self._y = y
+        self._visible = True
+
+    @property
+    def position(self) -> tuple[int, int]:
+        """The position of the sprite's top-left corner on the canvas."""
+        return self._x, self._y
+
+    @property
+    def visible(self) -> bool:
+        """Whether the sprite is composited."""
+        return self._visible
+
+    @visible.setter
+    def visible(self, value: bool) -> None:
+        if self._visible == value:
+            return
+        # the footprint is damaged while visible, so it is restored when hiding and drawn when showing
+        self._visible = True
+        self._damage_footprint()
+        self._visible = value
+
+    def move_to(self, x: int, y: int) -> None:
+        """
+        Moves the sprite's top-left corner to the given canvas position.
+        Only the cells whose composited content changes are marked dirty.
+
+        Args:
+            x: The new x-coordinate.
+            y: The new y-coordinate.
+        """
+        dx = x - self._x
+        dy = y - self._y
+        if not (dx or dy):
+            return
+        if not self._visible:
+            self._x, self._y = x, y
+            return
+        assert self._cells is not None
+        height, width = self._cells.chars.shape
+        if abs(dx) >= width or abs(dy) >= height:
+            # the old and new footprints do not overlap
+            self._damage_footprint()
+            self._x, self._y = x, y
+            self._damage_footprint()
+            return
+        # the old and new footprints laid out in their common bounding box
+        left = min(dx, 0)
+        top = min(dy, 0)
+        shape = (height + abs(dy), width + abs(dx))
+        old = (slice(-top, -top + height), slice(-left, -left + width))
+        new = (slice(dy - top, dy - top + height), slice(dx - left, dx - left + width))
+        old_chars = np.zeros(shape, dtype=CHAR_DTYPE)
+        new_chars = np.zeros(shape, dtype=CHAR_DTYPE)
+        old_styles = np.zeros(shape, dtype=STYLE_DTYPE)
+        new_styles = np.zeros(shape, dtype=STYLE_DTYPE)
+        old_chars[old] = self._cells.chars
+        new_chars[new] = self._cells.chars
+        old_styles[old] = self._cells.styles
+        new_styles[new] = self._cells.styles
+        ys, xs = np.nonzero((old_chars != new_chars) | ((old_styles != new_styles) & (new_chars != TRANSPARENT)))
+        self._layer._mark_dirty_cells(*self._to_canvas(xs + self._x + left, ys + self._y + top))
+        self._x, self._y = x, y
+
+    def move_by(self, dx: int, dy: int) -> None:
+        """
+        Moves the sprite by the given offset. See `move_to`.
+
+        Args:
+            dx: The horizontal offset.
+            dy: The vertical offset.
+        """
+        self.move_to(self._x + dx, self._y + dy)
+
+    def _to_canvas(self, xs: np.ndarray, ys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Drops the canvas coordinates that fall outside the canvas.
+
+        Args:
+            xs: Array of x-coordinates on the canvas.
+            ys: Array of y-coordinates on the canvas.
+        Returns:
+            The coordinates inside the canvas.
+        """
+        size = self._layer._canvas.canvas_size
+        inside = (xs >= 0) & (xs < size.width) & (ys >= 0) & (ys < size.height)
+        return xs[inside], ys[inside]
+
+    def _damage_footprint(self) -> None:
+        """Marks every cell the sprite covers at its current position dirty on the canvas."""
+        if self._cells is None or not self._visible:
+            return
+        ys, xs = np.nonzero(self._cells.chars != TRANSPARENT)
+        self._layer._mark_dirty_cells(*self._to_canvas(xs + self._x, ys + self._y))
+
+    def mark_dirty(self, region: Region) -> None:
+        """
+        Marks a region of the sprite dirty on its canvas.
+
+        Args:
+            region: The region to mark as dirty, in sprite coordinates.
+        """
+        if self._visible:
+            self._layer.mark_dirty(region.translate((self._x, self._y)))
+
+    def _mark_dirty_cells(self, xs: np.ndarray, ys: np.ndarray) -> None:
+        """
+        Marks individual cells of the sprite dirty on its canvas.
+
+        Args:
+            xs: Array of x-coordinates of cells inside the sprite.
+            ys: Array of y-coordinates of cells inside the sprite.
+        """
+        if self._visible:
+            self._layer._mark_dirty_cells(*self._to_canvas(xs + self._x, ys + self._y))
+
+    def opaque_object_at(self, x: int, y: int) -> int | None:
+        """
+        Get the object id shown by the sprite at a canvas cell.
+
+        Args:
+            x: The x-coordinate of the cell on the canvas.
+            y: The y-coordinate of the cell on the canvas.
+        Returns:
+            The object id of the sprite cell, 0 if it has none, or None if the sprite does not cover the cell.
+        """
+        assert self._cells is not None
+        x -= self._x
+        y -= self._y
+        if not self._visible or not self._cells.region.contains(x, y) or self._cells.chars[y, x] == TRANSPARENT:
+            return None
+        return self.object_at(x, y)
+
+    def composite_row(self, y: int, chars: np.ndarray, styles: np.ndarray) -> None:
+        """
+        Draws the part of the sprite that falls on a canvas row over that row, in place.
+
+        Args:
+            y: The y-coordinate of the canvas row.
+            chars: The codepoints of the row to draw over.
+            styles: The style ids of the row to draw over.
+        """
+        assert self._cells is not None
+        row = y - self._y
+        if not self._visible or row < 0 or row >= self._cells.size.height:
+            return
+        x0 = max(self._x, 0)
+        x1 = min(self._x + self._cells.size.width, len(chars))
+        if x0 >= x1:
+            return
+        sprite_chars = self._cells.chars[row, x0 - self._x : x1 - self._x]
+        opaque = sprite_chars != TRANSPARENT
+        chars[x0:x1][opaque] = sprite_chars[opaque]
+        styles[x0:x1][opaque] = self._cells.styles[row, x0 - self._x : x1 - self._x][opaque]
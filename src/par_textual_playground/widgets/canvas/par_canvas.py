@@ -1,44 +1,71 @@
 """This code initially created by David Fokkema https://github.com/davidfokkema/textual-plot"""
 
-import enum
-from collections.abc import Iterable, Iterator
+from collections.abc import Callable
 from dataclasses import dataclass
-from math import floor
+from functools import partial
+from time import perf_counter
 from typing import Self
 
 import numpy as np
+from rich.markup import escape
 from rich.segment import Segment
-from rich.style import Style
-from rich.text import Text
-from textual._box_drawing import BOX_CHARACTERS
+from textual.events import Click, Hide, Leave, MouseMove, Show
 from textual.geometry import Region, Size
 from textual.message import Message
 from textual.strip import Strip
+from textual.timer import Timer
 from textual.widget import Widget
+from textual.worker import Worker, get_current_worker
 
-from par_textual_playground.widgets.canvas.hires import HiResMode, hires_sizes, pixels
+from par_textual_playground.widgets.canvas.animation import AnimationClock
+from par_textual_playground.widgets.canvas.canvas_raster import CanvasRaster, TextAlign
+from par_textual_playground.widgets.canvas.cell_buffer import CellBuffer
+from par_textual_playground.widgets.canvas.dirty import DirtyTracker
+from par_textual_playground.widgets.canvas.display_list import DisplayList
+from par_textual_playground.widgets.canvas.layers import CanvasLayer
+from par_textual_playground.widgets.canvas.stats import CanvasStats
 
-get_box = BOX_CHARACTERS.__getitem__
+__all__ = ["ParCanvas", "TextAlign"]
 
 
-class TextAlign(enum.Enum):
-    LEFT = enum.auto()
-    CENTER = enum.auto()
-    RIGHT = enum.auto()
-
-
-class ParCanvas(Widget):
+class ParCanvas(CanvasRaster, Widget):
     @dataclass
     class Resize(Message):
         canvas: "ParCanvas"
         size: Size
 
-    _canvas_size: Size | None = None
-    _canvas_region: Region | None = None
-    _buffer: list[list[str]]
-    _styles: list[list[str]]
-    _dirty: dict[int, Region] = {}
+    @dataclass
+    class ObjectClicked(Message):
+        """Posted when an object drawn with an object id is clicked, see `object_at`."""
+
+        canvas: "ParCanvas"
+        object_id: int
+        x: int
+        y: int
+
+    @dataclass
+    class ObjectHovered(Message):
+        """Posted when the mouse moves onto another object, with object id 0 when it leaves all objects."""
+
+        canvas: "ParCanvas"
+        object_id: int
+
+    _front: CellBuffer | None = None
+    _strips: list[Strip | None]
+    _dirty: DirtyTracker
     _batching: bool = False
+    _canvas_layers: list[CanvasLayer]
+    _clocks: list[AnimationClock]
+    _raster_worker: Worker[None] | None = None
+    _pending_draw: Callable[[CanvasRaster], object] | None = None
+    _spare_frame: CanvasRaster | None = None
+    _stats_overlay: CanvasLayer | None = None
+    _overlay_updated: float = 0.0
+    _display_list: DisplayList | None = None
+    _replay_timer: Timer | None = None
+    resize_debounce: float = 0.15
+    """Seconds without further resizes before the display list is replayed, see `display_list`."""
+    _hovered_object: int = 0
 
     def __init__(
         self,
@@ -48,10 +75,30 @@ class ParCanvas(Widget):
         id: str | None = None,
         classes: str | None = None,
         disabled: bool = False,
+        double_buffered: bool = False,
+        collect_stats: bool = False,
     ):
-        super().__init__(name=name, id=id, classes=classes, disabled=disabled)
-        self._buffer = []
-        self._styles = []
+        """
+        Args:
+            width: The width of the canvas. The canvas is allocated right away if both width and height are given.
+            height: The height of the canvas.
+            name: The name of the widget.
+            id: The ID of the widget in the DOM.
+            classes: The CSS classes for the widget.
+            disabled: Whether the widget is disabled or not.
+            double_buffered: Draw into a back buffer that is diffed against the displayed front buffer
+                when batching ends. Only the cells that actually changed are refreshed.
+            collect_stats: Collect performance counters into `stats`. See `collect_stats`.
+        """
+        Widget.__init__(self, name=name, id=id, classes=classes, disabled=disabled)
+        CanvasRaster.__init__(self)
+        self._canvas_layers = []
+        self._clocks = []
+        self._strips = []
+        self._dirty = DirtyTracker()
+        self._double_buffered = double_buffered
+        self.stats = CanvasStats()
+        self.collect_stats = collect_stats
         if width is not None and height is not None:
             self.reset(size=Size(width, height), refresh=False)
 
@@ -68,17 +115,263 @@ class ParCanvas(Widget):
         if self._batching == value:
             return
         self._batching = value
-        if not value:
+        if value:
+            if self._stats is not None:
+                self._stats.start_frame()
+            return
+        if self._front is not None:
+            self._present()
+        if self._dirty:
             self.refresh()
-            self._dirty.clear()
+        self._dirty.clear()
+        if self._stats is not None:
+            self._stats.end_frame()
+            if self._stats_overlay is not None:
+                self._update_stats_overlay()
+
+    @property
+    def collect_stats(self) -> bool:
+        """
+        Whether performance counters are collected into `stats`.
+        Collecting adds a couple of timer reads per drawing call and rendered line.
+        """
+        return self._stats is not None
+
+    @collect_stats.setter
+    def collect_stats(self, value: bool) -> None:
+        self._stats = self.stats if value else None
+
+    @property
+    def stats_overlay(self) -> bool:
+        """
+        Whether a summary of `stats` is shown over the top row of the canvas. Turning it on also turns on `collect_stats`.
+        The summary is updated at the end of a frame, at most twice a second.
+        """
+        return self._stats_overlay is not None
+
+    @stats_overlay.setter
+    def stats_overlay(self, value: bool) -> None:
+        if value == self.stats_overlay:
+            return
+        if value:
+            self.collect_stats = True
+            self._stats_overlay = self.add_layer(z=1 << 30)
+            self._overlay_updated = 0.0
+        else:
+            assert self._stats_overlay is not None
+            self.remove_layer(self._stats_overlay)
+            self._stats_overlay = None
+
+    def _update_stats_overlay(self) -> None:
+        assert self._stats_overlay is not None
+        # the overlay only gets cells once the canvas has a size
+        if not self._stats_overlay.canvas_size:
+            return
+        now = perf_counter()
+        if now - self._overlay_updated < 0.5:
+            return
+        self._overlay_updated = now
+        # the summary is padded to the full width, so a shorter summary covers the previous one
+        summary = escape(self.stats.summary().ljust(self.canvas_size.width))
+        self._stats_overlay.write_text(0, 0, f"[reverse]{summary}")
+
+    @property
+    def display_list(self) -> DisplayList | None:
+        """
+        Drawing commands that are redrawn automatically whenever the canvas is resized.
+        While a resize is in progress the existing cells are only scaled to the new size, which is cheap,
+        and the display list is replayed once no resize happened for `resize_debounce` seconds.
+        Setting a display list replays it right away if the canvas has a size.
+        """
+        return self._display_list
+
+    @display_list.setter
+    def display_list(self, display_list: DisplayList | None) -> None:
+        self._display_list = display_list
+        if display_list is not None and self._canvas_size:
+            self.replay_display_list()
+
+    def replay_display_list(self) -> None:
+        """Clears the canvas and draws the display list onto it in one batch. Layers are left as they are."""
+        if self._replay_timer is not None:
+            self._replay_timer.stop()
+            self._replay_timer = None
+        if self._display_list is None or not self._canvas_size:
+            return
+        self.batching = True
+        self.clear()
+        self._display_list.replay(self)
+        self.batching = False
 
     def _on_resize(self, event: Resize) -> None:
+        if self._display_list is not None:
+            if self._canvas_size:
+                self._rescale(event.size)
+                if self._replay_timer is not None:
+                    self._replay_timer.stop()
+                self._replay_timer = self.set_timer(self.resize_debounce, self.replay_display_list)
+            else:
+                self.reset(event.size, refresh=False)
+                self.replay_display_list()
         self.post_message(self.Resize(canvas=self, size=event.size))
 
+    def _rescale(self, size: Size) -> None:
+        """
+        Scales the cells of the canvas and its layers to a new size as a stand-in until the next redraw.
+
+        Args:
+            size: The new size.
+        """
+        self._resample(size)
+        for layer in self._canvas_layers:
+            layer._resample(size)
+        if self._front is not None:
+            self._front = self._front.resampled(size.width, size.height)
+        self._strips = [None] * size.height
+        self._dirty.reset(size)
+        self.refresh()
+
+    def _on_hide(self, event: Hide) -> None:
+        for clock in self._clocks:
+            clock.pause()
+
+    def _on_show(self, event: Show) -> None:
+        for clock in self._clocks:
+            clock.resume()
+
+    def object_at(self, x: int, y: int) -> int:
+        """
+        Get the id of the topmost object shown at a cell, looking through the layers and their sprites
+        from the top down to the canvas cells. Every step is a lookup in an object id plane, so the cost
+        depends on the number of layers and sprites, not on the number of objects drawn.
+
+        Args:
+            x: The x-coordinate of the cell.
+            y: The y-coordinate of the cell.
+        Returns:
+            The object id, or 0 if no object is shown there.
+        """
+        for layer in reversed(self._canvas_layers):
+            object_id = layer.opaque_object_at(x, y)
+            if object_id is not None:
+                return object_id
+        return super().object_at(x, y)
+
+    def _on_click(self, event: Click) -> None:
+        offset = event.get_content_offset(self)
+        if offset is None:
+            return
+        object_id = self.object_at(offset.x, offset.y)
+        if object_id:
+            self.post_message(self.ObjectClicked(canvas=self, object_id=object_id, x=offset.x, y=offset.y))
+
+    def _on_mouse_move(self, event: MouseMove) -> None:
+        offset = event.get_content_offset(self)
+        self._hover(0 if offset is None else self.object_at(offset.x, offset.y))
+
+    def _on_leave(self, event: Leave) -> None:
+        self._hover(0)
+
+    def _hover(self, object_id: int) -> None:
+        """Posts `ObjectHovered` if the hovered object changed."""
+        if object_id != self._hovered_object:
+            self._hovered_object = object_id
+            self.post_message(self.ObjectHovered(canvas=self, object_id=object_id))
+
+    def start_animation(self, callback: Callable[[float], object], fps: float = 60) -> AnimationClock:
+        """
+        Starts calling a frame callback with the seconds elapsed since the previous frame.
+        The frame rate adapts to the cost of the frames, and the clock is paused while the canvas is hidden.
+
+        Args:
+            callback: Called once per frame with the elapsed time in seconds.
+            fps: The target frame rate.
+        Returns:
+            The clock driving the animation. Stop it with `stop_animation_clock`.
+        """
+        clock = AnimationClock(self, callback, fps)
+        self._clocks.append(clock)
+        clock.start()
+        return clock
+
+    def stop_animation_clock(self, clock: AnimationClock) -> None:
+        """
+        Stops an animation started with `start_animation`.
+        Named apart from `Widget.stop_animation`, which stops Textual's attribute animations.
+
+        Args:
+            clock: The clock driving the animation.
+        """
+        clock.stop()
+        self._clocks.remove(clock)
+
+    def draw_in_thread(self, draw: Callable[[CanvasRaster], object]) -> None:
+        """
+        Rasterizes a whole frame on a worker thread, keeping the event loop free while it draws.
+        `draw` is called with a blank raster the size of the canvas and must only draw into that raster.
+        The finished frame replaces the canvas contents on the event loop, and only the cells that changed
+        are refreshed. If frames are requested faster than they can be drawn, only the latest request is drawn.
+
+        Args:
+            draw: Draws the frame into the raster it is given.
+        """
+        self._pending_draw = draw
+        if self._raster_worker is None:
+            self._start_raster_worker()
+
+    def _start_raster_worker(self) -> None:
+        assert self._pending_draw is not None
+        draw, self._pending_draw = self._pending_draw, None
+        frame = self._spare_frame or CanvasRaster(palette=self._palette)
+        self._spare_frame = None
+        self._raster_worker = self.run_worker(
+            partial(self._rasterize, frame, self.canvas_size, draw),
+            name="rasterize",
+            group="ParCanvas.rasterize",
+            thread=True,
+        )
+
+    def _rasterize(self, frame: CanvasRaster, size: Size, draw: Callable[[CanvasRaster], object]) -> None:
+        """
+        Draws a frame on the worker thread and hands it to the event loop.
+
+        Args:
+            frame: The raster to draw into. It is owned by the worker until it is handed back.
+            size: The size of the canvas when the frame was requested.
+            draw: Draws the frame into the raster it is given.
+        """
+        frame._allocate(size)
+        draw(frame)
+        if not get_current_worker().is_cancelled:
+            self.app.call_from_thread(self._swap_frame, frame, draw)
+
+    def _swap_frame(self, frame: CanvasRaster, draw: Callable[[CanvasRaster], object]) -> None:
+        """
+        Swaps a frame drawn on the worker thread in for the canvas cells, and marks the cells that changed dirty.
+        The previous cells are kept to draw the next frame into.
+
+        Args:
+            frame: The finished frame.
+            draw: The function that drew it, redrawn if the canvas was resized meanwhile.
+        """
+        self._raster_worker = None
+        if frame.canvas_size != self._canvas_size or self._cells is None:
+            # the canvas was resized while the frame was drawn
+            self._pending_draw = self._pending_draw or draw
+        else:
+            assert frame._cells is not None
+            xs, ys = frame._cells.changed_cells(self._cells)
+            self._cells, frame._cells = frame._cells, self._cells
+            self._mark_dirty_cells(xs, ys)
+        self._spare_frame = frame
+        if self._pending_draw is not None:
+            self._start_raster_worker()
+
     def reset(self, size: Size | None = None, refresh: bool = True) -> None:
         """
         Resets the canvas to the specified size or to the current size if no size is provided.
         Clears buffers,styles and dirty cache, and resets the canvas size.
+        Layers are resized and cleared as well, sprites keep their content and position.
 
         Args:
             size: The new size for the canvas.
@@ -86,15 +379,20 @@ class ParCanvas(Widget):
         Returns:
             self for chaining.
         """
+        size = size or self._canvas_size
         if size:
-            self._canvas_size = size
-            self._canvas_region = Region(0, 0, size.width, size.height)
-
-        if self._canvas_size:
-            self._buffer = [[" " for _ in range(self._canvas_size.width)] for _ in range(self._canvas_size.height)]
-            self._styles = [["" for _ in range(self._canvas_size.width)] for _ in range(self._canvas_size.height)]
-
-        self._dirty.clear()
+            self._allocate(size)
+            for layer in self._canvas_layers:
+                layer._allocate(size)
+            if self._double_buffered:
+                if self._front is None or self._front.size != size:
+                    self._front = CellBuffer(size.width, size.height)
+                else:
+                    self._front.clear()
+            self._strips = [None] * size.height
+            self._dirty.reset(size)
+        else:
+            self._dirty.clear()
         self._batching = False
         if refresh:
             self.refresh()
@@ -120,514 +418,206 @@ class ParCanvas(Widget):
         """
         if self.batching:
             return self
-        return super().refresh(*self._dirty.values(), *regions, repaint=repaint, layout=layout, recompose=recompose)
+        regions = (*self._dirty.regions(), *regions)
+        if self._stats is not None and regions:
+            self._stats.record_flush(list(regions))
+        return super().refresh(*regions, repaint=repaint, layout=layout, recompose=recompose)
 
-    def render_line(self, y: int) -> Strip:
+    @property
+    def double_buffered(self) -> bool:
         """
-        Renders a single line of the canvas at the given y-coordinate.
-
-        Args:
-            y: The y-coordinate of the line.
-        Returns:
-            A Strip representing the line.
+        Whether the canvas draws into a back buffer.
+        The back buffer is diffed against the displayed front buffer when batching ends,
+        and only the cells that changed are copied over and refreshed.
         """
-        if self._canvas_size is None:
-            return Strip([Segment("")])
-        if y < self._canvas_size.height:
-            return Strip(
-                [Segment(char, style=Style.parse(style)) for char, style in zip(self._buffer[y], self._styles[y])]
-            )
-        return Strip([])
+        return self._double_buffered
 
-    def mark_dirty(self, region: Region) -> None:
+    def _present(self, region: Region | None = None) -> None:
         """
-        Marks a region as dirty for refreshing.
-        If batching is enabled, the region is added to the dirty region set.
-        If batching is disabled, the region is immediately sent to textual for refresh.
+        Copies the cells of the back buffer that differ from the front buffer and marks them dirty.
 
         Args:
-            region: The region to mark as dirty.
+            region: Limit the comparison to this region. Defaults to the whole canvas.
         """
-        if self._batching:
-            if region.y not in self._dirty:
-                self._dirty[region.y] = region
-            else:
-                self._dirty[region.y] = self._dirty[region.y].union(region)
+        assert self._cells is not None and self._front is not None
+        xs, ys = self._cells.present(self._front, region)
+        if not len(xs):
             return
-        self.refresh(region)
+        strips = self._strips
+        for y in np.unique(ys).tolist():
+            strips[y] = None
+        self._dirty.add_cells(xs, ys)
 
-    def set_pixel(self, x: int, y: int, char: str = "█", style: str = "white") -> None:
+    def render_line(self, y: int) -> Strip:
         """
-        Sets a single pixel at the given coordinates.
-        Also marks it dirty for refreshing.
+        Renders a single line of the canvas at the given y-coordinate.
 
         Args:
-            x: The x-coordinate of the pixel.
-            y: The y-coordinate of the pixel.
-            char: The character to draw.
-            style: The style to apply to the character.
-        """
-        assert self._canvas_region is not None
-        if not self._canvas_region.contains(x, y):
-            # coordinates are outside canvas
-            return
-
-        self._buffer[y][x] = char
-        self._styles[y][x] = style
-        r = Region(x, y, 1, 1)
-        self.mark_dirty(r)
-
-    def set_pixels(
-        self,
-        coordinates: Iterable[tuple[int, int]],
-        char: str = "█",
-        style: str = "white",
-    ) -> None:
+            y: The y-coordinate of the line.
+        Returns:
+            A Strip representing the line.
         """
-        Sets multiple pixels at the given coordinates.
-        Also marks them dirty for refreshing.
+        if self._canvas_size is None:
+            return Strip([Segment("")])
+        if y >= self._canvas_size.height:
+            return Strip([])
+        strip = self._strips[y]
+        if self._stats is not None:
+            self._stats.render_line_calls += 1
+            if strip is None:
+                started = perf_counter()
+                strip = self._strips[y] = self._render_row(y)
+                self._stats.rows_rendered += 1
+                self._stats.render_time += perf_counter() - started
+            return strip
+        if strip is None:
+            strip = self._strips[y] = self._render_row(y)
+        return strip
+
+    def _row_cells(self, y: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the displayed codepoints and style ids of a row, with the layers and their sprites composited
+        over the canvas cells in z-order.
 
         Args:
-            coordinates: An iterable of tuples representing the coordinates of the pixels.
-            char: The character to draw.
-            style: The style to apply to the character.
-        """
-        for x, y in coordinates:
-            self.set_pixel(x, y, char, style)
+            y: The y-coordinate of the row.
+        Returns:
+            The codepoints and style ids of the row.
+        """
+        cells = self._front if self._front is not None else self._cells
+        assert cells is not None
+        chars = cells.chars[y]
+        style_ids = cells.styles[y]
+        if self._canvas_layers:
+            chars = chars.copy()
+            style_ids = style_ids.copy()
+            for layer in self._canvas_layers:
+                layer.composite_row(y, chars, style_ids)
+        return chars, style_ids
 
-    def set_hires_pixels(
-        self,
-        coordinates: Iterable[tuple[float, float]],
-        hires_mode: HiResMode = HiResMode.HALFBLOCK,
-        style: str = "white",
-    ) -> None:
+    def mark_dirty(self, region: Region) -> None:
         """
-        Sets multiple pixels at the given coordinates using the specified Hi-Res mode.
+        Marks a region as dirty for refreshing.
+        If batching is enabled, the region is added to the dirty tracker.
+        If batching is disabled, the region is immediately sent to textual for refresh.
+        The cached strips of the rows the region touches are dropped.
 
-        Args:
-            coordinates: An iterable of tuples representing the coordinates of the pixels.
-            hires_mode: The Hi-Res mode to use.
-            style: The style to apply to the character.
-        """
-        assert self._canvas_size and self._canvas_region
-        pixel_size = hires_sizes[hires_mode]
-        hires_size_x = self._canvas_size.width * pixel_size.width
-        hires_size_y = self._canvas_size.height * pixel_size.height
-        hires_buffer = np.zeros(
-            shape=(hires_size_y, hires_size_x),
-            dtype=bool,
-        )
-        pixel_info = pixels.get(hires_mode)
-        assert pixel_info is not None
-        for x, y in coordinates:
-            if not self._canvas_region.contains(floor(x), floor(y)):
-                # coordinates are outside canvas
-                continue
-            hires_buffer[floor(y * pixel_size.height)][floor(x * pixel_size.width)] = True
-        for x in range(0, hires_size_x, pixel_size.width):
-            for y in range(0, hires_size_y, pixel_size.height):
-                subarray = hires_buffer[y : y + pixel_size.height, x : x + pixel_size.width]
-                subpixels = tuple(int(v) for v in subarray.flat)
-                if char := pixel_info[subpixels]:
-                    self.set_pixel(
-                        x // pixel_size.width,
-                        y // pixel_size.height,
-                        char=char,
-                        style=style,
-                    )
-
-    def get_pixel(self, x: int, y: int) -> tuple[str, str]:
-        """
-        Retrieves the character and style of a single pixel at the given coordinates.
+        In double buffered mode the back buffer is presented instead, see `double_buffered`.
 
         Args:
-            x: The x-coordinate of the pixel.
-            y: The y-coordinate of the pixel.
-        Returns:
-            A tuple containing the character and style of the pixel.
+            region: The region to mark as dirty.
         """
-        return self._buffer[y][x], self._styles[y][x]
+        if self._stats is not None:
+            self._stats.pixels_written += region.area
+        self._invalidate(region)
 
-    def draw_line(self, x0: int, y0: int, x1: int, y1: int, char: str = "█", style: str = "white") -> None:
+    def _invalidate(self, region: Region) -> None:
         """
-        Draws a line from (x0, y0) to (x1, y1) using the specified character and style.
-        Also marks the line's pixels dirty for refreshing.
+        Marks a region of the canvas cells dirty, presenting it right away in double buffered mode when not batching.
 
         Args:
-            x0: The x-coordinate of the start of the line.
-            y0: The y-coordinate of the start of the line.
-            x1: The x-coordinate of the end of the line.
-            y1: The y-coordinate of the end of the line.
-            char: The character to draw.
-            style: The style to apply to the character.
-        """
-        assert self._canvas_region
-        if not self._canvas_region.contains(x0, y0) and not self._canvas_region.contains(x1, y1):
-            return
-        self.set_pixels(self._get_line_coordinates(x0, y0, x1, y1), char, style)
-
-    def draw_lines(
-        self,
-        coordinates: Iterable[tuple[int, int, int, int]],
-        char: str = "█",
-        style: str = "white",
-    ) -> None:
-        """
-        Draws multiple lines from given coordinates using the specified character and style.
-        Also marks the lines' pixels dirty for refreshing.
-
-        Args:
-            coordinates: An iterable of tuples representing the coordinates of the lines.
-            char: The character to draw.
-            style: The style to apply to the character.
+            region: The region to mark as dirty.
         """
-        for x0, y0, x1, y1 in coordinates:
-            self.draw_line(x0, y0, x1, y1, char, style)
+        if self._front is not None:
+            if not self._batching:
+                self._present(region)
+                self.refresh()
+                self._dirty.clear()
+            return
+        self._damage(region)
 
-    def draw_hires_line(
-        self,
-        x0: float,
-        y0: float,
-        x1: float,
-        y1: float,
-        hires_mode: HiResMode = HiResMode.HALFBLOCK,
-        style: str = "white",
-    ) -> None:
+    def _mark_dirty_cells(self, xs: np.ndarray, ys: np.ndarray) -> None:
         """
-        Draws a high-resolution line from (x0, y0) to (x1, y1) using the specified character and style.
-        Also marks the line's pixels dirty for refreshing.
+        Marks individual cells as dirty for refreshing.
+        If batching is enabled, the cells are added to the dirty tracker as tight spans.
+        If batching is disabled, their bounding box is immediately sent to textual for refresh.
 
         Args:
-            x0: The x-coordinate of the start of the line.
-            y0: The y-coordinate of the start of the line.
-            x1: The x-coordinate of the end of the line.
-            y1: The y-coordinate of the end of the line.
-            hires_mode: The high-resolution mode to use.
-            style: The style to apply to the character.
+            xs: Array of x-coordinates of cells inside the canvas.
+            ys: Array of y-coordinates of cells inside the canvas.
         """
-        self.draw_hires_lines([(x0, y0, x1, y1)], hires_mode, style)
+        if not len(xs):
+            return
+        if self._stats is not None:
+            self._stats.pixels_written += len(xs)
+        if self._front is not None:
+            x0 = int(xs.min())
+            y0 = int(ys.min())
+            self._invalidate(Region(x0, y0, int(xs.max()) - x0 + 1, int(ys.max()) - y0 + 1))
+            return
+        self._damage_cells(xs, ys)
 
-    def draw_hires_lines(
-        self,
-        coordinates: Iterable[tuple[float, float, float, float]],
-        hires_mode: HiResMode = HiResMode.HALFBLOCK,
-        style: str = "white",
-    ) -> None:
+    def _damage(self, region: Region) -> None:
         """
-        Draws multiple high-resolution lines from given coordinates using the specified character and style.
-        Also marks the lines' pixels dirty for refreshing.
+        Marks a region of the displayed canvas as changed, bypassing the back buffer.
+        If batching is enabled, the region is added to the dirty tracker.
+        If batching is disabled, the region is immediately sent to textual for refresh.
+        The cached strips of the rows the region touches are dropped.
 
         Args:
-            coordinates: An iterable of tuples representing the coordinates of the lines.
-            hires_mode: The high-resolution mode to use.
-            style: The style to apply to the character.
-        """
-        assert self._canvas_region
-        pixel_size = hires_sizes[hires_mode]
-        pixels = []
-        for x0, y0, x1, y1 in coordinates:
-            if not self._canvas_region.contains(floor(x0), floor(y0)) and not self._canvas_region.contains(
-                floor(x1), floor(y1)
-            ):
-                # coordinates are outside canvas
-                continue
-            coords = self._get_line_coordinates(
-                floor(x0 * pixel_size.width),
-                floor(y0 * pixel_size.height),
-                floor(x1 * pixel_size.width),
-                floor(y1 * pixel_size.height),
-            )
-            pixels.extend(
-                [
-                    (
-                        x / pixel_size.width,
-                        y / pixel_size.height,
-                    )
-                    for x, y in coords
-                ]
-            )
-        self.set_hires_pixels(pixels, hires_mode, style)
-
-    def draw_rectangle_box(
-        self,
-        x0: int,
-        y0: int,
-        x1: int,
-        y1: int,
-        thickness: int = 1,
-        style: str = "white",
-    ) -> None:
+            region: The region that changed.
         """
-        Draw a rectangle box with the specified thickness and style.
-
-        Args:
-            x0: The x-coordinate of the top-left corner.
-            y0: The y-coordinate of the top-left corner.
-            x1: The x-coordinate of the bottom-right corner.
-            y1: The y-coordinate of the bottom-right corner.
-            thickness: The thickness of the box.
-            style: The style to apply to the characters.
-        """
-        T = thickness
-        x0, x1 = sorted((x0, x1))
-        y0, y1 = sorted((y0, y1))
-        self.set_pixel(x0, y0, char=get_box((0, T, T, 0)), style=style)
-        self.set_pixel(x1, y0, char=get_box((0, 0, T, T)), style=style)
-        self.set_pixel(x1, y1, char=get_box((T, 0, 0, T)), style=style)
-        self.set_pixel(x0, y1, char=get_box((T, T, 0, 0)), style=style)
-        for y in y0, y1:
-            self.draw_line(x0 + 1, y, x1 - 1, y, char=get_box((0, T, 0, T)), style=style)
-        for x in x0, x1:
-            self.draw_line(x, y0 + 1, x, y1 - 1, char=get_box((T, 0, T, 0)), style=style)
-
-    def draw_filled_circle(self, cx: int, cy: int, radius: int, style: str = "white") -> None:
-        """
-        Draw a filled circle using Bresenham's algorithm. Compensates for 2:1 aspect ratio.
-        Also marks the circle's pixels dirty for refreshing.
-
-        Args:
-            cx (int): X-coordinate of the center of the circle.
-            cy (int): Y-coordinate of the center of the circle.
-            radius (int): Radius of the circle.
-            style (str): Style of the pixels to be drawn.
-        """
-
-        def draw_horizontal_line(y, x1, x2):
-            for x in range(x1, x2 + 1):
-                self.set_pixel(x, y, char="█", style=style)
-
-        x = 0
-        y = radius
-        d = 3 - 2 * radius
-
-        while y >= x:
-            # Adjust y-coordinates to account for 2:1 aspect ratio
-            y1 = cy + (y + 1) // 2
-            y2 = cy + (x + 1) // 2
-            y3 = cy - x // 2
-            y4 = cy - y // 2
-
-            draw_horizontal_line(y1, cx - x, cx + x)
-            draw_horizontal_line(y4, cx - x, cx + x)
-            draw_horizontal_line(y2, cx - y, cx + y)
-            draw_horizontal_line(y3, cx - y, cx + y)
-
-            x += 1
-            if d > 0:
-                y -= 1
-                d = d + 4 * (x - y) + 10
-            else:
-                d = d + 4 * x + 6
+        strips = self._strips
+        y0 = max(region.y, 0)
+        y1 = min(region.bottom, len(strips))
+        if y0 < y1:
+            strips[y0:y1] = [None] * (y1 - y0)
+        if self._batching:
+            self._dirty.add(region)
+            return
+        self.refresh(region)
 
-    def draw_filled_circle_highres(
-        self, cx: float, cy: float, radius: float, hires_mode: HiResMode = HiResMode.HALFBLOCK, style: str = "white"
-    ) -> None:
+    def _damage_cells(self, xs: np.ndarray, ys: np.ndarray) -> None:
         """
-        Draw a filled circle, with high-resolution support.
-        Also marks the circle's pixels dirty for refreshing.
+        Marks individual cells of the displayed canvas as changed, bypassing the back buffer.
+        If batching is enabled, the cells are added to the dirty tracker as tight spans.
+        If batching is disabled, their bounding box is immediately sent to textual for refresh.
 
         Args:
-            cx (float): X-coordinate of the center of the circle.
-            cy (float): Y-coordinate of the center of the circle.
-            radius (float): Radius of the circle.
-            hires_mode (HiResMode): The high-resolution mode to use.
-            style (str): Style of the pixels to be drawn.
+            xs: Array of x-coordinates of cells inside the canvas.
+            ys: Array of y-coordinates of cells inside the canvas.
         """
-        pixels = []
-        pixel_size = hires_sizes[hires_mode]
-        scale_x = pixel_size.width
-        scale_y = pixel_size.height
-
-        # Calculate the aspect ratio
-        aspect_ratio = scale_x / scale_y
-
-        for y in range(int(-radius * scale_y), int(radius * scale_y) + 1):
-            for x in range(int(-radius * scale_x), int(radius * scale_x) + 1):
-                if (x / scale_x) ** 2 + (y / (scale_y * aspect_ratio)) ** 2 <= radius**2:
-                    pixels.append((cx + x / scale_x, cy + y / scale_y))
+        if not len(xs):
+            return
+        if not self._batching:
+            x0 = int(xs.min())
+            y0 = int(ys.min())
+            self._damage(Region(x0, y0, int(xs.max()) - x0 + 1, int(ys.max()) - y0 + 1))
+            return
+        strips = self._strips
+        for y in np.unique(ys).tolist():
+            strips[y] = None
+        self._dirty.add_cells(xs, ys)
 
-        self.set_hires_pixels(pixels, hires_mode, style)
+    @property
+    def canvas_layers(self) -> list[CanvasLayer]:
+        """The layers composited over the canvas, from bottom to top."""
+        return list(self._canvas_layers)
 
-    def draw_circle(self, cx: int, cy: int, radius: int, style: str = "white") -> None:
+    def add_layer(self, z: int = 0) -> CanvasLayer:
         """
-        Draw a circle using Bresenham's algorithm. Compensates for 2:1 aspect ratio.
+        Creates a transparent layer over the canvas.
+        Layers with the same z are stacked in the order they were added.
 
         Args:
-            cx (int): X-coordinate of the center of the circle.
-            cy (int): Y-coordinate of the center of the circle.
-            radius (int): Radius of the circle.
-            style (str): Style of the pixels to be drawn.
-        """
-        x: float = radius
-        y: float = 0
-        decision: float = 1 - radius
-
-        while y <= x:
-            self.set_pixel(cx + x, cy + y // 2, "█", style)
-            self.set_pixel(cx - x, cy + y // 2, "█", style)
-            self.set_pixel(cx + x, cy - y // 2, "█", style)
-            self.set_pixel(cx - x, cy - y // 2, "█", style)
-            self.set_pixel(cx + y, cy + x // 2, "█", style)
-            self.set_pixel(cx - y, cy + x // 2, "█", style)
-            self.set_pixel(cx + y, cy - x // 2, "█", style)
-            self.set_pixel(cx - y, cy - x // 2, "█", style)
-
-            y += 1
-            if decision <= 0:
-                decision += 2 * y + 1
-            else:
-                x -= 1
-                decision += 2 * (y - x) + 1
-
-    def draw_circle_highres(
-        self, cx: float, cy: float, radius: float, hires_mode: HiResMode = HiResMode.HALFBLOCK, style: str = "white"
-    ) -> None:
+            z: The stacking order of the layer. Layers with a higher z are drawn on top.
+        Returns:
+            The new layer.
         """
-        Draw a circle with high-resolution support using Bresenham's algorithm. Compensates for 2:1 aspect ratio.
-        Also marks the circle's pixels dirty for refreshing.
+        layer = CanvasLayer(self, z)
+        self._canvas_layers.append(layer)
+        self._sort_layers()
+        return layer
 
-        Args:
-            cx (float): X-coordinate of the center of the circle.
-            cy (float): Y-coordinate of the center of the circle.
-            radius (float): Radius of the circle.
-            hires_mode (HiResMode): The high-resolution mode to use.
-            style (str): Style of the pixels to be drawn.
-        """
-        pixels = []
-        pixel_size = hires_sizes[hires_mode]
-        scale_x = pixel_size.width
-        scale_y = pixel_size.height
-
-        # Calculate the aspect ratio
-        aspect_ratio = scale_x / scale_y
-
-        x = radius
-        y = 0
-        decision = 1 - radius
-
-        while y <= x:
-            pixels.extend(
-                [
-                    (cx + x, cy + y * aspect_ratio),
-                    (cx - x, cy + y * aspect_ratio),
-                    (cx + x, cy - y * aspect_ratio),
-                    (cx - x, cy - y * aspect_ratio),
-                    (cx + y, cy + x * aspect_ratio),
-                    (cx - y, cy + x * aspect_ratio),
-                    (cx + y, cy - x * aspect_ratio),
-                    (cx - y, cy - x * aspect_ratio),
-                ]
-            )
-
-            y += 0.5
-            if decision <= 0:
-                decision += 2 * y + 1
-            else:
-                x -= 0.5
-                decision += 2 * (y - x) + 1
-
-        self.set_hires_pixels(pixels, hires_mode, style)
-
-    def write_text(
-        self,
-        x: int,
-        y: int,
-        text: str,
-        align: TextAlign = TextAlign.LEFT,
-    ) -> None:
+    def remove_layer(self, layer: CanvasLayer) -> None:
         """
-        Write text to the canvas at the specified position, with support for markup.
-        Also marks the texts pixels dirty for refreshing.
+        Removes a layer and restores the cells it covered.
 
         Args:
-            x (int): X-coordinate of the left edge of the text.
-            y (int): Y-coordinate of the baseline of the text.
-            text (str): Text to be written.
-            align (TextAlign): The alignment of the text within the canvas.
+            layer: The layer to remove.
         """
-        assert self._canvas_size is not None
-        if y < 0 or y >= self._canvas_size.height:
-            return
-
-        # parse markup
-        rich_text = Text.from_markup(text)
-        # store plain text
-        plain_text = rich_text.plain
-        # store styles for each individual character
-        rich_styles = []
-        for c in rich_text.divide(range(1, len(plain_text))):
-            style = Style()
-            for span in c._spans:
-                style += Style.parse(span.style)
-            rich_styles.append(style)
-
-        if align == TextAlign.RIGHT:
-            x -= len(plain_text) - 1
-        elif align == TextAlign.CENTER:
-            div, mod = divmod(len(plain_text), 2)
-            x -= div
-            if mod == 0:
-                # even number of characters, shift one to the right since I just
-                # like that better -- DF
-                x += 1
-
-        if x <= -len(plain_text) or x >= self._canvas_size.width:
-            # no part of text falls inside the canvas
-            return
-
-        overflow_left = -x
-        overflow_right = x + len(plain_text) - self._canvas_size.width
-        if overflow_left > 0:
-            buffer_left = 0
-            text_left = overflow_left
-        else:
-            buffer_left = x
-            text_left = 0
-        if overflow_right > 0:
-            buffer_right = None
-            text_right = -overflow_right
-        else:
-            buffer_right = x + len(plain_text)
-            text_right = None
-
-        self._buffer[y][buffer_left:buffer_right] = plain_text[text_left:text_right]
-        self._styles[y][buffer_left:buffer_right] = [str(s) for s in rich_styles[text_left:text_right]]
-        assert len(self._buffer[y]) == self._canvas_size.width
-        assert len(self._styles[y]) == self._canvas_size.width
-        self.mark_dirty(Region(buffer_left, y, (buffer_right or 0) - buffer_left, 1))
-
-    def _get_line_coordinates(self, x0: int, y0: int, x1: int, y1: int) -> Iterator[tuple[int, int]]:
-        """Get all pixel coordinates on the line between two points.
+        layer._damage_all()
+        self._canvas_layers.remove(layer)
 
-        Algorithm was taken from
-        https://en.wikipedia.org/wiki/Bresenham%27s_line_algorithm and
-        translated to Python.
-
-        Args:
-            x0: starting point x coordinate
-            y0: starting point y coordinate
-            x1: end point x coordinate
-            y1: end point y coordinate
-
-        Yields:
-            Tuples of (x, y) coordinates that make up the line.
-        """
-        dx = abs(x1 - x0)
-        sx = 1 if x0 < x1 else -1
-        dy = -abs(y1 - y0)
-        sy = 1 if y0 < y1 else -1
-        error = dx + dy
-
-        while True:
-            yield x0, y0
-            e2 = 2 * error
-            if e2 >= dy:
-                if x0 == x1:
-                    break
-                error = error + dy
-                x0 = x0 + sx
-            if e2 <= dx:
-                if y0 == y1:
-                    break
-                error = error + dx
-                y0 = y0 + sy
+    def _sort_layers(self) -> None:
+        self._canvas_layers.sort(key=lambda layer: layer.z)
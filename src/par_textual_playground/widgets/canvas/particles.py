@@ -0,0 +1,210 @@
+"""Vectorized particle system for ParCanvas."""
+
+from collections.abc import Sequence
+
+import numpy as np
+from textual.geometry import Size
+
+from par_textual_playground.widgets.canvas.canvas_raster import CanvasRaster
+from par_textual_playground.widgets.canvas.hires import HiResMode, hires_sizes
+
+CELL_ASPECT = 2.0
+"""Height of a cell relative to its width. Physics runs in square units, so circles stay round."""
+
+_HALF_NEIGHBOURHOOD = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+"""Grid offsets that visit every pair of neighbouring grid cells exactly once."""
+
+
+class ParticleSystem:
+    """
+    Round particles bouncing off the canvas edges and each other.
+
+    Positions, velocities, radii and styles live in NumPy arrays and every step updates all particles at once.
+    Collisions are found with a uniform grid spatial hash: particles are sorted by grid cell, and each
+    particle is only tested against the particles in its own and neighbouring grid cells, so finding
+    collisions costs time proportional to the number of particles rather than its square.
+    Positions and velocities are in cells and cells per second, like the drawing API of the canvas.
+    """
+
+    def __init__(self, restitution: float = 1.0) -> None:
+        """
+        Args:
+            restitution: The fraction of the approaching speed kept by colliding particles. 1 is perfectly elastic.
+        """
+        self.restitution = restitution
+        self.positions = np.empty((0, 2))
+        """(N, 2) array of particle centers in cells."""
+        self.velocities = np.empty((0, 2))
+        """(N, 2) array of particle velocities in cells per second."""
+        self.radii = np.empty(0)
+        """Particle radii in cells. Particles are drawn half as tall as wide in cells, so they look round."""
+        self.style_index = np.empty(0, dtype=np.intp)
+        """Index into `styles` for every particle."""
+        self.styles: list[str] = []
+        """The distinct styles particles are drawn with."""
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def add(
+        self,
+        positions: np.ndarray | Sequence[tuple[float, float]],
+        velocities: np.ndarray | Sequence[tuple[float, float]],
+        radii: np.ndarray | float = 0.5,
+        style: str = "white",
+    ) -> np.ndarray:
+        """
+        Add particles.
+
+        Args:
+            positions: An (N, 2) array of centers in cells.
+            velocities: An (N, 2) array of velocities in cells per second.
+            radii: The radius of every particle, or one radius for all of them.
+            style: The style to draw the new particles with.
+        Returns:
+            The indices of the new particles.
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        count = len(positions)
+        if style not in self.styles:
+            self.styles.append(style)
+        first = len(self)
+        self.positions = np.concatenate([self.positions, positions])
+        self.velocities = np.concatenate([self.velocities, np.broadcast_to(velocities, (count, 2))])
+        self.radii = np.concatenate([self.radii, np.broadcast_to(np.asarray(radii, dtype=np.float64), count)])
+        self.style_index = np.concatenate([self.style_index, np.full(count, self.styles.index(style))])
+        return np.arange(first, first + count)
+
+    def remove(self, indices: np.ndarray) -> None:
+        """
+        Remove particles. The indices of the particles after them shift down.
+
+        Args:
+            indices: The indices of the particles to remove.
+        """
+        keep = np.ones(len(self), dtype=bool)
+        keep[indices] = False
+        self.positions = self.positions[keep]
+        self.velocities = self.velocities[keep]
+        self.radii = self.radii[keep]
+        self.style_index = self.style_index[keep]
+
+    def step(self, dt: float, size: Size) -> None:
+        """
+        Advance all particles by dt seconds, then bounce them off the edges of the canvas and each other.
+
+        Args:
+            dt: The time step in seconds.
+            size: The size of the canvas in cells.
+        """
+        if not len(self):
+            return
+        self.positions += self.velocities * dt
+        self._bounce_walls(size)
+        self._collide()
+
+    def _bounce_walls(self, size: Size) -> None:
+        """Reflect particles that crossed an edge of the canvas back inside, pointing their velocity inwards."""
+        for axis, extent, radii in (
+            (0, size.width, self.radii),
+            (1, size.height, self.radii / CELL_ASPECT),
+        ):
+            position = self.positions[:, axis]
+            velocity = self.velocities[:, axis]
+            low = position < radii
+            high = position > extent - radii
+            position[low] = np.minimum(radii[low], extent / 2)
+            position[high] = np.maximum(extent - radii[high], extent / 2)
+            velocity[low] = np.abs(velocity[low])
+            velocity[high] = -np.abs(velocity[high])
+
+    def collision_pairs(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find all pairs of overlapping particles with a uniform grid spatial hash.
+
+        Returns:
+            Arrays i and j with i < j for every overlapping pair of particles i and j.
+        """
+        if len(self) < 2:
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty
+        points = self.positions * (1, CELL_ASPECT)
+        # grid cells as large as the largest particle, so overlapping particles are in neighbouring grid cells
+        grid = max(2 * float(self.radii.max()), 1e-9)
+        gx, gy = np.floor(points / grid).astype(np.int64).T
+        gx -= gx.min() - 1
+        gy -= gy.min() - 1
+        stride = int(gy.max()) + 2
+        keys = gx * stride + gy
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+
+        pairs_i = []
+        pairs_j = []
+        for ox, oy in _HALF_NEIGHBOURHOOD:
+            # the queries are sorted too, which makes searchsorted several times faster
+            neighbour = sorted_keys + (ox * stride + oy)
+            start = np.searchsorted(sorted_keys, neighbour, "left")
+            counts = np.searchsorted(sorted_keys, neighbour, "right") - start
+            i = np.repeat(order, counts)
+            offset = np.arange(len(i)) - np.repeat(np.cumsum(counts) - counts, counts)
+            j = order[np.repeat(start, counts) + offset]
+            if (ox, oy) == (0, 0):
+                # a grid cell is paired with itself, so keep every pair once and skip self pairs
+                keep = i < j
+                i, j = i[keep], j[keep]
+            pairs_i.append(i)
+            pairs_j.append(j)
+        i = np.concatenate(pairs_i)
+        j = np.concatenate(pairs_j)
+        distance = np.hypot(*(points[j] - points[i]).T)
+        overlapping = distance < self.radii[i] + self.radii[j]
+        i, j = i[overlapping], j[overlapping]
+        return np.minimum(i, j), np.maximum(i, j)
+
+    def _collide(self) -> None:
+        """Separate overlapping particles and exchange momentum along their line of centers. Mass goes with area."""
+        i, j = self.collision_pairs()
+        if not len(i):
+            return
+        scale = np.array([1.0, CELL_ASPECT])
+        delta = (self.positions[j] - self.positions[i]) * scale
+        distance = np.maximum(np.hypot(*delta.T), 1e-9)
+        normal = delta / distance[:, np.newaxis]
+        mass_i = self.radii[i] ** 2
+        mass_j = self.radii[j] ** 2
+        total = np.maximum(mass_i + mass_j, 1e-12)
+
+        # push the pair apart, the lighter particle moving further
+        overlap = (self.radii[i] + self.radii[j] - distance)[:, np.newaxis] * normal / scale
+        np.add.at(self.positions, i, -overlap * (mass_j / total)[:, np.newaxis])
+        np.add.at(self.positions, j, overlap * (mass_i / total)[:, np.newaxis])
+
+        # only pairs that are still approaching exchange momentum
+        approach = np.einsum("ij,ij->i", (self.velocities[i] - self.velocities[j]) * scale, normal)
+        impulse = np.where(approach > 0, (1 + self.restitution) * approach * mass_i * mass_j / total, 0.0)
+        change = normal * impulse[:, np.newaxis] / scale
+        np.add.at(self.velocities, i, -change / np.maximum(mass_i, 1e-12)[:, np.newaxis])
+        np.add.at(self.velocities, j, change / np.maximum(mass_j, 1e-12)[:, np.newaxis])
+
+    def draw(self, canvas: CanvasRaster, hires_mode: HiResMode = HiResMode.BRAILLE) -> None:
+        """
+        Draw all particles as filled circles, with one `draw_markers` call per style and radius,
+        so every radius is stamped from the same cache of rasterized shapes as the rest of the canvas.
+
+        Args:
+            canvas: The canvas or raster to draw on.
+            hires_mode: The Hi-Res mode to draw with.
+        """
+        if not len(self):
+            return
+        pixel_size = hires_sizes[hires_mode]
+        # radii are snapped to sub-pixels so particles of nearly the same size share a stamp
+        snapped = np.rint(self.radii * pixel_size.width) / pixel_size.width
+        radii, radius_index = np.unique(snapped, return_inverse=True)
+        for style_index, style in enumerate(self.styles):
+            in_style = self.style_index == style_index
+            for k, radius in enumerate(radii.tolist()):
+                centers = self.positions[in_style & (radius_index == k)]
+                if len(centers):
+                    canvas.draw_markers(centers, radius, hires_mode, style)
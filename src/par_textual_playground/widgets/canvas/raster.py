@@ -0,0 +1,238 @@
+"""Vectorized rasterizers for ParCanvas. Each function rasterizes a whole batch of shapes in one go."""
+
+from collections.abc import Iterable
+
+import numpy as np
+from textual.geometry import Region
+
+
+def as_lines(coordinates: Iterable[tuple[float, float, float, float]] | np.ndarray) -> np.ndarray:
+    """
+    Convert line coordinates into an (N, 4) float array.
+
+    Args:
+        coordinates: An iterable of (x0, y0, x1, y1) tuples or an array of shape (N, 4).
+    Returns:
+        An (N, 4) float array.
+    """
+    if not isinstance(coordinates, np.ndarray):
+        coordinates = list(coordinates)
+    return np.asarray(coordinates, dtype=np.float64).reshape(-1, 4)
+
+
+def line_points(
+    x0: np.ndarray,
+    y0: np.ndarray,
+    x1: np.ndarray,
+    y1: np.ndarray,
+    clip: Region | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Rasterize a batch of lines between integer end points.
+    Every line gets one point per step along its major axis, with the minor axis rounded to
+    the nearest integer, which gives the same pixels as Bresenham's algorithm up to tie-breaking.
+    When a clip region is given only the steps that can land inside it are generated, so the
+    work is proportional to the visible length of each line.
+
+    Args:
+        x0: Array of x-coordinates of the line starts.
+        y0: Array of y-coordinates of the line starts.
+        x1: Array of x-coordinates of the line ends.
+        y1: Array of y-coordinates of the line ends.
+        clip: The region of valid points.
+    Returns:
+        Arrays of x and y coordinates of all points of all lines.
+    """
+    x0 = np.asarray(x0, dtype=np.int64)
+    y0 = np.asarray(y0, dtype=np.int64)
+    dx = np.asarray(x1, dtype=np.int64) - x0
+    dy = np.asarray(y1, dtype=np.int64) - y0
+    steps = np.maximum(np.abs(dx), np.abs(dy))
+    first = np.zeros_like(steps)
+    last = steps
+    if clip is not None:
+        # clip against the pixel edges, so every step that rounds to a pixel inside is kept
+        t0, t1, visible = clip_lines(x0, y0, dx, dy, clip.x - 0.5, clip.y - 0.5, clip.right - 0.5, clip.bottom - 0.5)
+        first = np.clip(np.floor(t0 * steps), 0, steps).astype(np.int64)
+        last = np.clip(np.ceil(t1 * steps), 0, steps).astype(np.int64)
+        x0, y0, dx, dy, steps = x0[visible], y0[visible], dx[visible], dy[visible], steps[visible]
+        first, last = first[visible], last[visible]
+    counts = last - first + 1
+    line = np.repeat(np.arange(len(steps)), counts)
+    # position of every point along its own line
+    i = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + first[line]
+    n = np.maximum(steps, 1)[line]
+    return x0[line] + _scale(i, dx[line], n), y0[line] + _scale(i, dy[line], n)
+
+
+def clip_lines(
+    x0: np.ndarray,
+    y0: np.ndarray,
+    dx: np.ndarray,
+    dy: np.ndarray,
+    x_min: float,
+    y_min: float,
+    x_max: float,
+    y_max: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Clip a batch of lines against a rectangle with the Liang-Barsky algorithm.
+    Line k runs from (x0[k], y0[k]) at t = 0 to (x0[k] + dx[k], y0[k] + dy[k]) at t = 1.
+
+    Args:
+        x0: Array of x-coordinates of the line starts.
+        y0: Array of y-coordinates of the line starts.
+        dx: Array of x extents of the lines.
+        dy: Array of y extents of the lines.
+        x_min: Left edge of the rectangle.
+        y_min: Top edge of the rectangle.
+        x_max: Right edge of the rectangle.
+        y_max: Bottom edge of the rectangle.
+    Returns:
+        The parameters where each line enters and leaves the rectangle, and which lines are visible at all.
+    """
+    t0 = np.zeros(len(x0))
+    t1 = np.ones(len(x0))
+    visible = np.ones(len(x0), dtype=bool)
+    for p, q in (
+        (-dx, x0 - x_min),
+        (dx, x_max - x0),
+        (-dy, y0 - y_min),
+        (dy, y_max - y0),
+    ):
+        parallel = p == 0
+        # lines parallel to an edge are either fully outside or unaffected by it
+        visible &= ~(parallel & (q < 0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = q / p
+        t0 = np.where(p < 0, np.maximum(t0, r), t0)
+        t1 = np.where(p > 0, np.minimum(t1, r), t1)
+    visible &= t0 <= t1
+    return t0, t1, visible
+
+
+def _scale(i: np.ndarray, d: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """Round i * d / n to the nearest integer, symmetric around zero."""
+    return np.sign(d) * ((2 * i * np.abs(d) + n) // (2 * n))
+
+
+def circle_points(cx: int, cy: int, radius: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Rasterize the outline of a circle on the cell grid. Compensates for 2:1 aspect ratio.
+
+    Args:
+        cx: X-coordinate of the center of the circle.
+        cy: Y-coordinate of the center of the circle.
+        radius: Radius of the circle.
+    Returns:
+        Arrays of x and y coordinates of the outline.
+    """
+    # one octant, mirrored into the other seven
+    y = np.arange(0, radius + 1)
+    x = np.rint(np.sqrt(np.maximum(radius**2 - y**2, 0))).astype(np.int64)
+    keep = y <= x
+    x, y = x[keep], y[keep]
+    xs = np.concatenate([cx + x, cx - x, cx + x, cx - x, cx + y, cx - y, cx + y, cx - y])
+    ys = np.concatenate(
+        [cy + y // 2, cy + y // 2, cy - y // 2, cy - y // 2, cy + x // 2, cy + x // 2, cy - x // 2, cy - x // 2]
+    )
+    return xs, ys
+
+
+def disc_points(cx: int, cy: int, radius: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Rasterize a filled circle on the cell grid. Compensates for 2:1 aspect ratio.
+
+    Args:
+        cx: X-coordinate of the center of the circle.
+        cy: Y-coordinate of the center of the circle.
+        radius: Radius of the circle.
+    Returns:
+        Arrays of x and y coordinates of the cells inside the circle.
+    """
+    # one octant, every point of it gives the half width of four rows
+    x = np.arange(0, radius + 1)
+    y = np.rint(np.sqrt(np.maximum(radius**2 - x**2, 0))).astype(np.int64)
+    keep = y >= x
+    x, y = x[keep], y[keep]
+    rows = np.concatenate([cy + (y + 1) // 2, cy - y // 2, cy + (x + 1) // 2, cy - x // 2])
+    half_widths = np.concatenate([x, x, y, y])
+    # widest span of each row
+    order = np.lexsort((-half_widths, rows))
+    rows, half_widths = rows[order], half_widths[order]
+    first = np.flatnonzero(np.diff(rows, prepend=rows[0] - 1))
+    rows, half_widths = rows[first], half_widths[first]
+    return span_points(rows, cx - half_widths, cx + half_widths)
+
+
+def span_points(y: np.ndarray, x0: np.ndarray, x1: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Rasterize a batch of horizontal spans. Both ends are inclusive.
+
+    Args:
+        y: Array of y-coordinates of the spans.
+        x0: Array of x-coordinates of the span starts.
+        x1: Array of x-coordinates of the span ends.
+    Returns:
+        Arrays of x and y coordinates of all cells of all spans.
+    """
+    counts = np.maximum(x1 - x0 + 1, 0)
+    span = np.repeat(np.arange(len(counts)), counts)
+    i = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return x0[span] + i, y[span]
+
+
+def hires_circle_points(cx: float, cy: float, radius: float, scale_x: int, scale_y: int) -> np.ndarray:
+    """
+    Rasterize the outline of a circle at sub-pixel resolution. Compensates for 2:1 aspect ratio.
+
+    Args:
+        cx: X-coordinate of the center of the circle.
+        cy: Y-coordinate of the center of the circle.
+        radius: Radius of the circle.
+        scale_x: Number of sub-pixels per cell horizontally.
+        scale_y: Number of sub-pixels per cell vertically.
+    Returns:
+        An (N, 2) array of points in cell coordinates.
+    """
+    aspect_ratio = scale_x / scale_y
+    # one octant in half cell steps, mirrored into the other seven
+    y = np.arange(0, radius + 0.5, 0.5)
+    x = radius - np.rint((radius - np.sqrt(np.maximum(radius**2 - y**2, 0))) * 2) / 2
+    keep = y <= x
+    x, y = x[keep], y[keep]
+    xs = np.concatenate([cx + x, cx - x, cx + x, cx - x, cx + y, cx - y, cx + y, cx - y])
+    ys = np.concatenate(
+        [
+            cy + y * aspect_ratio,
+            cy + y * aspect_ratio,
+            cy - y * aspect_ratio,
+            cy - y * aspect_ratio,
+            cy + x * aspect_ratio,
+            cy + x * aspect_ratio,
+            cy - x * aspect_ratio,
+            cy - x * aspect_ratio,
+        ]
+    )
+    return np.column_stack([xs, ys])
+
+
+def hires_disc_points(cx: float, cy: float, radius: float, scale_x: int, scale_y: int) -> np.ndarray:
+    """
+    Rasterize a filled circle at sub-pixel resolution. Compensates for 2:1 aspect ratio.
+
+    Args:
+        cx: X-coordinate of the center of the circle.
+        cy: Y-coordinate of the center of the circle.
+        radius: Radius of the circle.
+        scale_x: Number of sub-pixels per cell horizontally.
+        scale_y: Number of sub-pixels per cell vertically.
+    Returns:
+        An (N, 2) array of points in cell coordinates.
+    """
+    aspect_ratio = scale_x / scale_y
+    x = np.arange(int(-radius * scale_x), int(radius * scale_x) + 1)
+    y = np.arange(int(-radius * scale_y), int(radius * scale_y) + 1)
+    inside = (x[np.newaxis, :] / scale_x) ** 2 + (y[:, np.newaxis] / (scale_y * aspect_ratio)) ** 2 <= radius**2
+    ys, xs = np.nonzero(inside)
+    return np.column_stack([cx + x[xs] / scale_x, cy + y[ys] / scale_y])
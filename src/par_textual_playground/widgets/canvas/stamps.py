@@ -0,0 +1,216 @@
+"""Cache of rasterized Hi-Res shapes that are stamped onto a canvas instead of rasterized again."""
+
+import enum
+import math
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from threading import Lock
+
+import numpy as np
+from textual.cache import LRUCache
+from textual.geometry import Region, Size
+
+from par_textual_playground.widgets.canvas import raster
+from par_textual_playground.widgets.canvas.hires import HiResMode, hires_sizes, pack_subpixels
+
+
+class Shape(enum.Enum):
+    """The shapes that can be stamped."""
+
+    DISC = enum.auto()
+    """A filled circle."""
+    CIRCLE = enum.auto()
+    """The outline of a circle."""
+
+
+@dataclass(frozen=True)
+class Stamp:
+    """
+    A shape rasterized once, as the sub-pixel bitmasks of the cells it covers.
+    Cell positions are offsets from the cell that holds the center.
+    """
+
+    region: Region
+    """The bounding box of the covered cells."""
+    packed: np.ndarray
+    """The sub-pixel bitmasks of the bounding box."""
+    dx: np.ndarray
+    """Horizontal cell offsets of the cells with at least one sub-pixel set."""
+    dy: np.ndarray
+    """Vertical cell offsets of the covered cells."""
+    masks: np.ndarray
+    """The sub-pixel bitmask of every covered cell."""
+
+
+_stamps: LRUCache[tuple[Shape, float, HiResMode, tuple[float, float]], Stamp] = LRUCache(1024)
+_lock = Lock()
+
+
+def get_stamp(shape: Shape, radius: float, hires_mode: HiResMode, phase: tuple[float, float]) -> Stamp:
+    """
+    Get a rasterized shape from the cache, rasterizing it on first use.
+
+    Args:
+        shape: The shape.
+        radius: The radius of the circle in cells.
+        hires_mode: The Hi-Res mode that decides the sub-pixel grid.
+        phase: The position of the center within its cell, in sub-pixels.
+    Returns:
+        The rasterized shape.
+    """
+    key = (shape, radius, hires_mode, phase)
+    with _lock:
+        stamp = _stamps.get(key)
+    if stamp is not None:
+        return stamp
+    pixel_size = hires_sizes[hires_mode]
+    pw, ph = pixel_size.width, pixel_size.height
+    cx = phase[0] / pw
+    cy = phase[1] / ph
+    if shape == Shape.DISC:
+        points = raster.hires_disc_points(cx, cy, radius, pw, ph)
+    else:
+        points = raster.hires_circle_points(cx, cy, radius, pw, ph)
+    region, packed = pack_subpixels(
+        np.floor(points[:, 0] * pw).astype(np.intp), np.floor(points[:, 1] * ph).astype(np.intp), hires_mode
+    )
+    dy, dx = np.nonzero(packed)
+    stamp = Stamp(region, packed, dx + region.x, dy + region.y, packed[dy, dx])
+    # stamps are shared by every canvas, so they must not be modified in place
+    for array in (stamp.packed, stamp.dx, stamp.dy, stamp.masks):
+        array.setflags(write=False)
+    with _lock:
+        _stamps.set(key, stamp)
+    return stamp
+
+
+@lru_cache(maxsize=1024)
+def _phase_breaks(shape: Shape, radius: float, hires_mode: HiResMode) -> tuple[float, ...]:
+    """
+    Get the fractions of a sub-pixel where moving the center changes which sub-pixels a shape covers.
+
+    The points of a shape sit at fixed offsets from its center, so a point changes sub-pixel exactly when the
+    fraction of the center crosses the fraction of minus its offset. Centers between the same two breaks
+    rasterize to the same sub-pixels, which makes the stamp for that interval exact for all of them.
+    """
+    if shape == Shape.DISC:
+        # the points of a disc are whole sub-pixels away from its center
+        return (0.0,)
+    # outline points are radius minus half cells away along either axis, scaled by the sub-pixel width
+    # on both axes because the vertical offsets are corrected for the aspect ratio
+    width = hires_sizes[hires_mode].width
+    offsets = np.array([0.0, 0.5, radius, -radius, radius + 0.5, -radius + 0.5]) * width
+    return tuple(np.unique(np.mod(offsets, 1.0)).tolist())
+
+
+def _phase(subpixel: float, breaks: tuple[float, ...], size: int) -> tuple[int, float]:
+    """
+    Split a position in sub-pixels along one axis into its cell and the representative position of its phase.
+    """
+    whole = math.floor(subpixel)
+    interval = bisect_right(breaks, subpixel - whole) - 1
+    end = breaks[interval + 1] if interval + 1 < len(breaks) else 1.0
+    cell, index = divmod(whole, size)
+    return cell, index + (breaks[interval] + end) / 2
+
+
+def _phases(subpixels: np.ndarray, breaks: tuple[float, ...], size: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Split positions in sub-pixels along one axis into their cells and phases, like `_phase` for many positions.
+
+    Returns:
+        The cells, the phases as the index of the sub-pixel in its cell times the number of breaks plus
+        the index of the interval between breaks, and the representative position of every phase.
+    """
+    whole = np.floor(subpixels)
+    interval = np.searchsorted(breaks, subpixels - whole, "right") - 1
+    middles = (np.array(breaks) + np.array([*breaks[1:], 1.0])) / 2
+    index = (whole.astype(np.intp) % size) * len(breaks) + interval
+    positions = np.repeat(np.arange(size), len(breaks)) + np.tile(middles, size)
+    return whole.astype(np.intp) // size, index, positions
+
+
+def stamp_shape(
+    cx: float, cy: float, shape: Shape, radius: float, hires_mode: HiResMode, size: Size
+) -> tuple[Region, np.ndarray]:
+    """
+    Stamp a cached shape at one center. The stamp is cut out of the cached masks without any scatter,
+    which keeps drawing a single shape cheaper than rasterizing it. The result is the same
+    as rasterizing the shape at the center.
+
+    Args:
+        cx: X-coordinate of the center in cells.
+        cy: Y-coordinate of the center in cells.
+        shape: The shape.
+        radius: The radius of the circle in cells.
+        hires_mode: The Hi-Res mode that decides the sub-pixel grid.
+        size: The size of the canvas in cells. Cells outside it are dropped.
+    Returns:
+        The touched cells clipped to the canvas and an array of masks with the shape of that region.
+    """
+    pixel_size = hires_sizes[hires_mode]
+    breaks = _phase_breaks(shape, radius, hires_mode)
+    cell_x, phase_x = _phase(cx * pixel_size.width, breaks, pixel_size.width)
+    cell_y, phase_y = _phase(cy * pixel_size.height, breaks, pixel_size.height)
+    stamp = get_stamp(shape, radius, hires_mode, (phase_x, phase_y))
+    placed = stamp.region.translate((cell_x, cell_y))
+    region = placed.intersection(Region(0, 0, size.width, size.height))
+    if not region.area:
+        return region, np.zeros((0, 0), dtype=np.uint8)
+    x0, y0, x1, y1 = region.translate((-placed.x, -placed.y)).corners
+    return region, stamp.packed[y0:y1, x0:x1]
+
+
+def stamp_shapes(
+    centers: np.ndarray, shape: Shape, radius: float, hires_mode: HiResMode, size: Size, owners: bool = False
+) -> tuple[Region, np.ndarray, np.ndarray | None]:
+    """
+    Stamp a cached shape at many centers and pack the result into one sub-pixel bitmask per cell.
+    Centers are grouped by phase, so only a handful of stamps are needed however many centers there are,
+    and every stamp is placed at all its centers with one vectorized scatter. The result is the same
+    as rasterizing the shape at every center.
+
+    Args:
+        centers: An (N, 2) array of centers in cell coordinates.
+        shape: The shape.
+        radius: The radius of the circles in cells.
+        hires_mode: The Hi-Res mode that decides the sub-pixel grid.
+        size: The size of the canvas in cells. Cells outside it are dropped.
+        owners: Also find the center each cell belongs to. Where shapes overlap, the cell belongs to the
+            center that comes last, as it is drawn on top.
+    Returns:
+        The bounding box of the touched cells, an array of masks with the shape of the bounding box and,
+        if `owners` is set, an array with the same shape holding the index of the owning center, or -1.
+    """
+    pixel_size = hires_sizes[hires_mode]
+    breaks = _phase_breaks(shape, radius, hires_mode)
+    cell_x, phase_x, positions_x = _phases(centers[:, 0] * pixel_size.width, breaks, pixel_size.width)
+    cell_y, phase_y, positions_y = _phases(centers[:, 1] * pixel_size.height, breaks, pixel_size.height)
+    phases = phase_y * len(positions_x) + phase_x
+    xs, ys, masks, indices = [], [], [], []
+    for phase in np.unique(phases).tolist():
+        row, column = divmod(phase, len(positions_x))
+        stamp = get_stamp(shape, radius, hires_mode, (float(positions_x[column]), float(positions_y[row])))
+        group = phases == phase
+        xs.append((cell_x[group][:, np.newaxis] + stamp.dx).ravel())
+        ys.append((cell_y[group][:, np.newaxis] + stamp.dy).ravel())
+        masks.append(np.broadcast_to(stamp.masks, (int(group.sum()), len(stamp.masks))).ravel())
+        if owners:
+            indices.append(np.repeat(np.flatnonzero(group), len(stamp.masks)))
+    x = np.concatenate(xs) if xs else np.empty(0, dtype=np.intp)
+    y = np.concatenate(ys) if ys else np.empty(0, dtype=np.intp)
+    inside = (x >= 0) & (x < size.width) & (y >= 0) & (y < size.height)
+    if not inside.any():
+        return Region(), np.zeros((0, 0), dtype=np.uint8), np.zeros((0, 0), dtype=np.intp) if owners else None
+    x, y, mask = x[inside], y[inside], np.concatenate(masks)[inside]
+    x0, y0 = int(x.min()), int(y.min())
+    cells = (y - y0, x - x0)
+    packed = np.zeros((int(y.max()) - y0 + 1, int(x.max()) - x0 + 1), dtype=np.uint8)
+    # stamps of nearby centers overlap, so their masks are merged
+    np.bitwise_or.at(packed, cells, mask)
+    owner = None
+    if owners:
+        owner = np.full(packed.shape, -1, dtype=np.intp)
+        np.maximum.at(owner, cells, np.concatenate(indices)[inside])
+    return Region(x0, y0, packed.shape[1], packed.shape[0]), packed, owner
@@ -0,0 +1,110 @@
+"""Performance counters for ParCanvas."""
+
+from time import perf_counter
+
+from textual.geometry import Region
+
+
+class CanvasStats:
+    """
+    Counters and timings of a canvas, collected while `ParCanvas.collect_stats` is on.
+    Counters accumulate until `reset` is called. A frame is one batch, from turning batching on to turning it off.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """Zero all counters and timings."""
+        self.pixels_written = 0
+        """Cells written by drawing calls, or covered by the regions that fill and copy calls wrote."""
+        self.flushes = 0
+        """Number of times dirty regions were sent to textual."""
+        self.regions_refreshed = 0
+        """Total number of dirty regions sent to textual."""
+        self.cells_refreshed = 0
+        """Total number of cells in the dirty regions sent to textual."""
+        self.last_flush_regions = 0
+        self.last_flush_cells = 0
+        self.render_line_calls = 0
+        """Number of `render_line` calls."""
+        self.rows_rendered = 0
+        """Number of `render_line` calls that had to rebuild the row instead of using the cached strip."""
+        self.render_time = 0.0
+        """Total seconds spent in `render_line`."""
+        self.hires_time = 0.0
+        """Total seconds spent compositing Hi-Res sub-pixels."""
+        self.frames = 0
+        self.frame_time = 0.0
+        """Seconds from the start to the end of the last frame."""
+        self.frame_interval = 0.0
+        """Smoothed seconds between the ends of consecutive frames."""
+        self._frame_start: float | None = None
+        self._frame_end: float | None = None
+
+    def start_frame(self) -> None:
+        """Record the start of a frame."""
+        self._frame_start = perf_counter()
+
+    def end_frame(self) -> None:
+        """Record the end of a frame."""
+        now = perf_counter()
+        self.frames += 1
+        if self._frame_start is not None:
+            self.frame_time = now - self._frame_start
+        if self._frame_end is not None:
+            interval = now - self._frame_end
+            # the first interval seeds the average, later ones are smoothed
+            self.frame_interval += (interval - self.frame_interval) * (0.1 if self.frames > 2 else 1.0)
+        self._frame_end = now
+
+    def record_flush(self, regions: list[Region]) -> None:
+        """
+        Record the dirty regions sent to textual in one flush.
+
+        Args:
+            regions: The regions that were sent.
+        """
+        self.flushes += 1
+        self.last_flush_regions = len(regions)
+        self.last_flush_cells = sum(region.area for region in regions)
+        self.regions_refreshed += self.last_flush_regions
+        self.cells_refreshed += self.last_flush_cells
+
+    def snapshot(self) -> dict[str, int | float]:
+        """
+        Get the current counters and timings.
+
+        Returns:
+            A dict of counter names to values. Times are in seconds.
+        """
+        return {
+            "pixels_written": self.pixels_written,
+            "flushes": self.flushes,
+            "regions_refreshed": self.regions_refreshed,
+            "cells_refreshed": self.cells_refreshed,
+            "last_flush_regions": self.last_flush_regions,
+            "last_flush_cells": self.last_flush_cells,
+            "render_line_calls": self.render_line_calls,
+            "rows_rendered": self.rows_rendered,
+            "render_time": self.render_time,
+            "hires_time": self.hires_time,
+            "frames": self.frames,
+            "frame_time": self.frame_time,
+            "frame_interval": self.frame_interval,
+        }
+
+    def summary(self) -> str:
+        """
+        Get a one line summary of the last frame and the totals.
+
+        Returns:
+            The summary.
+        """
+        fps = 1 / self.frame_interval if self.frame_interval else 0.0
+        return (
+            f"{fps:.0f} fps, frame {self.frame_time * 1000:.2f} ms, "
+            f"last flush {self.last_flush_regions} regions / {self.last_flush_cells} cells, "
+            f"rendered {self.rows_rendered}/{self.render_line_calls} lines in {self.render_time * 1000:.1f} ms, "
+            f"hi-res {self.hires_time * 1000:.1f} ms, {self.pixels_written} pixels written"
+        )
@@ -0,0 +1,159 @@
+"""Style interning for ParCanvas."""
+
+from threading import Lock
+
+import numpy as np
+from rich.color import Color, ColorType
+from rich.color_triplet import ColorTriplet
+from rich.style import Style
+from rich.text import Text
+from textual.cache import LRUCache
+
+from par_textual_playground.widgets.canvas.cell_buffer import STYLE_DTYPE, encode_text
+
+RGB_PAIR = 1 << 31
+"""Flag of the style ids that hold a truecolor foreground / background pair themselves, as two RGB555 colors."""
+
+
+class StylePalette:
+    """
+    Interns style strings to small integer ids and caches the parsed Style for each id.
+    Id 0 is always the empty style. Parsed styles are kept in a bounded LRU cache and
+    re-parsed on demand if they were evicted.
+    Interning is thread safe, so rasters drawn on worker threads can share a palette with their canvas.
+
+    Truecolor foreground / background pairs can be interned in bulk with `intern_rgb_pairs`. Their ids hold
+    the colors themselves, quantized to 5 bits per channel so a pair fits a 32 bit id, flagged with `RGB_PAIR`.
+    They are computed without any lookup and the palette does not grow however many distinct colors are drawn.
+    Markup strings are parsed into codepoints and style ids by `intern_markup`, which caches the most recent ones.
+    """
+
+    def __init__(self, max_cached_styles: int = 1024, max_cached_markup: int = 1024) -> None:
+        """
+        Args:
+            max_cached_styles: The maximum number of parsed Style objects to keep.
+            max_cached_markup: The maximum number of parsed markup strings to keep.
+        """
+        self._ids: dict[str, int] = {"": 0}
+        self._names: list[str] = [""]
+        self._styles: LRUCache[int, Style] = LRUCache(max_cached_styles)
+        self._lock = Lock()
+        self._markup: LRUCache[str, tuple[np.ndarray, np.ndarray]] = LRUCache(max_cached_markup)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def intern(self, style: str) -> int:
+        """
+        Get the id for a style string, allocating a new one if needed.
+
+        Args:
+            style: The style string.
+        Returns:
+            The style id.
+        """
+        style_id = self._ids.get(style)
+        if style_id is None:
+            with self._lock:
+                style_id = self._ids.get(style)
+                if style_id is None:
+                    self._names.append(style)
+                    style_id = self._ids[style] = len(self._names) - 1
+        return style_id
+
+    def intern_rgb_pairs(self, fg: np.ndarray, bg: np.ndarray) -> np.ndarray:
+        """
+        Get the ids for arrays of truecolor foreground / background pairs.
+        The ids are the pairs quantized to RGB555 and flagged with `RGB_PAIR`, nothing is stored in the palette.
+
+        Args:
+            fg: Packed 0xRRGGBB foreground colors.
+            bg: Packed 0xRRGGBB background colors of the same shape.
+        Returns:
+            The style ids, in the shape of `fg`.
+        """
+        ids = (_to_rgb555(fg) << STYLE_DTYPE.type(15)) | _to_rgb555(bg)
+        ids |= STYLE_DTYPE.type(RGB_PAIR)
+        return ids
+
+    def intern_markup(self, markup: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the codepoints and style ids of the characters of a markup string, interning new styles as needed.
+        Results are cached, so text that is redrawn every frame is only parsed once.
+
+        Args:
+            markup: The markup string.
+        Returns:
+            The read-only codepoints of the plain text and the style id of every character.
+        """
+        # the LRU cache is not thread safe, and rasters on worker threads share the palette
+        with self._lock:
+            cached = self._markup.get(markup)
+        if cached is None:
+            text = Text.from_markup(markup)
+            chars = encode_text(text.plain)
+            style_ids = np.zeros(len(chars), dtype=STYLE_DTYPE)
+            # the spans covering a character only change at span boundaries, so styles are combined once per run
+            bounds = sorted({0, len(chars), *(span.start for span in text.spans), *(span.end for span in text.spans)})
+            for start, end in zip(bounds, bounds[1:]):
+                style = Style()
+                for span in text.spans:
+                    if span.start <= start and span.end >= end:
+                        style += Style.parse(str(span.style))
+                # unstyled characters share the empty style with plain text
+                style_ids[start:end] = self.intern(str(style)) if style else 0
+            style_ids.flags.writeable = False
+            cached = (chars, style_ids)
+            with self._lock:
+                self._markup.set(markup, cached)
+        return cached
+
+    def name(self, style_id: int) -> str:
+        """
+        Get the style string for an id.
+
+        Args:
+            style_id: The style id.
+        Returns:
+            The style string the id was interned from.
+        """
+        style_id = int(style_id)
+        if style_id & RGB_PAIR:
+            return f"#{_from_rgb555(style_id >> 15):06x} on #{_from_rgb555(style_id):06x}"
+        return self._names[style_id]
+
+    def style(self, style_id: int) -> Style:
+        """
+        Get the parsed Style for an id.
+
+        Args:
+            style_id: The style id.
+        Returns:
+            The parsed Style.
+        """
+        style = self._styles.get(style_id)
+        if style is None:
+            if style_id & RGB_PAIR:
+                # skips parsing, which matters for images that show thousands of colors
+                style = Style.from_color(_rgb_color(_from_rgb555(style_id >> 15)), _rgb_color(_from_rgb555(style_id)))
+            else:
+                style = Style.parse(self._names[style_id])
+            self._styles.set(style_id, style)
+        return style
+
+
+def _rgb_color(rgb: int) -> Color:
+    # builds the color directly, Color.from_rgb is several times slower
+    return Color(f"#{rgb:06x}", ColorType.TRUECOLOR, triplet=ColorTriplet(rgb >> 16, (rgb >> 8) & 0xFF, rgb & 0xFF))
+
+
+def _to_rgb555(rgb: np.ndarray) -> np.ndarray:
+    """Quantize packed 0xRRGGBB colors to 15 bit RGB555 by keeping the top 5 bits of every channel."""
+    rgb = rgb.astype(STYLE_DTYPE)
+    return ((rgb >> 9) & 0x7C00) | ((rgb >> 6) & 0x03E0) | ((rgb >> 3) & 0x001F)
+
+
+def _from_rgb555(color: int) -> int:
+    """Expand the low 15 bits of an id from RGB555 back to a packed 0xRRGGBB color, so 0x1F becomes 0xFF."""
+    r, g, b = (color >> 10) & 0x1F, (color >> 5) & 0x1F, color & 0x1F
+    return ((r << 3 | r >> 2) << 16) | ((g << 3 | g >> 2) << 8) | (b << 3 | b >> 2)
@@ -0,0 +1,165 @@
+"""Streaming time-series plot on ParCanvas."""
+
+import numpy as np
+from textual import on
+
+from par_textual_playground.widgets.canvas.decimate import MinMaxBins
+from par_textual_playground.widgets.canvas.hires import HiResMode, hires_sizes
+from par_textual_playground.widgets.canvas.par_canvas import ParCanvas
+
+
+class TimeSeries:
+    """
+    One series of a TimeSeriesPlot. Samples are evenly spaced and only their per-bin
+    first, last, minimum and maximum are kept, so a series can take millions of points.
+    """
+
+    def __init__(self, plot: "TimeSeriesPlot", style: str, max_bins: int, window: int | None) -> None:
+        """
+        Args:
+            plot: The plot the series belongs to.
+            style: The style to draw the series with.
+            max_bins: The maximum number of bins kept for the series.
+            window: Only keep the last `window` samples.
+        """
+        self._plot = plot
+        self.style = style
+        self.bins = MinMaxBins(max_bins, window)
+
+    @property
+    def count(self) -> int:
+        """The number of samples appended so far."""
+        return self.bins.count
+
+    def append(self, values: np.ndarray | list[float]) -> None:
+        """
+        Appends samples to the series. Only the bins the samples fall in are updated.
+        Also schedules a redraw of the plot.
+
+        Args:
+            values: The samples to append.
+        """
+        self.bins.append(np.asarray(values, dtype=np.float64))
+        self._plot.schedule_redraw()
+
+    def set_data(self, values: np.ndarray | list[float]) -> None:
+        """
+        Replaces all samples of the series.
+        Also schedules a redraw of the plot.
+
+        Args:
+            values: The new samples.
+        """
+        self.bins.clear()
+        self.append(values)
+
+
+class TimeSeriesPlot(ParCanvas):
+    """
+    A line plot of evenly spaced samples, drawn in BRAILLE resolution.
+
+    Every series is decimated into its first, last, minimum and maximum sample per pixel column
+    before anything is drawn, so drawing costs the same for a thousand or ten million samples.
+    Each column is drawn as a vertical line from its minimum to its maximum, joined to the next
+    column from its last to the next column's first sample, which matches drawing every sample
+    up to where the bin boundaries fall. Appends only update the bins they touch, and redraws are coalesced
+    to one per screen refresh. The canvas is double buffered, so only the cells that changed are
+    sent to the terminal.
+    """
+
+    hires_mode = HiResMode.BRAILLE
+
+    def __init__(
+        self,
+        window: int | None = None,
+        y_range: tuple[float, float] | None = None,
+        max_bins: int = 4096,
+        name: str | None = None,
+        id: str | None = None,
+        classes: str | None = None,
+        disabled: bool = False,
+    ):
+        """
+        Args:
+            window: Show the last `window` samples, scrolling as samples are appended.
+                Defaults to fitting all samples to the width of the plot.
+            y_range: The values at the bottom and top of the plot. Defaults to fitting the visible samples.
+            max_bins: The maximum number of bins kept per series. Should be well above the number of pixel columns.
+            name: The name of the widget.
+            id: The ID of the widget in the DOM.
+            classes: The CSS classes for the widget.
+            disabled: Whether the widget is disabled or not.
+        """
+        super().__init__(name=name, id=id, classes=classes, disabled=disabled, double_buffered=True)
+        self.window = window
+        self.y_range = y_range
+        self.max_bins = max_bins
+        self.series: list[TimeSeries] = []
+        self._redraw_scheduled = False
+
+    def add_series(self, style: str = "white") -> TimeSeries:
+        """
+        Adds an empty series to the plot.
+
+        Args:
+            style: The style to draw the series with.
+        Returns:
+            The new series.
+        """
+        series = TimeSeries(self, style, self.max_bins, self.window)
+        self.series.append(series)
+        return series
+
+    @on(ParCanvas.Resize)
+    def _resize_plot(self, event: ParCanvas.Resize) -> None:
+        self.reset(event.size, refresh=False)
+        self.redraw()
+
+    def schedule_redraw(self) -> None:
+        """Redraws the plot after the next screen refresh, coalescing all requests made until then."""
+        # before mounting there is nothing to draw on, the first resize draws the plot
+        if self.is_mounted and not self._redraw_scheduled:
+            self._redraw_scheduled = True
+            self.call_after_refresh(self.redraw)
+
+    def redraw(self) -> None:
+        """Draws all series from their bins."""
+        self._redraw_scheduled = False
+        if not self.canvas_size:
+            return
+        pixel_size = hires_sizes[self.hires_mode]
+        columns = self.canvas_size.width * pixel_size.width
+        rows = self.canvas_size.height * pixel_size.height
+        stop = max((series.count for series in self.series), default=0)
+        start = max(stop - self.window, 0) if self.window is not None else 0
+        if self.window is not None:
+            stop = start + self.window
+
+        decimated = [series.bins.columns(start, stop, columns) for series in self.series]
+        y_lo, y_hi = self.y_range or self._fit_y_range(decimated)
+        scale = (rows - 1) / (y_hi - y_lo) if y_hi > y_lo else 0.0
+
+        self.batching = True
+        self.clear()
+        for series, (column, first, last, low, high) in zip(self.series, decimated):
+            if not len(column):
+                continue
+            x = column / pixel_size.width
+            # values are flipped so larger values are drawn higher up, then snapped to sub-pixel rows
+            first, last, low, high = (np.rint((y_hi - v) * scale) / pixel_size.height for v in (first, last, low, high))
+            lines = np.concatenate(
+                [
+                    np.column_stack([x, high, x, low]),
+                    np.column_stack([x[:-1], last[:-1], x[1:], first[1:]]),
+                ]
+            )
+            self.draw_hires_lines(lines, self.hires_mode, series.style)
+        self.batching = False
+
+    @staticmethod
+    def _fit_y_range(decimated: list[tuple[np.ndarray, ...]]) -> tuple[float, float]:
+        lows = [low.min() for _, _, _, low, _ in decimated if len(low)]
+        highs = [high.max() for _, _, _, _, high in decimated if len(high)]
+        if not lows:
+            return 0.0, 1.0
+        return float(min(lows)), float(max(highs))
@@ -0,0 +1,333 @@
+"""A scrolling canvas larger than the screen, stored as lazily allocated tiles."""
+
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+from textual.geometry import Region, Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+from par_textual_playground.widgets.canvas.canvas_raster import CanvasRaster
+from par_textual_playground.widgets.canvas.cell_buffer import BLANK
+from par_textual_playground.widgets.canvas.display_list import (
+    DRAWING_METHODS,
+    DrawingMethod,
+    call_with_coordinates,
+    split_coordinates,
+)
+from par_textual_playground.widgets.canvas.hires import as_points
+from par_textual_playground.widgets.canvas.image import as_rgb_array, resample
+from par_textual_playground.widgets.canvas.style_palette import StylePalette
+
+
+class _Tile(CanvasRaster):
+    """One tile of a virtual canvas. It keeps the rendered strips of its rows until they are drawn on."""
+
+    def __init__(self, canvas: "VirtualCanvas", origin: tuple[int, int], size: Size):
+        """
+        Args:
+            canvas: The canvas the tile belongs to.
+            origin: The position of the top-left cell of the tile on the canvas.
+            size: The size of the tile in cells.
+        """
+        super().__init__(size.width, size.height, palette=canvas._palette)
+        self._canvas = canvas
+        self.origin = origin
+        self._strips: list[Strip | None] = [None] * size.height
+
+    def row_strip(self, y: int) -> Strip:
+        """
+        Get the rendered strip of a row of the tile, rendering it if it was drawn on since.
+
+        Args:
+            y: The y-coordinate of the row within the tile.
+        Returns:
+            The strip of the row.
+        """
+        strip = self._strips[y]
+        if strip is None:
+            strip = self._strips[y] = self._render_row(y)
+        return strip
+
+    def is_blank(self) -> bool:
+        """Whether every cell of the tile is empty and unstyled, so it can be dropped."""
+        assert self._cells is not None
+        return not (np.any(self._cells.chars != BLANK) or np.any(self._cells.styles))
+
+    def mark_dirty(self, region: Region) -> None:
+        """
+        Drops the strips of a region of the tile and refreshes it on the canvas.
+
+        Args:
+            region: The region to mark as dirty, in tile coordinates.
+        """
+        for y in range(region.y, region.bottom):
+            self._strips[y] = None
+        self._canvas._damage(region.translate(self.origin))
+
+    def _mark_dirty_cells(self, xs: np.ndarray, ys: np.ndarray) -> None:
+        """
+        Drops the strips of the rows of the cells and refreshes their bounding box on the canvas.
+
+        Args:
+            xs: Array of x-coordinates of cells inside the tile.
+            ys: Array of y-coordinates of cells inside the tile.
+        """
+        if not len(xs):
+            return
+        x0, x1 = int(xs.min()), int(xs.max())
+        y0, y1 = int(ys.min()), int(ys.max())
+        self.mark_dirty(Region(x0, y0, x1 - x0 + 1, y1 - y0 + 1))
+
+
+class VirtualCanvas(ScrollView):
+    """
+    A canvas of a fixed virtual size, typically far larger than the widget, that is scrolled through a viewport.
+
+    The cells are split into tiles of `tile_size` that are only allocated when something is drawn on them,
+    so memory grows with the area that was drawn rather than the virtual size. Tiles that stay empty are dropped.
+    The drawing methods of `CanvasRaster` can be called on the canvas with virtual coordinates, see
+    `DRAWING_METHODS`. Each call is split up by the tiles it can touch, and batched calls send every tile
+    only the coordinates that fall near it. Every tile keeps the rendered strips of its rows, so `render_line`
+    only joins the cached strips of the tiles in view: scrolling renders nothing that was rendered before.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        tile_size: Size = Size(64, 32),
+        name: str | None = None,
+        id: str | None = None,
+        classes: str | None = None,
+        disabled: bool = False,
+    ):
+        """
+        Args:
+            width: The virtual width of the canvas.
+            height: The virtual height of the canvas.
+            tile_size: The size of a tile in cells.
+            name: The name of the widget.
+            id: The ID of the widget in the DOM.
+            classes: The CSS classes for the widget.
+            disabled: Whether the widget is disabled or not.
+        """
+        super().__init__(name=name, id=id, classes=classes, disabled=disabled)
+        self.canvas_size = Size(width, height)
+        self.tile_size = tile_size
+        self.virtual_size = self.canvas_size
+        self._palette = StylePalette()
+        self._tiles: dict[tuple[int, int], _Tile] = {}
+        self._tile_columns = -(-width // tile_size.width)
+        self._tile_rows = -(-height // tile_size.height)
+
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        if name not in DRAWING_METHODS:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+        def draw(*args: Any, **kwargs: Any) -> None:
+            rows, options = split_coordinates(name, args, kwargs)
+            self._draw(name, rows, options)
+
+        return draw
+
+    @property
+    def tile_count(self) -> int:
+        """The number of allocated tiles."""
+        return len(self._tiles)
+
+    @property
+    def nbytes(self) -> int:
+        """The memory held by the cells of the allocated tiles, in bytes."""
+        total = 0
+        for tile in self._tiles.values():
+            assert tile._cells is not None
+            cells = tile._cells
+            total += cells.chars.nbytes + cells.styles.nbytes + sum(plane.nbytes for plane in cells.planes.values())
+        return total
+
+    def clear(self) -> None:
+        """Drops every tile, leaving the canvas empty. Also refreshes the widget."""
+        self._tiles.clear()
+        self.refresh()
+
+    def get_pixel(self, x: int, y: int) -> tuple[str, str]:
+        """
+        Retrieves the character and style of a single pixel at the given virtual coordinates.
+
+        Args:
+            x: The x-coordinate of the pixel.
+            y: The y-coordinate of the pixel.
+        Returns:
+            A tuple containing the character and style of the pixel.
+        """
+        tile_width, tile_height = self.tile_size
+        tile = self._tiles.get((x // tile_width, y // tile_height))
+        if tile is None:
+            return chr(BLANK), ""
+        return tile.get_pixel(x % tile_width, y % tile_height)
+
+    def _draw(self, method: str, rows: np.ndarray, options: dict[str, Any]) -> None:
+        """
+        Sends a drawing call to every tile it can touch, with the coordinates moved to the tile.
+
+        Args:
+            method: The name of the drawing method.
+            rows: The coordinates, as split off by `split_coordinates`.
+            options: The other arguments by name.
+        """
+        drawing_method = DRAWING_METHODS[method]
+        if drawing_method.cells:
+            rows = rows.astype(np.int64)
+        if method == "draw_image":
+            options = self._prepare_image(options)
+        elif method == "draw_density":
+            options = self._prepare_density(rows, options)
+        tile_x, tile_y, row_index = self._tiles_touched(drawing_method, rows, self._margins(method, rows, options))
+        if not len(row_index):
+            return
+        keys = tile_y * self._tile_columns + tile_x
+        order = np.argsort(keys, kind="stable")
+        keys, row_index = keys[order], row_index[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        columns_x = [i for i, kind in enumerate(drawing_method.coordinates) if kind == "x"]
+        columns_y = [i for i, kind in enumerate(drawing_method.coordinates) if kind == "y"]
+        per_point = {
+            name: np.asarray(options[name]) for name in drawing_method.per_point if options.get(name) is not None
+        }
+        for start, end in zip(starts.tolist(), [*starts[1:].tolist(), len(keys)]):
+            ty, tx = divmod(int(keys[start]), self._tile_columns)
+            tile = self._tiles.get((tx, ty))
+            created = tile is None
+            if tile is None:
+                tile = self._add_tile(tx, ty)
+            index = row_index[start:end]
+            local = rows[index]
+            local[:, columns_x] -= tile.origin[0]
+            local[:, columns_y] -= tile.origin[1]
+            if per_point:
+                options = {**options, **{name: values[index] for name, values in per_point.items()}}
+            call_with_coordinates(tile, method, local, options)
+            if created and tile.is_blank():
+                del self._tiles[(tx, ty)]
+
+    def _add_tile(self, tx: int, ty: int) -> _Tile:
+        """Allocates the tile at the given tile column and row."""
+        tile_width, tile_height = self.tile_size
+        x, y = tx * tile_width, ty * tile_height
+        size = Size(min(tile_width, self.canvas_size.width - x), min(tile_height, self.canvas_size.height - y))
+        tile = self._tiles[(tx, ty)] = _Tile(self, (x, y), size)
+        return tile
+
+    def _prepare_image(self, options: dict[str, Any]) -> dict[str, Any]:
+        """Converts and resamples an image once, instead of once for every tile it covers."""
+        rgb = as_rgb_array(options["image"])
+        if options.get("size") is not None:
+            width, height = options["size"]
+            rgb = resample(rgb, width, height * 2)
+        return {**options, "image": rgb, "size": None}
+
+    def _prepare_density(self, rows: np.ndarray, options: dict[str, Any]) -> dict[str, Any]:
+        """Fixes the densest count across all tiles, so every tile colors its cells on the same scale."""
+        weights = options.get("weights")
+        if weights is not None:
+            options = {**options, "weights": np.asarray(weights, dtype=np.float64)}
+        if options.get("max_count") is not None:
+            return options
+        xs, ys = np.floor(as_points(rows)).astype(np.int64).T
+        inside = (xs >= 0) & (xs < self.canvas_size.width) & (ys >= 0) & (ys < self.canvas_size.height)
+        if not inside.any():
+            return options
+        _, cell_index = np.unique(ys[inside] * self.canvas_size.width + xs[inside], return_inverse=True)
+        counts = np.bincount(cell_index, None if weights is None else options["weights"][inside])
+        return {**options, "max_count": float(counts.max())}
+
+    def _margins(self, method: str, rows: np.ndarray, options: dict[str, Any]) -> tuple[int, int, int, int]:
+        """
+        Get how far a drawing call can reach past its coordinates.
+
+        Returns:
+            The reach to the left, up, to the right and down, in cells.
+        """
+        if method == "write_text":
+            # the text is aligned around x and markup only makes it shorter
+            length = len(options["text"])
+            return length, 0, length, 0
+        if method == "draw_image":
+            height, width = options["image"].shape[:2]
+            return 0, 0, width - 1, (height + 1) // 2 - 1
+        if method == "draw_markers":
+            reach = int(np.ceil(options["radius"])) + 1
+            return reach, reach, reach, reach
+        if "r" in DRAWING_METHODS[method].coordinates:
+            reach = int(np.ceil(rows[:, -1].max())) + 1
+            return reach, reach, reach, reach
+        return 0, 0, 0, 0
+
+    def _tiles_touched(
+        self, drawing_method: DrawingMethod, rows: np.ndarray, margins: tuple[int, int, int, int]
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find the tiles the bounding box of every coordinate row overlaps.
+
+        Returns:
+            Arrays of tile columns, tile rows and the index of the coordinate row, one entry per pair.
+        """
+        tile_width, tile_height = self.tile_size
+        columns_x = [i for i, kind in enumerate(drawing_method.coordinates) if kind == "x"]
+        columns_y = [i for i, kind in enumerate(drawing_method.coordinates) if kind == "y"]
+        left, up, right, down = margins
+        xs = np.floor(rows[:, columns_x])
+        ys = np.floor(rows[:, columns_y])
+        tx0 = np.maximum((xs.min(axis=1) - left) // tile_width, 0).astype(np.int64)
+        tx1 = np.minimum((xs.max(axis=1) + right) // tile_width, self._tile_columns - 1).astype(np.int64)
+        ty0 = np.maximum((ys.min(axis=1) - up) // tile_height, 0).astype(np.int64)
+        ty1 = np.minimum((ys.max(axis=1) + down) // tile_height, self._tile_rows - 1).astype(np.int64)
+        spans_x = np.maximum(tx1 - tx0 + 1, 0)
+        counts = spans_x * np.maximum(ty1 - ty0 + 1, 0)
+        row_index = np.repeat(np.arange(len(rows)), counts)
+        # position of every pair within the tiles of its row, walking the tiles row by row
+        k = np.arange(len(row_index)) - np.repeat(np.cumsum(counts) - counts, counts)
+        span = spans_x[row_index]
+        return tx0[row_index] + k % np.maximum(span, 1), ty0[row_index] + k // np.maximum(span, 1), row_index
+
+    def _damage(self, region: Region) -> None:
+        """
+        Refreshes the part of a region of the canvas that is in view.
+
+        Args:
+            region: The region in virtual coordinates.
+        """
+        scroll_x, scroll_y = self.scroll_offset
+        visible = region.translate((-scroll_x, -scroll_y)).intersection(Region(0, 0, *self.size))
+        if visible.area:
+            self.refresh(visible)
+
+    def render_line(self, y: int) -> Strip:
+        """
+        Renders a line of the viewport by joining the cached strips of the tiles in view.
+
+        Args:
+            y: The y-coordinate of the line in the viewport.
+        Returns:
+            A Strip representing the line.
+        """
+        scroll_x, scroll_y = self.scroll_offset
+        width = self.size.width
+        y += scroll_y
+        if y >= self.canvas_size.height or not width:
+            return Strip.blank(width)
+        tile_width, tile_height = self.tile_size
+        ty, tile_row = divmod(y, tile_height)
+        first = scroll_x // tile_width
+        last = min((scroll_x + width - 1) // tile_width, self._tile_columns - 1)
+        strips = []
+        for tx in range(first, last + 1):
+            tile = self._tiles.get((tx, ty))
+            if tile is None:
+                strips.append(Strip.blank(min(tile_width, self.canvas_size.width - tx * tile_width)))
+            else:
+                strips.append(tile.row_strip(tile_row))
+        offset = scroll_x - first * tile_width
+        return Strip.join(strips).crop_extend(offset, offset + width, None)
@@ -0,0 +1,71 @@
+"""Tests for the ParCanvas cell buffer."""
+
+import numpy as np
+from textual.geometry import Region
+
+from par_textual_playground.widgets.canvas.cell_buffer import BLANK, CellBuffer
+from par_textual_playground.widgets.canvas.hires import HiResMode
+
+
+def random_buffer(width: int, height: int, seed: int = 0) -> CellBuffer:
+    """A buffer with a different codepoint and style id in every cell."""
+    rng = np.random.default_rng(seed)
+    cells = CellBuffer(width, height)
+    cells.chars[:] = rng.integers(33, 127, (height, width))
+    cells.styles[:] = rng.integers(0, 1000, (height, width))
+    return cells
+
+
+def test_copy_region_handles_overlap() -> None:
+    for dx, dy in ((3, 2), (-3, -2), (2, -1), (-2, 1), (0, 3)):
+        cells = random_buffer(30, 12)
+        chars, styles = cells.chars.copy(), cells.styles.copy()
+        target = cells.copy_region(Region(5, 3, 10, 6), 5 + dx, 3 + dy)
+        assert target == Region(5 + dx, 3 + dy, 10, 6)
+        expected_chars, expected_styles = chars.copy(), styles.copy()
+        expected_chars[3 + dy : 9 + dy, 5 + dx : 15 + dx] = chars[3:9, 5:15]
+        expected_styles[3 + dy : 9 + dy, 5 + dx : 15 + dx] = styles[3:9, 5:15]
+        assert (cells.chars == expected_chars).all()
+        assert (cells.styles == expected_styles).all()
+
+
+def test_copy_region_clips_to_the_buffer() -> None:
+    cells = random_buffer(10, 5)
+    chars = cells.chars.copy()
+    target = cells.copy_region(Region(0, 0, 10, 5), 7, 3)
+    assert target == Region(7, 3, 3, 2)
+    assert (cells.chars[3:5, 7:10] == chars[0:2, 0:3]).all()
+
+
+def shifted(array: np.ndarray, dx: int, dy: int, fill: int) -> np.ndarray:
+    """Shift a 2D array by an offset, dropping what moves out and filling what is exposed."""
+    result = np.full_like(array, fill)
+    ys, xs = np.indices(array.shape)
+    keep = (ys + dy >= 0) & (ys + dy < array.shape[0]) & (xs + dx >= 0) & (xs + dx < array.shape[1])
+    result[ys[keep] + dy, xs[keep] + dx] = array[keep]
+    return result
+
+
+def test_shift_moves_every_plane_inside_the_region() -> None:
+    for dx, dy in ((2, 1), (-3, 0), (0, -2), (-1, 3), (12, 0)):
+        cells = random_buffer(30, 12)
+        rng = np.random.default_rng(1)
+        cells.plane(HiResMode.BRAILLE)[:] = rng.integers(0, 256, (12, 30))
+        cells.object_ids()[:] = rng.integers(0, 5, (12, 30))
+        before = {
+            "chars": cells.chars.copy(),
+            "styles": cells.styles.copy(),
+            "plane": cells.plane(HiResMode.BRAILLE).copy(),
+            "ids": cells.object_ids().copy(),
+        }
+        assert cells.shift(Region(4, 2, 10, 8), dx, dy) == Region(4, 2, 10, 8)
+        after = {
+            "chars": cells.chars,
+            "styles": cells.styles,
+            "plane": cells.plane(HiResMode.BRAILLE),
+            "ids": cells.object_ids(),
+        }
+        for name, array in before.items():
+            expected = array.copy()
+            expected[2:10, 4:14] = shifted(array[2:10, 4:14], dx, dy, BLANK if name == "chars" else 0)
+            assert (after[name] == expected).all(), name
@@ -0,0 +1,42 @@
+"""Tests for min/max decimation of streaming series."""
+
+import numpy as np
+
+from par_textual_playground.widgets.canvas.decimate import MinMaxBins
+
+
+def check_bins(bins: MinMaxBins, series: np.ndarray) -> None:
+    """Check every bin against the samples it covers."""
+    assert bins.count == len(series)
+    for i in range(len(bins)):
+        start = (bins.first_bin + i) * bins.bin_size
+        samples = series[start : start + bins.bin_size]
+        assert bins.first[i] == samples[0]
+        assert bins.last[i] == samples[-1]
+        assert bins.min[i] == samples.min()
+        assert bins.max[i] == samples.max()
+
+
+def test_bins_hold_the_min_and_max_of_their_samples() -> None:
+    rng = np.random.default_rng(0)
+    bins = MinMaxBins(max_bins=64)
+    chunks = []
+    for _ in range(200):
+        chunks.append(rng.normal(size=int(rng.integers(1, 40))))
+        bins.append(chunks[-1])
+        check_bins(bins, np.concatenate(chunks))
+        assert len(bins) <= 64
+    # the bins cover the whole series
+    assert bins.start == 0
+    assert (bins.first_bin + len(bins)) * bins.bin_size >= bins.count
+
+
+def test_window_drops_old_bins() -> None:
+    rng = np.random.default_rng(1)
+    bins = MinMaxBins(max_bins=32, window=500)
+    series = rng.normal(size=5000)
+    for chunk in np.array_split(series, 97):
+        bins.append(chunk)
+    check_bins(bins, series)
+    assert bins.start <= len(series) - 500
+    assert len(series) - 500 < bins.start + bins.bin_size
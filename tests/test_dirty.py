@@ -0,0 +1,49 @@
+"""Tests for the ParCanvas damage tracker."""
+
+import numpy as np
+from textual.geometry import Region, Size
+
+from par_textual_playground.widgets.canvas.dirty import DirtyTracker
+
+
+def coverage(regions: list[Region], size: Size) -> np.ndarray:
+    """Count how many regions cover every cell."""
+    counts = np.zeros((size.height, size.width), dtype=int)
+    for region in regions:
+        counts[region.y : region.bottom, region.x : region.right] += 1
+    return counts
+
+
+def test_regions_are_disjoint_and_cover_the_damage() -> None:
+    size = Size(80, 40)
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        tracker = DirtyTracker(full_ratio=1.0)
+        tracker.reset(size)
+        damaged = np.zeros((size.height, size.width), dtype=bool)
+        for _ in range(10):
+            x, y = rng.integers(-5, 80), rng.integers(-5, 40)
+            region = Region(int(x), int(y), int(rng.integers(1, 12)), int(rng.integers(1, 4)))
+            tracker.add(region)
+            clipped = region.intersection(Region(0, 0, *size))
+            damaged[clipped.y : clipped.bottom, clipped.x : clipped.right] = True
+        xs, ys = rng.integers(0, 80, 50), rng.integers(0, 40, 50)
+        tracker.add_cells(xs, ys)
+        damaged[ys, xs] = True
+
+        counts = coverage(tracker.regions(), size)
+        assert counts.max() == 1
+        assert (counts[damaged] == 1).all()
+
+
+def test_large_damage_becomes_a_full_repaint() -> None:
+    size = Size(20, 10)
+    tracker = DirtyTracker(full_ratio=0.5)
+    tracker.reset(size)
+    tracker.add(Region(0, 0, 20, 4))
+    assert not tracker.full
+    tracker.add(Region(0, 4, 20, 2))
+    assert tracker.full
+    assert tracker.regions() == [Region(0, 0, 20, 10)]
+    tracker.clear()
+    assert not tracker
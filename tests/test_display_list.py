@@ -0,0 +1,59 @@
+"""Tests for retained display lists."""
+
+import numpy as np
+from textual.geometry import Size
+
+from par_textual_playground.widgets.canvas.canvas_raster import CanvasRaster
+from par_textual_playground.widgets.canvas.display_list import Anchor, DisplayList
+from par_textual_playground.widgets.canvas.hires import HiResMode
+
+
+def drawn(canvas: CanvasRaster) -> set[tuple[int, int]]:
+    """The cells that are not blank."""
+    assert canvas._cells is not None
+    ys, xs = np.nonzero(canvas._cells.chars != ord(" "))
+    return set(zip(xs.tolist(), ys.tolist()))
+
+
+def test_anchored_replay_moves_coordinates_with_the_canvas() -> None:
+    scene = DisplayList(Size(80, 24))
+    with scene.anchored(Anchor.START, Anchor.START):
+        scene.set_pixel(2, 3)
+    with scene.anchored(Anchor.CENTER, Anchor.CENTER):
+        scene.set_pixel(40, 12)
+    with scene.anchored(Anchor.END, Anchor.END):
+        scene.set_pixel(77, 22)
+    scene.set_pixel(79, 23)
+    with scene.anchored(Anchor.START, Anchor.END):
+        scene.set_pixel(10, 20)
+
+    canvas = CanvasRaster(160, 48)
+    scene.replay(canvas)
+    assert drawn(canvas) == {(2, 3), (80, 24), (157, 46), (159, 47), (10, 44)}
+
+
+def test_merged_commands_replay_like_direct_drawing() -> None:
+    rng = np.random.default_rng(0)
+    lines = rng.uniform(0, 40, (200, 4))
+    scene = DisplayList(Size(40, 20))
+    for x0, y0, x1, y1 in lines.tolist():
+        scene.draw_hires_line(x0, y0 / 2, x1, y1 / 2, HiResMode.BRAILLE, "red")
+    assert len(scene) == 1
+
+    replayed = CanvasRaster(40, 20)
+    scene.replay(replayed)
+    direct = CanvasRaster(40, 20)
+    for x0, y0, x1, y1 in lines.tolist():
+        direct.draw_hires_line(x0, y0 / 2, x1, y1 / 2, HiResMode.BRAILLE, "red")
+    assert replayed._cells is not None and direct._cells is not None
+    assert (replayed._cells.chars == direct._cells.chars).all()
+
+
+def test_recorded_arrays_are_copies() -> None:
+    points = np.array([[1.0, 1.0], [3.0, 2.0]])
+    scene = DisplayList(Size(10, 5))
+    scene.set_pixels(points)
+    points += 4
+    canvas = CanvasRaster(10, 5)
+    scene.replay(canvas)
+    assert drawn(canvas) == {(1, 1), (3, 2)}
@@ -0,0 +1,42 @@
+"""Tests for ParCanvas layers and sprites."""
+
+import numpy as np
+
+from par_textual_playground.widgets.canvas.par_canvas import ParCanvas
+
+
+def composited(canvas: ParCanvas) -> tuple[np.ndarray, np.ndarray]:
+    """The displayed codepoints and style ids of every row, with the layers composited over the canvas."""
+    rows = [canvas._row_cells(y) for y in range(canvas.canvas_size.height)]
+    return np.array([chars for chars, _ in rows]), np.array([styles for _, styles in rows])
+
+
+def damaged(canvas: ParCanvas) -> np.ndarray:
+    """The cells the canvas will refresh at the end of the batch."""
+    size = canvas.canvas_size
+    cells = np.zeros((size.height, size.width), dtype=bool)
+    for region in canvas._dirty.regions():
+        cells[region.y : region.bottom, region.x : region.right] = True
+    return cells
+
+
+def test_moving_a_sprite_damages_the_cells_that_change() -> None:
+    canvas = ParCanvas(width=60, height=20)
+    canvas.fill_rectangle(0, 0, 59, 19, "·", "blue")
+    sprite = canvas.add_layer().add_sprite(14, 8, x=5, y=4)
+    sprite.draw_filled_circle_highres(7, 4, 6, style="red")
+    counts = []
+    for x, y in ((6, 4), (6, 6), (3, 5), (3, 5), (30, 10), (29, 11)):
+        before = composited(canvas)
+        canvas.batching = True
+        canvas._dirty.clear()
+        sprite.move_to(x, y)
+        cells = damaged(canvas)
+        canvas.batching = False
+        chars, styles = composited(canvas)
+        changed = (chars != before[0]) | (styles != before[1])
+        assert not (changed & ~cells).any()
+        counts.append(int(cells.sum()))
+    # a one cell move only repaints the edges of the circle, not the whole footprint
+    assert counts[0] < 14 * 8 / 2
+    assert counts[3] == 0
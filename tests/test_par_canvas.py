@@ -0,0 +1,88 @@
+"""Tests for the ParCanvas widget."""
+
+import asyncio
+import threading
+from collections.abc import Callable
+
+from textual.app import App, ComposeResult
+from textual.geometry import Size
+
+from par_textual_playground.widgets.canvas.canvas_raster import CanvasRaster
+from par_textual_playground.widgets.canvas.par_canvas import ParCanvas
+
+
+def test_stats_overlay_waits_for_a_size() -> None:
+    canvas = ParCanvas()
+    canvas.stats_overlay = True
+    canvas.batching = True
+    canvas.batching = False
+    canvas.reset(Size(60, 5))
+    canvas.batching = True
+    canvas.batching = False
+    assert canvas._stats_overlay is not None
+    assert canvas._stats_overlay.get_pixel(0, 0)[1] == "reverse"
+
+
+def test_object_at_finds_the_topmost_object() -> None:
+    canvas = ParCanvas(width=40, height=20)
+    with canvas.drawing_object(1):
+        canvas.fill_rectangle(0, 0, 9, 9, "#")
+    with canvas.drawing_object(2):
+        canvas.draw_filled_circle_highres(20, 10, 3)
+    canvas.draw_markers([(30, 5), (31, 5)], 1, object_ids=[5, 6])
+    sprite = canvas.add_layer().add_sprite(6, 4, x=2, y=2)
+    with sprite.drawing_object(9):
+        sprite.fill_rectangle(0, 0, 2, 1, "@")
+
+    assert canvas.object_at(3, 2) == 9
+    # the sprite is transparent where it was not drawn
+    assert canvas.object_at(6, 4) == 1
+    assert canvas.object_at(20, 10) == 2
+    assert canvas.object_at(29, 5) == 5
+    # overlapping markers leave the cell to the one drawn last
+    assert canvas.object_at(31, 5) == 6
+    assert canvas.object_at(39, 19) == 0
+
+    sprite.move_to(30, 15)
+    assert canvas.object_at(3, 2) == 1
+    assert canvas.object_at(31, 15) == 9
+    with canvas.drawing_object(0):
+        canvas.fill_rectangle(0, 0, 4, 4, " ")
+    assert canvas.object_at(3, 2) == 0
+
+
+def test_draw_in_thread_swaps_in_the_latest_frame() -> None:
+    class CanvasApp(App[None]):
+        def compose(self) -> ComposeResult:
+            yield ParCanvas(id="canvas")
+
+    threads = []
+
+    def draw(text: str) -> Callable[[CanvasRaster], None]:
+        def draw_text(raster: CanvasRaster) -> None:
+            threads.append(threading.get_ident())
+            raster.write_text(1, 1, text)
+
+        return draw_text
+
+    async def run() -> None:
+        app = CanvasApp()
+        async with app.run_test(size=(40, 10)) as pilot:
+            canvas = app.query_one(ParCanvas)
+            await pilot.pause()
+            canvas.reset(canvas.size, refresh=False)
+            canvas.write_text(0, 5, "old")
+            for text in ("first", "second", "third"):
+                canvas.draw_in_thread(draw(text))
+            while canvas._raster_worker is not None or canvas._pending_draw is not None:
+                await app.workers.wait_for_complete()
+                await pilot.pause()
+            row = "".join(canvas.get_pixel(x, 1)[0] for x in range(1, 6))
+            assert row == "third"
+            # the frame replaces the canvas contents instead of drawing over them
+            assert canvas.get_pixel(0, 5)[0] == " "
+
+    asyncio.run(run())
+    # requests made while a frame is drawn coalesce, so "second" is never drawn
+    assert len(threads) == 2
+    assert threading.get_ident() not in threads
@@ -0,0 +1,34 @@
+"""Tests for the vectorized ParCanvas rasterizers."""
+
+import numpy as np
+from textual.geometry import Region
+
+from par_textual_playground.widgets.canvas import raster
+
+
+def inside(xs: np.ndarray, ys: np.ndarray, region: Region) -> set[tuple[int, int]]:
+    """The points that fall inside a region, as a set."""
+    keep = (xs >= region.x) & (xs < region.right) & (ys >= region.y) & (ys < region.bottom)
+    return set(zip(xs[keep].tolist(), ys[keep].tolist()))
+
+
+def test_clipped_lines_keep_the_visible_pixels() -> None:
+    clip = Region(0, 0, 40, 20)
+    rng = np.random.default_rng(0)
+    x0, x1 = rng.integers(-60, 100, (2, 500))
+    y0, y1 = rng.integers(-30, 50, (2, 500))
+    xs, ys = raster.line_points(x0, y0, x1, y1)
+    clipped_xs, clipped_ys = raster.line_points(x0, y0, x1, y1, clip=clip)
+    assert inside(clipped_xs, clipped_ys, clip) == inside(xs, ys, clip)
+    assert len(clipped_xs) < len(xs)
+
+
+def test_clip_lines_finds_where_lines_cross_the_rectangle() -> None:
+    x0 = np.array([-10.0, 5.0, -10.0])
+    y0 = np.array([5.0, 5.0, -10.0])
+    dx = np.array([40.0, 0.0, 5.0])
+    dy = np.array([0.0, 2.0, 0.0])
+    t0, t1, visible = raster.clip_lines(x0, y0, dx, dy, 0, 0, 20, 10)
+    assert visible.tolist() == [True, True, False]
+    assert (t0[0], t1[0]) == (0.25, 0.75)
+    assert (t0[1], t1[1]) == (0.0, 1.0)
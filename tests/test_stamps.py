@@ -0,0 +1,70 @@
+"""Tests for stamping cached Hi-Res shapes."""
+
+import numpy as np
+from textual.geometry import Region, Size
+
+from par_textual_playground.widgets.canvas import raster
+from par_textual_playground.widgets.canvas.hires import HiResMode, hires_sizes, pack_subpixel_grid
+from par_textual_playground.widgets.canvas.stamps import Shape, get_stamp, stamp_shape, stamp_shapes
+
+SIZE = Size(40, 20)
+
+
+def rasterized(points: np.ndarray, hires_mode: HiResMode) -> np.ndarray:
+    """The sub-pixel masks of every cell of the canvas, rasterized directly from the points of a shape."""
+    pixel_size = hires_sizes[hires_mode]
+    pw, ph = pixel_size.width, pixel_size.height
+    sx = np.floor(points[:, 0] * pw).astype(np.intp)
+    sy = np.floor(points[:, 1] * ph).astype(np.intp)
+    keep = (sx >= 0) & (sx < SIZE.width * pw) & (sy >= 0) & (sy < SIZE.height * ph)
+    subpixels = np.zeros((SIZE.height * ph, SIZE.width * pw), dtype=bool)
+    subpixels[sy[keep], sx[keep]] = True
+    return pack_subpixel_grid(subpixels, hires_mode)
+
+
+def placed(region: Region, packed: np.ndarray) -> np.ndarray:
+    """The masks of a stamp placed on an empty canvas."""
+    masks = np.zeros((SIZE.height, SIZE.width), dtype=np.uint8)
+    if region.area:
+        masks[region.y : region.bottom, region.x : region.right] = packed
+    return masks
+
+
+def points(shape: Shape, cx: float, cy: float, radius: float, hires_mode: HiResMode) -> np.ndarray:
+    """The Hi-Res points of a shape, as the canvas rasterizes them without stamps."""
+    pixel_size = hires_sizes[hires_mode]
+    if shape == Shape.DISC:
+        return raster.hires_disc_points(cx, cy, radius, pixel_size.width, pixel_size.height)
+    return raster.hires_circle_points(cx, cy, radius, pixel_size.width, pixel_size.height)
+
+
+def test_stamps_equal_direct_rasterization() -> None:
+    rng = np.random.default_rng(0)
+    for hires_mode in HiResMode:
+        for shape in Shape:
+            for _ in range(40):
+                cx, cy = rng.uniform(-5, 45), rng.uniform(-5, 25)
+                radius = float(rng.choice([0.5, 1.0, 2.3, 5.0, 9.75]))
+                region, packed = stamp_shape(cx, cy, shape, radius, hires_mode, SIZE)
+                expected = rasterized(points(shape, cx, cy, radius, hires_mode), hires_mode)
+                assert (placed(region, packed) == expected).all(), (hires_mode, shape, cx, cy, radius)
+
+
+def test_stamping_many_centers_equals_direct_rasterization() -> None:
+    rng = np.random.default_rng(1)
+    centers = rng.uniform(-2, 42, (300, 2)) * (1, 0.5)
+    for hires_mode in HiResMode:
+        for shape in Shape:
+            region, packed, owner = stamp_shapes(centers, shape, 1.5, hires_mode, SIZE, owners=True)
+            expected = rasterized(
+                np.concatenate([points(shape, cx, cy, 1.5, hires_mode) for cx, cy in centers.tolist()]), hires_mode
+            )
+            assert (placed(region, packed) == expected).all(), (hires_mode, shape)
+            assert owner is not None
+            assert ((owner >= 0) == (packed != 0)).all()
+
+
+def test_stamps_are_cached_and_read_only() -> None:
+    stamp = get_stamp(Shape.DISC, 3.0, HiResMode.BRAILLE, (0.5, 0.5))
+    assert get_stamp(Shape.DISC, 3.0, HiResMode.BRAILLE, (0.5, 0.5)) is stamp
+    assert not stamp.packed.flags.writeable
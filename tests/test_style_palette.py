@@ -0,0 +1,33 @@
+"""Tests for the ParCanvas style palette."""
+
+import numpy as np
+
+from par_textual_playground.widgets.canvas.canvas_raster import CanvasRaster
+from par_textual_playground.widgets.canvas.cell_buffer import STYLE_DTYPE
+from par_textual_playground.widgets.canvas.style_palette import StylePalette
+
+
+def test_rgb_pairs_round_trip() -> None:
+    palette = StylePalette()
+    ids = palette.intern_rgb_pairs(np.array([0x102030, 0xFFFFFF]), np.array([0x000000, 0xA0B0C0]))
+    assert ids.dtype == STYLE_DTYPE
+    # channels keep their top 5 bits, expanded back so that full intensity stays full
+    assert palette.name(ids[0]) == "#102131 on #000000"
+    assert palette.name(ids[1]) == "#ffffff on #a5b5c6"
+    style = palette.style(int(ids[0]))
+    assert style.color is not None and style.color.triplet == (0x10, 0x21, 0x31)
+    assert style.bgcolor is not None and style.bgcolor.triplet == (0, 0, 0)
+
+
+def test_distinct_truecolor_frames_stay_bounded() -> None:
+    raster = CanvasRaster(200, 100)
+    palette = raster._palette
+    rng = np.random.default_rng(0)
+    sizes = []
+    for _ in range(30):
+        frame = rng.integers(0, 256, (200, 200, 3), dtype=np.uint8)
+        raster.draw_image(0, 0, frame)
+        sizes.append(len(palette))
+    assert raster.get_pixel(0, 0)[1].startswith("#")
+    assert len(set(sizes)) == 1
+    assert len(palette) <= sizes[0] + 1